@@ -7,6 +7,8 @@
 #include <memory>
 #include <sstream>
 #include <iomanip>
+#include <vector>
+#include <cstring>
 #include <sys/time.h>
 
 #include "freertos/FreeRTOS.h"
@@ -31,6 +33,10 @@ namespace TelemetryConfig {
     const char* ABLY_CHANNEL = "EcoTele";
     const uint32_t PUBLISH_INTERVAL = 5000; // 5 seconds in milliseconds
     
+    // Payload format: compact binary frames (decoded by maindata.py) or JSON
+    const bool USE_BINARY_FRAMES = true;
+    const uint16_t SAMPLES_PER_FRAME = 1; // samples batched into one MQTT publish
+    
     // Ably MQTT configuration - SSL version (REQUIRED for API key auth)
     const char* MQTT_BROKER_HOST = "mqtt.ably.io";
     const int MQTT_BROKER_PORT = 8883; // SSL port
@@ -56,6 +62,7 @@ public:
         int message_id;
         float uptime_seconds;
         std::string timestamp;
+        uint64_t timestamp_ms;
     };
 
     SensorData data;
@@ -87,6 +94,113 @@ public:
     }
 };
 
+// Versioned binary telemetry frame, mirrored by decode_telemetry_frame() in
+// maindata.py. All values are little-endian (native on the ESP32).
+//   header: magic "ET" | version u8 | flags u8 | field mask u32 |
+//           sample count u16 | sample size u16
+//   sample: timestamp_ms u64 | message_id u32 | fields selected by the mask
+class TelemetryFrameEncoder {
+public:
+    static constexpr uint8_t VERSION = 1;
+    static constexpr size_t HEADER_SIZE = 12;
+    
+    // Field mask bits, in the order the fields are packed
+    enum FieldBit : uint32_t {
+        SPEED_MS = 1u << 0,
+        VOLTAGE_V = 1u << 1,
+        CURRENT_A = 1u << 2,
+        POWER_W = 1u << 3,
+        ENERGY_J = 1u << 4,
+        DISTANCE_M = 1u << 5,
+        LATITUDE = 1u << 6,       // f64
+        LONGITUDE = 1u << 7,      // f64
+        ALTITUDE = 1u << 8,
+        GYRO_X = 1u << 9,
+        GYRO_Y = 1u << 10,
+        GYRO_Z = 1u << 11,
+        ACCEL_X = 1u << 12,
+        ACCEL_Y = 1u << 13,
+        ACCEL_Z = 1u << 14,
+        TOTAL_ACCELERATION = 1u << 15,
+        UPTIME_SECONDS = 1u << 16,
+    };
+    
+    // The simulator has no altitude source, so that field is left out
+    static constexpr uint32_t FIELD_MASK =
+        SPEED_MS | VOLTAGE_V | CURRENT_A | POWER_W | ENERGY_J | DISTANCE_M |
+        LATITUDE | LONGITUDE | GYRO_X | GYRO_Y | GYRO_Z |
+        ACCEL_X | ACCEL_Y | ACCEL_Z | TOTAL_ACCELERATION | UPTIME_SECONDS;
+    
+    // u64 timestamp + u32 id + 2 x f64 (lat/lon) + 14 x f32
+    static constexpr uint16_t SAMPLE_SIZE = 8 + 4 + 2 * 8 + 14 * 4;
+    
+    explicit TelemetryFrameEncoder(uint16_t max_samples) : max_samples(max_samples), sample_count(0) {
+        buffer.reserve(HEADER_SIZE + static_cast<size_t>(max_samples) * SAMPLE_SIZE);
+        reset();
+    }
+    
+    void reset() {
+        buffer.assign(HEADER_SIZE, 0);
+        sample_count = 0;
+    }
+    
+    bool add(const TelemetryData::SensorData& d) {
+        if (sample_count >= max_samples) {
+            return false;
+        }
+        put<uint64_t>(d.timestamp_ms);
+        put<uint32_t>(static_cast<uint32_t>(d.message_id));
+        put<float>(d.speed_ms);
+        put<float>(d.voltage_v);
+        put<float>(d.current_a);
+        put<float>(d.power_w);
+        put<float>(d.energy_j);
+        put<float>(d.distance_m);
+        put<double>(d.latitude);
+        put<double>(d.longitude);
+        put<float>(d.gyro_x);
+        put<float>(d.gyro_y);
+        put<float>(d.gyro_z);
+        put<float>(d.accel_x);
+        put<float>(d.accel_y);
+        put<float>(d.accel_z);
+        put<float>(d.total_acceleration);
+        put<float>(d.uptime_seconds);
+        sample_count++;
+        return true;
+    }
+    
+    bool full() const { return sample_count >= max_samples; }
+    uint16_t count() const { return sample_count; }
+    
+    // Finalizes the header; the returned bytes stay valid until reset()/add()
+    const std::vector<uint8_t>& finish() {
+        uint8_t* header = buffer.data();
+        header[0] = 'E';
+        header[1] = 'T';
+        header[2] = VERSION;
+        header[3] = 0; // flags (reserved)
+        uint32_t mask = FIELD_MASK;
+        std::memcpy(header + 4, &mask, sizeof(mask));
+        std::memcpy(header + 8, &sample_count, sizeof(sample_count));
+        uint16_t sample_size = SAMPLE_SIZE;
+        std::memcpy(header + 10, &sample_size, sizeof(sample_size));
+        return buffer;
+    }
+    
+private:
+    std::vector<uint8_t> buffer;
+    uint16_t max_samples;
+    uint16_t sample_count;
+    
+    template <typename T>
+    void put(T value) {
+        uint8_t bytes[sizeof(T)];
+        std::memcpy(bytes, &value, sizeof(T));
+        buffer.insert(buffer.end(), bytes, bytes + sizeof(T));
+    }
+};
+
 class RandomGenerator {
 private:
     std::mt19937 gen;
@@ -140,6 +254,12 @@ private:
         return oss.str();
     }
     
+    static uint64_t getEpochMillis() {
+        struct timeval tv;
+        gettimeofday(&tv, nullptr);
+        return static_cast<uint64_t>(tv.tv_sec) * 1000ULL + tv.tv_usec / 1000;
+    }
+    
 public:
     TelemetrySimulator() : simulation_time(0.0f), cumulative_energy(0.0f), 
                           cumulative_distance(0.0f), vehicle_heading(0.0f),
@@ -149,6 +269,7 @@ public:
     TelemetryData generateTelemetryData() {
         TelemetryData telemetry;
         telemetry.data.timestamp = getISOTimestamp();
+        telemetry.data.timestamp_ms = getEpochMillis();
         
         // Generate realistic speed (0-25 m/s with variations)
         float base_speed = 15.0f + 5.0f * std::sin(simulation_time * 0.1f);
@@ -350,6 +471,25 @@ public:
     }
     
     bool publish(const TelemetryData& telemetry) {
+        auto json = telemetry.toJSON();
+        std::unique_ptr<char, decltype(&free)> json_string(cJSON_PrintUnformatted(json.get()), free);
+        
+        if (!json_string) {
+            ESP_LOGE(TAG, "Failed to create JSON string");
+            return false;
+        }
+        
+        return publishPayload(json_string.get(), 0);
+    }
+    
+    bool publishFrame(TelemetryFrameEncoder& encoder) {
+        const std::vector<uint8_t>& frame = encoder.finish();
+        return publishPayload(reinterpret_cast<const char*>(frame.data()),
+                              static_cast<int>(frame.size()));
+    }
+    
+    // len == 0 publishes a NUL-terminated string
+    bool publishPayload(const char* payload, int len) {
         if (!client) {
             ESP_LOGE(TAG, "MQTT client not initialized");
             return false;
@@ -363,16 +503,8 @@ public:
             return false;
         }
         
-        auto json = telemetry.toJSON();
-        std::unique_ptr<char, decltype(&free)> json_string(cJSON_Print(json.get()), free);
-        
-        if (!json_string) {
-            ESP_LOGE(TAG, "Failed to create JSON string");
-            return false;
-        }
-        
         int msg_id = esp_mqtt_client_publish(client, TelemetryConfig::ABLY_CHANNEL, 
-                                           json_string.get(), 0, 0, 0);
+                                           payload, len, 0, 0);
         
         if (msg_id >= 0) {
             ESP_LOGI(TAG, "Telemetry published successfully, msg_id=%d", msg_id);
@@ -474,6 +606,7 @@ private:
     WiFiManager wifi_manager;
     MQTTClient mqtt_client;
     TelemetrySimulator simulator;
+    TelemetryFrameEncoder frame_encoder{TelemetryConfig::SAMPLES_PER_FRAME};
     
 public:
     void run() {
@@ -498,12 +631,19 @@ public:
             TelemetryData telemetry = simulator.generateTelemetryData();
             
             // Send via MQTT
-            mqtt_client.publish(telemetry);
+            if (TelemetryConfig::USE_BINARY_FRAMES) {
+                frame_encoder.add(telemetry.data);
+                if (frame_encoder.full()) {
+                    mqtt_client.publishFrame(frame_encoder);
+                    frame_encoder.reset();
+                }
+            } else {
+                mqtt_client.publish(telemetry);
+            }
             
             // Log telemetry data locally
-            auto json = telemetry.toJSON();
-            std::unique_ptr<char, decltype(&free)> json_string(cJSON_Print(json.get()), free);
-            ESP_LOGI(TAG, "Generated telemetry: %s", json_string.get());
+            ESP_LOGI(TAG, "Generated telemetry #%d: speed=%.2f m/s, power=%.2f W",
+                     telemetry.data.message_id, telemetry.data.speed_ms, telemetry.data.power_w);
             
             // Wait for next iteration
             vTaskDelay(pdMS_TO_TICKS(TelemetryConfig::PUBLISH_INTERVAL));
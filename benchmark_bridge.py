@@ -0,0 +1,393 @@
+"""
+Offline end-to-end benchmark for the telemetry bridge.
+
+Runs TelemetryBridgeWithDB against an in-process fake realtime channel and a
+local fake PostgREST server (in a child process, so its CPU and memory are
+not counted), feeding it the seeded load generator at fixed rates. Prints
+one JSON document with throughput, p50/p99 latency, CPU and RSS per
+scenario.
+
+    python benchmark_bridge.py --rates 100 1000 --vehicles 1 10 --output bench.json
+    python benchmark_bridge.py --baseline bench.json   # compare with an earlier run
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, List
+
+import numpy as np
+
+import maindata
+from maindata import (
+    SUPABASE_TABLE_NAME,
+    LoadGenerator,
+    TelemetryBridgeWithDB,
+    TelemetryWAL,
+    create_client,
+    decode_columnar_frame,
+    parse_timestamps_us,
+)
+
+# Benchmark configuration
+BENCHMARK_DURATION = 10.0  # seconds of load per scenario
+BENCHMARK_API_KEY = "benchmark-anon-key"
+BENCHMARK_SCHEMA_VERSION = 1
+SERVER_START_TIMEOUT = 10.0
+
+logger = logging.getLogger("BridgeBenchmark")
+
+
+def _now_us() -> int:
+    return time.time_ns() // 1000
+
+
+def _percentiles_ms(latencies_us: np.ndarray) -> Dict[str, Optional[float]]:
+    if not len(latencies_us):
+        return {"p50_ms": None, "p99_ms": None, "max_ms": None}
+    p50, p99 = np.percentile(latencies_us, [50, 99]) / 1000.0
+    return {"p50_ms": round(float(p50), 3), "p99_ms": round(float(p99), 3),
+            "max_ms": round(float(latencies_us.max()) / 1000.0, 3)}
+
+
+class FakePostgrestHandler(BaseHTTPRequestHandler):
+    """Accepts PostgREST upserts, ignoring duplicate (session_id, boot_epoch, message_id) rows"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server = self.server
+        if not self.path.startswith(f"/rest/v1/{SUPABASE_TABLE_NAME}?"):
+            # Summary tables (rollups) are accepted but not counted
+            self.send_response(201)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"[]")
+            return
+        if server.insert_delay:
+            time.sleep(server.insert_delay)
+
+        rows = json.loads(body) if body else []
+        if isinstance(rows, dict):
+            rows = [rows]
+        received_us = _now_us()
+        timestamps = parse_timestamps_us([row.get("timestamp") for row in rows], received_us)
+
+        with server.lock:
+            inserted = []
+            for row in rows:
+                key = (row.get("session_id"), row.get("boot_epoch"), row.get("message_id"))
+                if key not in server.keys:
+                    server.keys.add(key)
+                    inserted.append(row)
+            server.requests += 1
+            server.latencies_us.append(received_us - timestamps)
+
+        payload = json.dumps(
+            inserted if "return=representation" in self.headers.get("Prefer", "") else []
+        ).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path != "/stats":
+            self.send_error(404)
+            return
+        server = self.server
+        with server.lock:
+            latencies = (np.concatenate(server.latencies_us)
+                         if server.latencies_us else np.zeros(0))
+            stats = {"rows": len(server.keys), "requests": server.requests,
+                     **_percentiles_ms(latencies)}
+        payload = json.dumps(stats).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_fake_postgrest(port_queue, insert_delay: float):
+    """Child-process entry point: serve until terminated"""
+    import threading
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakePostgrestHandler)
+    server.insert_delay = insert_delay
+    server.lock = threading.Lock()
+    server.keys = set()
+    server.requests = 0
+    server.latencies_us = []
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+class FakeRealtimeChannel:
+    """In-process stand-in for the Ably dashboard channel"""
+
+    def __init__(self, publish_delay: float = 0.0):
+        self.publish_delay = publish_delay
+        self.publish_calls = 0
+        self.messages = 0
+        self.samples = 0
+        self.latencies_us = []
+
+    async def publish(self, messages):
+        if self.publish_delay:
+            await asyncio.sleep(self.publish_delay)
+        received_us = _now_us()
+        self.publish_calls += 1
+        self.messages += len(messages)
+
+        timestamps = []
+        for message in messages:
+            if message['name'] == 'telemetry_columnar':
+                batch = decode_columnar_frame(message['data'])
+                timestamps.append(np.asarray(batch.columns['timestamp_us'], dtype=np.int64))
+            else:
+                timestamps.append(parse_timestamps_us([message['data']['timestamp']],
+                                                      received_us))
+        timestamps = np.concatenate(timestamps)
+        self.samples += len(timestamps)
+        self.latencies_us.append(received_us - timestamps)
+
+
+class BenchmarkBridge(TelemetryBridgeWithDB):
+    """Bridge wired to the fake channel and fake PostgREST server"""
+
+    def __init__(self, supabase_url: str, channel: FakeRealtimeChannel,
+                 work_dir: str, load_generator: LoadGenerator, workers: int = 0):
+        super().__init__(mock_mode=True, session_name="M Benchmark",
+                         load_generator=load_generator, workers=workers)
+        self.supabase_url = supabase_url
+        self.fake_channel = channel
+        self.wal = TelemetryWAL(os.path.join(work_dir, "wal"))
+        self.spill_dir = os.path.join(work_dir, "spill")
+
+    async def connect_supabase(self) -> bool:
+        self.supabase_client = create_client(self.supabase_url, BENCHMARK_API_KEY)
+        return True
+
+    async def connect_dashboard_publisher(self) -> bool:
+        self.dashboard_channel = self.fake_channel
+        return True
+
+    async def print_stats(self):
+        # The 30 s stats loop would hold up every scenario's shutdown
+        return
+
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+async def run_scenario(scenario: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
+    """Drive one bridge at a fixed rate and collect its numbers"""
+    # Spawn, not fork: the parent already runs the event loop and DB threads
+    context = multiprocessing.get_context("spawn")
+    port_queue = context.Queue()
+    server = context.Process(target=run_fake_postgrest,
+                             args=(port_queue, args.insert_delay_ms / 1000.0),
+                             daemon=True)
+    server.start()
+    port = port_queue.get(timeout=SERVER_START_TIMEOUT)
+    supabase_url = f"http://127.0.0.1:{port}"
+
+    channel = FakeRealtimeChannel(args.publish_delay_ms / 1000.0)
+    generator = LoadGenerator(scenario["rate_hz"], scenario["vehicles"], args.seed,
+                              scenario["payload_format"],
+                              samples_per_frame=scenario["samples_per_frame"])
+    try:
+        with tempfile.TemporaryDirectory(prefix="bridge-bench-") as work_dir:
+            bridge = BenchmarkBridge(supabase_url, channel, work_dir, generator,
+                                     scenario["workers"])
+            bridge.dashboard_wire_format = scenario["wire_format"]
+
+            cpu_start = _cpu_seconds()
+            wall_start = time.perf_counter()
+            task = asyncio.create_task(bridge.run())
+            await asyncio.sleep(args.duration)
+            load_wall = time.perf_counter() - wall_start
+            received = bridge.stats["messages_received"]
+
+            bridge.running = False
+            await task
+            wall = time.perf_counter() - wall_start
+            cpu = _cpu_seconds() - cpu_start
+
+        with urllib.request.urlopen(f"{supabase_url}/stats") as response:
+            db_stats = json.loads(response.read())
+    finally:
+        server.terminate()
+        server.join()
+
+    publish_latencies = (np.concatenate(channel.latencies_us)
+                         if channel.latencies_us else np.zeros(0))
+    offered = generator.ticks * generator.vehicles
+    return {
+        **scenario,
+        "duration_s": round(load_wall, 3),
+        "samples_offered": offered,
+        "samples_received": bridge.stats["messages_received"],
+        "samples_published": channel.samples,
+        "samples_stored": db_stats["rows"],
+        "throughput_per_s": round(received / load_wall, 1),
+        "publish_calls": channel.publish_calls,
+        "db_requests": db_stats["requests"],
+        "publish_latency": _percentiles_ms(publish_latencies),
+        "db_latency": {key: db_stats[key] for key in ("p50_ms", "p99_ms", "max_ms")},
+        "cpu_percent": round(100.0 * cpu / wall, 1),
+        "rss_mb": round(_rss_mb(), 1),
+        "rss_peak_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+        "lost_samples": offered - db_stats["rows"],
+        "worker_utilization": round(bridge.stats["workers"]["utilization"], 3),
+        "errors": bridge.stats["errors"],
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_with_baseline(results: Dict[str, Any], baseline_path: str) -> List[str]:
+    """Throughput and p99 changes against an earlier results file"""
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    def key(scenario):
+        return (scenario["rate_hz"], scenario["vehicles"], scenario["payload_format"],
+                scenario["samples_per_frame"], scenario["wire_format"],
+                scenario.get("workers", 0))
+
+    previous = {key(scenario): scenario for scenario in baseline.get("scenarios", [])}
+    lines = []
+    for scenario in results["scenarios"]:
+        old = previous.get(key(scenario))
+        if old is None:
+            continue
+        parts = [f"{scenario['rate_hz']:g} Hz x {scenario['vehicles']} "
+                 f"{scenario['payload_format']}/{scenario['wire_format']}:"]
+        for label, new_value, old_value in (
+            ("throughput", scenario["throughput_per_s"], old["throughput_per_s"]),
+            ("publish p99", scenario["publish_latency"]["p99_ms"], old["publish_latency"]["p99_ms"]),
+            ("db p99", scenario["db_latency"]["p99_ms"], old["db_latency"]["p99_ms"]),
+            ("cpu", scenario["cpu_percent"], old["cpu_percent"]),
+        ):
+            if new_value is None or not old_value:
+                continue
+            parts.append(f"{label} {100.0 * (new_value - old_value) / old_value:+.1f}%")
+        lines.append(" ".join(parts))
+    return lines
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline benchmark of the telemetry bridge")
+    parser.add_argument("--rates", type=float, nargs="+", default=[100.0, 1000.0],
+                        help="samples per second per vehicle")
+    parser.add_argument("--vehicles", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--payload-formats", nargs="+", choices=("frame", "json"),
+                        default=["frame", "json"])
+    parser.add_argument("--samples-per-frame", type=int, nargs="+", default=[None],
+                        help="frame sizes to test (frame payloads only)")
+    parser.add_argument("--wire-formats", nargs="+", choices=("json", "columnar"),
+                        default=["json"], help="dashboard wire formats to test")
+    parser.add_argument("--workers", nargs="+", type=int, default=[0],
+                        help="ingest worker process counts to test (0: on the event loop)")
+    parser.add_argument("--duration", type=float, default=BENCHMARK_DURATION,
+                        help="seconds of load per scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--publish-delay-ms", type=float, default=0.0,
+                        help="simulated latency of each realtime publish")
+    parser.add_argument("--insert-delay-ms", type=float, default=0.0,
+                        help="simulated latency of each PostgREST request")
+    parser.add_argument("--output", help="write the JSON results here as well as to stdout")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show bridge logs")
+    return parser.parse_args(argv)
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    # Keep the benchmark off the real metrics port
+    maindata.METRICS_PORT = None
+
+    scenarios = []
+    for payload_format in args.payload_formats:
+        frame_sizes = args.samples_per_frame if payload_format == "frame" else [None]
+        for rate_hz in args.rates:
+            for vehicles in args.vehicles:
+                for samples_per_frame in frame_sizes:
+                    for wire_format in args.wire_formats:
+                        for workers in args.workers:
+                            scenarios.append({
+                                "rate_hz": rate_hz,
+                                "vehicles": vehicles,
+                                "payload_format": payload_format,
+                                "samples_per_frame": samples_per_frame,
+                                "wire_format": wire_format,
+                                "workers": workers,
+                            })
+
+    results = []
+    for scenario in scenarios:
+        logger.info(f"🏋️ {scenario}")
+        results.append(await run_scenario(scenario, args))
+
+    return {
+        "schema_version": BENCHMARK_SCHEMA_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "json_backend": maindata.JSON_BACKEND,
+        "cpu_count": os.cpu_count(),
+        "duration_s": args.duration,
+        "seed": args.seed,
+        "scenarios": results,
+    }
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+    if not args.verbose:
+        logging.getLogger("maindata").setLevel(logging.WARNING)
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results = asyncio.run(main(args))
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    if args.baseline:
+        for line in compare_with_baseline(results, args.baseline):
+            logger.info(f"📈 {line}")
@@ -1,17 +1,73 @@
+import argparse
 import asyncio
+import bisect
+import gzip
 import json
 import logging
 import math
+import os
 import random
 import signal
+import socket
+import sqlite3
 import sys
 import time
+import tracemalloc
 import uuid
-from datetime import datetime, timezone
-from typing import Dict, Any, Optional, List
+import zlib
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from types import SimpleNamespace
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, List, Tuple, Union, Iterable, Iterator
 import threading
-import queue
 import struct
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+
+try:
+    import numpy as np
+except ImportError:
+    print("Error: NumPy library not installed. Run: pip install numpy")
+    sys.exit(1)
+
+# Optional zstd compression for the compact dashboard wire format
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Optional local storage sinks
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+# Optional MQTT transport for a local trackside broker
+try:
+    import paho.mqtt.client as paho_mqtt
+    PAHO_AVAILABLE = True
+except ImportError:
+    PAHO_AVAILABLE = False
+
+# Optional faster JSON backend
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 try:
     from ably import AblyRealtime
@@ -32,6 +88,40 @@ ESP32_CHANNEL_NAME = "EcoTele"
 # Configuration for Dashboard output (existing configuration)
 DASHBOARD_ABLY_API_KEY = "DxuYSw.fQHpug:sa4tOcqWDkYBW9ht56s7fT0G091R1fyXQc6mc8WthxQ"
 DASHBOARD_CHANNEL_NAME = "telemetry-dashboard-channel"
+# "json": one 'telemetry_update' dict per sample (default, any dashboard)
+# "columnar": one compact 'telemetry_columnar' frame per publish (dashboard_080+)
+DASHBOARD_WIRE_FORMAT = "json"
+DASHBOARD_COMPRESSION = "zlib"  # columnar frames only: "none", "zlib" or "zstd"
+# Coalesced output tiers (channel name -> interval in seconds) for screens
+# that do not need every sample. Each tier gets one 'telemetry_coalesced'
+# message per session and interval: the latest sample plus min/max/mean of
+# every field since the previous message. DASHBOARD_CHANNEL_NAME always
+# carries the full rate.
+DASHBOARD_TIERS = {
+    "telemetry-dashboard-channel-2hz": 0.5,
+    "telemetry-dashboard-channel-1hz": 1.0,
+}
+
+# Transports for the ESP32 input and the dashboard output. "ably" is the
+# cloud; "mqtt" (local broker, needs paho-mqtt), "udp" (LAN multicast) and
+# "inprocess" (same Python process) keep trackside traffic off the internet.
+# With several output transports the first is published to directly and the
+# rest are fed asynchronously from bounded queues, e.g. ("udp", "ably").
+INPUT_TRANSPORT = "ably"
+OUTPUT_TRANSPORTS = ("ably",)
+SECONDARY_QUEUE_CAPACITY = 10000  # messages queued per secondary output channel
+ABLY_CONNECT_TIMEOUT = 10.0  # seconds - Ably keeps reconnecting on its own after this
+MQTT_HOST = "127.0.0.1"
+MQTT_PORT = 1883
+MQTT_TOPIC_PREFIX = "ecotele"  # topics are <prefix>/<channel>/<message name>
+UDP_MULTICAST_GROUP = "239.255.67.84"
+UDP_PORT = 47474
+UDP_MULTICAST_TTL = 1  # stay on the local network segment
+UDP_MAX_DATAGRAM = 65000
+# UDP datagram: magic, channel and message name lengths, then the channel
+# name, message name and payload bytes (dicts as JSON)
+UDP_MAGIC = b'ET'
+UDP_ENVELOPE = struct.Struct('<2sBB')
 
 # Supabase configuration
 SUPABASE_URL = "https://dsfmdziehhgmrconjcns.supabase.co"
@@ -40,8 +130,246 @@ SUPABASE_TABLE_NAME = "telemetry"
 
 # Mock data configuration
 MOCK_DATA_INTERVAL = 2.0  # seconds
-DB_BATCH_INTERVAL = 9.0   # seconds - send to database every 9 seconds
-MAX_BATCH_SIZE = 100      # maximum number of records to batch before forcing write
+DB_BATCH_INTERVAL = 9.0   # seconds - maximum age of a buffered record before it is written
+MAX_BATCH_SIZE = 100      # initial number of buffered records that forces a write
+DB_MIN_BATCH_SIZE = 20    # lower bound for the auto-tuned flush size
+DB_MAX_BATCH_SIZE = 2000  # upper bound for the auto-tuned flush size
+DB_TARGET_INSERT_LATENCY = 1.0  # seconds - flush size shrinks above this, grows well below it
+DB_MAX_INFLIGHT_BATCHES = 3  # inserts running concurrently on the DB worker pool
+DB_CONFLICT_COLUMNS = "session_id,boot_epoch,message_id"  # unique key making retried upserts idempotent
+DB_LEGACY_CONFLICT_COLUMNS = "session_id,message_id"  # key of tables created before boot_epoch
+PG_NO_CONFLICT_CONSTRAINT = "42P10"  # Postgres error: no unique constraint matches ON CONFLICT
+PG_MISSING_COLUMN_CODES = ("PGRST204", "42703")  # PostgREST / Postgres: unknown column
+DB_RETRY_ATTEMPTS = 5        # insert attempts per batch before it is spilled to disk
+DB_RETRY_BASE_DELAY = 0.5    # seconds - first retry backoff, doubled per attempt
+DB_RETRY_MAX_DELAY = 30.0    # seconds - backoff cap (full jitter is applied below it)
+DB_RETRY_MEMORY_BUDGET = 5000  # samples held in memory by retrying batches before spilling
+DB_SPILL_DIR = "bridge_spill"  # Supabase spills here, other sinks in a subdirectory each
+DB_SPILL_RETRY_INTERVAL = 5.0  # seconds - between retries of batches that failed to spill
+
+# Storage sinks written on every flush. "supabase" may be combined with
+# local sinks ("sqlite", "parquet", "duckdb"); with a local sink the bridge
+# keeps running when Supabase is unreachable (sync later with --sync-local)
+STORAGE_SINKS = ("supabase",)
+SQLITE_PATH = "telemetry_local.db"
+PARQUET_DIR = "telemetry_parquet"
+PARQUET_ROLL_ROWS = 100000     # a session's part files are compacted into one file at this many rows
+PARQUET_ROLL_SECONDS = 600.0   # ... or once the oldest part is this old
+PARQUET_MAX_OPEN_SESSIONS = 16  # sessions with ids cached in memory; the least recent is compacted and dropped
+DUCKDB_PATH = "telemetry_local.duckdb"
+DB_BUFFER_CAPACITY = 4096  # samples held per DB buffer block before the overflow policy applies
+INGEST_BATCH_WINDOW = 0.01     # seconds - gather raw payloads this long before normalizing
+REPUBLISH_BATCH_WINDOW = 0.02  # seconds - gather samples this long before publishing
+REPUBLISH_MAX_BATCH = 50       # maximum samples per dashboard publish call
+
+# Inter-stage queue limits and what happens at the limit:
+#   "drop_oldest"      the oldest entries make room for new ones
+#   "coalesce_latest"  everything queued is replaced by the newest entry
+#   "block"            the producer waits for the consumer (sources that
+#                      cannot wait, like the Ably callback, drop the oldest)
+# The DB buffer takes "drop_oldest" or "block" (coalescing would lose stored rows)
+QUEUE_POLICIES = ("drop_oldest", "coalesce_latest", "block")
+RAW_INGEST_CAPACITY = 50000  # raw payloads waiting for normalization
+RAW_INGEST_POLICY = "drop_oldest"
+REPUBLISH_QUEUE_CAPACITY = 20000  # samples waiting for the dashboard publisher
+REPUBLISH_QUEUE_POLICY = "coalesce_latest"  # a stalled publisher resumes at the live edge
+DB_BUFFER_POLICY = "drop_oldest"
+
+# Optional worker processes for parsing and normalization (--workers N).
+# Payloads reach them packed in shared memory and columns come back the
+# same way; results are accepted in dispatch order. 0 keeps it in-loop.
+INGEST_WORKERS = 0
+WORKER_MAX_CHUNK_PAYLOADS = 2048  # raw payloads per worker call at most
+WORKER_MAX_INFLIGHT_PER_PROCESS = 2  # dispatched chunks per worker before ingest waits
+WORKER_POOL_MAX_RESTARTS = 3  # broken pools rebuilt before ingest stays in-loop for good
+
+# Columnar layout of the DB buffer: one typed array per telemetry field.
+# timestamp_us holds UTC microseconds since the Unix epoch.
+TELEMETRY_COLUMNS = (
+    ('timestamp_us', np.int64),
+    ('speed_ms', np.float64),
+    ('voltage_v', np.float64),
+    ('current_a', np.float64),
+    ('power_w', np.float64),
+    ('energy_j', np.float64),
+    ('distance_m', np.float64),
+    ('latitude', np.float64),
+    ('longitude', np.float64),
+    ('altitude', np.float64),
+    ('gyro_x', np.float64),
+    ('gyro_y', np.float64),
+    ('gyro_z', np.float64),
+    ('accel_x', np.float64),
+    ('accel_y', np.float64),
+    ('accel_z', np.float64),
+    ('total_acceleration', np.float64),
+    ('message_id', np.int64),
+    ('uptime_seconds', np.float64),
+    ('roll_deg', np.float64),
+    ('pitch_deg', np.float64),
+    ('efficiency_km_per_kwh', np.float64),
+    ('speed_smoothed_ms', np.float64),
+    ('power_smoothed_w', np.float64),
+    ('jerk_ms3', np.float64),
+    ('boot_epoch', np.int64),
+)
+
+# Channels computed once per sample by DerivedChannels (not sent by the
+# transmitter), then stored and republished like sensor fields
+DERIVED_COLUMNS = ('roll_deg', 'pitch_deg', 'efficiency_km_per_kwh',
+                   'speed_smoothed_ms', 'power_smoothed_w', 'jerk_ms3')
+DERIVED_SMOOTHING_SAMPLES = 10  # trailing samples averaged for the smoothed channels
+DERIVED_MIN_POWER_W = 1.0  # efficiency is reported as zero below this draw
+DERIVED_MAX_SESSIONS = 16  # sessions whose trailing state is kept (least recently used dropped)
+# Store the derived channels in Supabase (telemetry and rollup tables). Without
+# the columns from the README the sink detects their absence and leaves them out
+DB_STORE_DERIVED_COLUMNS = True
+# Transmitter restarts seen in the session before each sample, set by
+# MessageIdDeduper. A rebooted ESP32 restarts its message ids, so the epoch
+# is part of the storage key (DB_CONFLICT_COLUMNS)
+BOOT_EPOCH_COLUMN = 'boot_epoch'
+# Columns the bridge fills in itself; payloads never carry them
+BRIDGE_COLUMNS = DERIVED_COLUMNS + (BOOT_EPOCH_COLUMN,)
+
+# Buffer fields whose Supabase column name differs
+DB_COLUMN_NAMES = {'altitude': 'altitude_m'}
+
+# Ingest deduplication: message ids seen recently are remembered per session
+# in a fixed ring of uptime slots; ids behind the window cannot be checked and pass
+DEDUP_WINDOW = 65536  # message ids remembered per session
+DEDUP_MAX_SESSIONS = 16  # least recently used session windows are dropped beyond this
+MESSAGE_ID_MODULUS = 1 << 32  # the transmitter's message_id is a wrapping uint32
+DEDUP_UPTIME_TOLERANCE_S = 0.005  # a repeated id whose uptime differs by more is a sender restart
+
+# Streaming rollups: min/max/mean/last/count of every field per time bucket,
+# upserted to their own table on the DB flush cadence
+ROLLUP_TABLE_NAME = "telemetry_rollups"
+ROLLUP_RESOLUTIONS = (1, 10, 60)  # bucket widths in seconds
+ROLLUP_FIELDS = tuple(name for name, _ in TELEMETRY_COLUMNS
+                      if name not in ('timestamp_us', 'message_id', BOOT_EPOCH_COLUMN))
+ROLLUP_CONFLICT_COLUMNS = "session_id,resolution_s,bucket_start"
+ROLLUP_GRACE_SECONDS = 30.0  # buckets stay open this long past their end for late samples
+ROLLUP_MAX_PENDING_ROWS = 20000  # unwritten rows kept across failed writes
+
+# Sessions catalog: one row per session (time span, row count, KPIs),
+# upserted with the rollups so listing sessions is a single small query
+SESSIONS_TABLE_NAME = "sessions"
+
+# Local write-ahead log for samples not yet confirmed by Supabase
+WAL_DIR = "bridge_wal"
+WAL_SEGMENT_BYTES = 8 * 1024 * 1024  # rotate to a new segment file at this size
+WAL_FSYNC_INTERVAL = 0.2  # seconds - WAL appends are fsynced in groups this often
+
+# Raw-traffic captures (--record / --replay): a magic line, then per payload
+# its arrival time (epoch us), kind (0 bytes, 1 str, 2 dict as JSON) and
+# length, followed by the payload bytes. Paths ending in .gz are gzipped.
+CAPTURE_MAGIC = b'ETCAP1\n'
+CAPTURE_RECORD_HEADER = struct.Struct('<qBI')
+REPLAY_CHUNK_PAYLOADS = 1000  # payloads read from the source at a time
+REPLAY_MAX_BACKLOG = 20000  # queued payloads/batches at which a max-speed replay waits
+REPLAY_PAGE_SIZE = 1000  # rows per request when replaying a stored session
+
+# Local Prometheus-style metrics endpoint (METRICS_PORT = None disables it)
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+LATENCY_STAGES = ('parse', 'normalize', 'queue_wait', 'publish', 'db_commit',
+                  'end_to_end_publish', 'end_to_end_db')
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)  # seconds
+
+# Runtime profiling (opt-in): SIGUSR1 or --profile samples every thread's
+# stack, SIGUSR2 or --trace-allocations runs tracemalloc. A second signal (or
+# shutdown) writes the collapsed stacks / top allocation sites to PROFILE_DIR
+PROFILE_DIR = "bridge_profiles"
+PROFILE_SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+PROFILE_TOP_ALLOCATIONS = 50  # allocation sites written per report
+PROFILE_TRACEMALLOC_FRAMES = 10  # frames kept per allocation traceback
+LOOP_LAG_INTERVAL = 0.5  # seconds between event-loop lag probes
+
+# Load-generator mode (python maindata.py --load-test ...)
+LOAD_MIN_RATE_HZ = 1.0  # samples per second per vehicle
+LOAD_MAX_RATE_HZ = 1000.0
+LOAD_TICK_INTERVAL = 0.01  # seconds between generated chunks
+LOAD_MAX_CATCH_UP = 0.5  # seconds of samples generated at most per chunk
+LOAD_STEP_SECONDS = 10.0  # measurement (and ramp) step length
+LOAD_RAMP_FACTOR = 2.0
+LOAD_SUSTAINED_RATIO = 0.95  # processed / offered needed to call a rate sustainable
+
+# Versioned binary telemetry frame (TelemetryFrameEncoder in Transmiter.cpp).
+# Header: magic, version, flags, field mask, sample count, bytes per sample.
+# Each sample is packed little-endian: timestamp_ms (u64), message_id (u32),
+# then every FRAME_FIELDS entry whose bit is set in the field mask, in order.
+FRAME_MAGIC = b'ET'
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct('<2sBBIHH')
+FRAME_FIELDS = (
+    ('speed_ms', '<f4'),
+    ('voltage_v', '<f4'),
+    ('current_a', '<f4'),
+    ('power_w', '<f4'),
+    ('energy_j', '<f4'),
+    ('distance_m', '<f4'),
+    ('latitude', '<f8'),
+    ('longitude', '<f8'),
+    ('altitude', '<f4'),
+    ('gyro_x', '<f4'),
+    ('gyro_y', '<f4'),
+    ('gyro_z', '<f4'),
+    ('accel_x', '<f4'),
+    ('accel_y', '<f4'),
+    ('accel_z', '<f4'),
+    ('total_acceleration', '<f4'),
+    ('uptime_seconds', '<f4'),
+)
+FRAME_FULL_MASK = (1 << len(FRAME_FIELDS)) - 1
+FRAME_MIN_VALID_TIMESTAMP_MS = 946684800000  # 2000-01-01; earlier means the clock is unsynced
+
+# Compact columnar frame for the dashboard channel (decoded by
+# decode_columnar_frame in dashboard_080.py). Header: magic, version, schema
+# id, compression, sample count. The body (optionally compressed) holds the
+# session id, session name and data source as length-prefixed UTF-8, then
+# each schema column's raw little-endian bytes.
+COLUMNAR_MAGIC = b'EC'
+COLUMNAR_VERSION = 1
+COLUMNAR_HEADER = struct.Struct('<2sBBBI')
+COLUMNAR_SCHEMAS = {
+    1: (
+        ('timestamp_us', '<i8'),
+        ('speed_ms', '<f4'),
+        ('voltage_v', '<f4'),
+        ('current_a', '<f4'),
+        ('power_w', '<f4'),
+        ('energy_j', '<f4'),
+        ('distance_m', '<f4'),
+        ('latitude', '<f8'),
+        ('longitude', '<f8'),
+        ('altitude', '<f4'),
+        ('gyro_x', '<f4'),
+        ('gyro_y', '<f4'),
+        ('gyro_z', '<f4'),
+        ('accel_x', '<f4'),
+        ('accel_y', '<f4'),
+        ('accel_z', '<f4'),
+        ('total_acceleration', '<f4'),
+        ('message_id', '<u4'),
+        ('uptime_seconds', '<f4'),
+    ),
+}
+# Schema 2 adds the bridge-derived channels
+COLUMNAR_SCHEMAS[2] = COLUMNAR_SCHEMAS[1] + tuple((name, '<f4') for name in DERIVED_COLUMNS)
+COLUMNAR_SCHEMA_ID = 2
+COLUMNAR_COMPRESSION_IDS = {'none': 0, 'zlib': 1, 'zstd': 2}
+
+# Legacy fixed-size binary message: speed, voltage, current, lat, lon,
+# altitude, message_id
+LEGACY_BINARY_FORMAT = "<ffffffI"
+LEGACY_BINARY_FIELDS = ('speed_ms', 'voltage_v', 'current_a', 'latitude',
+                        'longitude', 'altitude', 'message_id')
+LEGACY_BINARY_SIZE = struct.calcsize(LEGACY_BINARY_FORMAT)
+
+# Payload formats recognised by the ingest dispatcher
+PAYLOAD_FORMATS = ('json', 'frame', 'legacy_binary', 'dict', 'unknown')
+JSON_LEADING_BYTES = frozenset(b'{[ \t\r\n')
 
 # Logging setup
 logging.basicConfig(
@@ -50,534 +378,4594 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
-class TelemetryBridgeWithDB:
+
+def iso_to_epoch_us(timestamp: str) -> int:
+    """Convert an ISO-8601 timestamp to UTC microseconds since the epoch"""
+    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - UNIX_EPOCH) // timedelta(microseconds=1)
+
+
+def epoch_us_to_iso(timestamps_us: np.ndarray) -> List[str]:
+    """Format an array of epoch microseconds as ISO-8601 UTC strings"""
+    return np.datetime_as_string(
+        timestamps_us.astype('datetime64[us]'), unit='us', timezone='UTC'
+    ).tolist()
+
+
+def parse_timestamps_us(values: List[Any], now_us: int) -> np.ndarray:
     """
-    Bridge class that:
-    1. Subscribes to ESP32 MQTT telemetry data via Ably OR generates mock data
-    2. Republishes to dashboard channel for real-time updates
-    3. Batches and stores data in Supabase database every 9 seconds
-    4. Manages sessions for historical data retrieval
+    Parse a column of ISO-8601 timestamps into epoch microseconds.
+
+    Missing, non-string, unparseable and 1970 (unsynced clock) timestamps are
+    replaced by ``now_us``. UTC strings are parsed in one vectorized call;
+    only strings with other offsets fall back to ``datetime.fromisoformat``.
     """
+    timestamps = np.full(len(values), now_us, dtype=np.int64)
+    indices = []
+    cleaned = []
+    offset_indices = []
+    for index, value in enumerate(values):
+        if not isinstance(value, str) or value.startswith('1970-01-01'):
+            continue
+        if value.endswith('Z'):
+            value = value[:-1]
+        elif value.endswith('+00:00'):
+            value = value[:-6]
+        elif len(value) > 19 and value[-6] in '+-' and value[-3] == ':':
+            offset_indices.append(index)
+            continue
+        indices.append(index)
+        cleaned.append(value)
 
-    def __init__(self, mock_mode: bool = False, session_name: Optional[str] = None):
-        self.mock_mode = mock_mode
-        self.esp32_client = None
-        self.dashboard_client = None
-        self.supabase_client = None
-        self.esp32_channel = None
-        self.dashboard_channel = None
-        self.running = False
-        self.message_queue = queue.Queue()
-        self.db_buffer = []
-        self.db_buffer_lock = threading.Lock()
-        self.session_id = str(uuid.uuid4())
-        self.session_start_time = datetime.now(timezone.utc)
+    if cleaned:
+        try:
+            parsed = np.array(cleaned, dtype='datetime64[us]').astype(np.int64)
+            timestamps[indices] = parsed
+        except ValueError:
+            offset_indices.extend(indices)
 
-        # Session name (user supplied). If None, use a generated default.
-        if session_name and session_name.strip():
-            self.session_name = session_name.strip()
+    for index in offset_indices:
+        try:
+            timestamps[index] = iso_to_epoch_us(values[index])
+        except ValueError:
+            pass
+
+    return timestamps
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def normalize_telemetry_records(records: List[Dict[str, Any]],
+                                now_us: int) -> Dict[str, np.ndarray]:
+    """
+    Normalize N raw telemetry messages into typed columns.
+
+    Missing or null fields default to zero, timestamps are parsed to epoch
+    microseconds, and power_w / total_acceleration are derived where the
+    message left them out or at zero.
+    """
+    columns = {
+        'timestamp_us': parse_timestamps_us(
+            [record.get('timestamp') for record in records], now_us
+        )
+    }
+    for name, dtype in TELEMETRY_COLUMNS[1:]:
+        values = [record.get(name) for record in records]
+        try:
+            column = np.array(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            column = np.array([_to_float(value) for value in values],
+                              dtype=np.float64)
+        column[np.isnan(column)] = 0.0
+        columns[name] = column.astype(dtype, copy=False)
+
+    derive_telemetry_columns(columns)
+    return columns
+
+
+def derive_telemetry_columns(columns: Dict[str, np.ndarray]):
+    """Fill power and acceleration magnitude where they were not reported"""
+    power = columns['power_w']
+    missing_power = power == 0
+    power[missing_power] = (columns['voltage_v'][missing_power]
+                            * columns['current_a'][missing_power])
+
+    total_acceleration = columns['total_acceleration']
+    missing_acceleration = total_acceleration == 0
+    total_acceleration[missing_acceleration] = np.sqrt(
+        columns['accel_x'][missing_acceleration] ** 2
+        + columns['accel_y'][missing_acceleration] ** 2
+        + columns['accel_z'][missing_acceleration] ** 2
+    )
+
+
+if ORJSON_AVAILABLE:
+    JSON_BACKEND = "orjson"
+    json_loads = orjson.loads  # accepts bytes and str without decoding first
+else:
+    JSON_BACKEND = "json"
+    json_loads = json.loads
+
+
+def json_dumps(obj) -> Union[bytes, str]:
+    """Compact JSON with the same backend as json_loads"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'))
+
+
+def sniff_payload_format(payload, legacy_binary_size: int) -> str:
+    """Pick a decoder from the payload type, first byte, magic or length"""
+    if isinstance(payload, (bytes, bytearray)):
+        if not payload:
+            return 'unknown'
+        if payload[0] in JSON_LEADING_BYTES:
+            return 'json'
+        if payload[:2] == FRAME_MAGIC:
+            return 'frame'
+        if len(payload) == legacy_binary_size:
+            return 'legacy_binary'
+        return 'unknown'
+    if isinstance(payload, str):
+        return 'json'
+    if isinstance(payload, dict):
+        return 'dict'
+    return 'unknown'
+
+
+@lru_cache(maxsize=64)
+def frame_sample_dtype(field_mask: int) -> np.dtype:
+    """Packed NumPy dtype of one frame sample for a field mask"""
+    fields = [('timestamp_ms', '<u8'), ('message_id', '<u4')]
+    fields.extend(
+        field for bit, field in enumerate(FRAME_FIELDS) if field_mask & (1 << bit)
+    )
+    return np.dtype(fields)
+
+
+def decode_telemetry_frame(data, now_us: int) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Decode a binary telemetry frame straight into normalized columns.
+
+    Returns None if the payload is not a well-formed frame of a supported
+    version. Fields absent from the mask default to zero.
+    """
+    if len(data) < FRAME_HEADER.size:
+        return None
+    magic, version, _flags, field_mask, count, sample_size = \
+        FRAME_HEADER.unpack_from(data, 0)
+    if magic != FRAME_MAGIC or version != FRAME_VERSION:
+        return None
+
+    dtype = frame_sample_dtype(field_mask & FRAME_FULL_MASK)
+    if (sample_size != dtype.itemsize
+            or len(data) != FRAME_HEADER.size + count * sample_size):
+        return None
+
+    samples = np.frombuffer(data, dtype=dtype, count=count,
+                            offset=FRAME_HEADER.size)
+
+    timestamps_ms = samples['timestamp_ms'].astype(np.int64)
+    columns = {
+        'timestamp_us': np.where(timestamps_ms >= FRAME_MIN_VALID_TIMESTAMP_MS,
+                                 timestamps_ms * 1000, now_us)
+    }
+    for name, column_dtype in TELEMETRY_COLUMNS[1:]:
+        if name in dtype.names:
+            columns[name] = samples[name].astype(column_dtype)
         else:
-            # sensible default if user provided empty name
-            short_id = self.session_id[:8]
-            self.session_name = f"Session {short_id}"
+            columns[name] = np.zeros(count, dtype=column_dtype)
 
-        # Statistics
+    derive_telemetry_columns(columns)
+    return columns
+
+
+def encode_telemetry_frame(columns: Dict[str, np.ndarray],
+                           field_mask: int = FRAME_FULL_MASK) -> bytes:
+    """Pack telemetry columns into a binary frame (inverse of decode_telemetry_frame)"""
+    dtype = frame_sample_dtype(field_mask)
+    count = len(columns['message_id'])
+    samples = np.zeros(count, dtype=dtype)
+    samples['timestamp_ms'] = columns['timestamp_us'] // 1000
+    for name in dtype.names[1:]:
+        samples[name] = columns[name]
+    header = FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, 0, field_mask,
+                               count, dtype.itemsize)
+    return header + samples.tobytes()
+
+
+def concat_columns(pieces: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Concatenate normalized column blocks in order"""
+    if len(pieces) == 1:
+        return pieces[0]
+    return {
+        name: np.concatenate([piece[name] for piece in pieces])
+        for name, _ in TELEMETRY_COLUMNS
+    }
+
+
+def parse_json_message(data) -> Optional[Dict]:
+    """Parse a JSON object from bytes or str"""
+    try:
+        parsed_data = json_loads(data)
+    except (ValueError, UnicodeDecodeError) as e:
+        logger.debug(f"JSON parsing failed: {e}")
+        return None
+
+    if not isinstance(parsed_data, dict):
+        logger.debug(f"JSON payload is a {type(parsed_data).__name__}, not an object")
+        return None
+    logger.debug(f"✅ Successfully parsed JSON message with "
+                 f"{len(parsed_data)} fields")
+    return parsed_data
+
+
+def parse_legacy_binary_message(data_bytes: bytes) -> Optional[Dict]:
+    """Parse a legacy fixed-size binary message"""
+    if len(data_bytes) != LEGACY_BINARY_SIZE:
+        logger.debug(
+            f"Binary message size mismatch. Expected "
+            f"{LEGACY_BINARY_SIZE}, got {len(data_bytes)}"
+        )
+        return None
+
+    try:
+        unpacked_values = struct.unpack(LEGACY_BINARY_FORMAT, data_bytes)
+        data_dict = dict(zip(LEGACY_BINARY_FIELDS, unpacked_values))
+        data_dict['power_w'] = data_dict['voltage_v'] * data_dict['current_a']
+        logger.debug(f"✅ Successfully parsed binary message")
+        return data_dict
+    except struct.error as e:
+        logger.debug(f"Binary parsing failed: {e}")
+        return None
+
+
+def parse_unknown_payload(payload, now_us: int, tried: Optional[str] = None):
+    """
+    Try every decoder in turn for payloads the sniffer cannot place.
+
+    Skips the decoder named by tried; returns the format that decoded the
+    payload (or 'unknown') and its data.
+    """
+    if not isinstance(payload, (bytes, bytearray)):
+        logger.warning(f"⚠️ Unhandled message data type: {type(payload)}")
+        return 'unknown', None
+    decoders = (
+        ('json', parse_json_message),
+        ('frame', lambda data: decode_telemetry_frame(data, now_us)),
+        ('legacy_binary', parse_legacy_binary_message),
+    )
+    for payload_format, decoder in decoders:
+        if payload_format == tried:
+            continue
+        data = decoder(payload)
+        if data is not None:
+            return payload_format, data
+    return 'unknown', None
+
+
+def parse_raw_payload(payload, now_us: int) -> Tuple[str, Optional[Union[Dict, Dict[str, np.ndarray]]]]:
+    """
+    Decode one raw payload with the decoder its format sniffs as.
+
+    Returns the format and a telemetry dict, or already normalized columns
+    for a binary frame (distinguished by their 'timestamp_us' array). The
+    first byte can mislead (a legacy binary message may start with '{' or
+    the frame magic), so bytes the sniffed decoder rejects go through the
+    other decoders before being counted as undecodable.
+    """
+    payload_format = sniff_payload_format(payload, LEGACY_BINARY_SIZE)
+    if payload_format == 'json':
+        data = parse_json_message(payload)
+    elif payload_format == 'frame':
+        data = decode_telemetry_frame(payload, now_us)
+    elif payload_format == 'legacy_binary':
+        data = parse_legacy_binary_message(payload)
+    elif payload_format == 'dict':
+        data = payload
+    else:
+        _, data = parse_unknown_payload(payload, now_us)
+        return payload_format, data
+
+    if data is None and isinstance(payload, (bytes, bytearray)):
+        fallback_format, data = parse_unknown_payload(payload, now_us, tried=payload_format)
+        if data is not None:
+            payload_format = fallback_format
+    return payload_format, data
+
+
+def normalize_raw_payloads(payloads: List[Any], now_us: int) -> Dict[str, Any]:
+    """
+    Parse and normalize raw payloads, in arrival order, into one column block.
+
+    Besides the columns (None when nothing decoded) the result carries what
+    the bridge records about the pass: per-format [count, errors, total_ms],
+    per-payload parse times, decoder exceptions, undecodable payload count
+    and normalization time. It is plain data so a worker process can
+    return it.
+    """
+    decode = {payload_format: [0, 0, 0.0] for payload_format in PAYLOAD_FORMATS}
+    parse_times = []
+    exceptions = []
+    unparsed = 0
+    pieces = []
+    records = []
+    normalize_time = 0.0
+    for payload in payloads:
+        decode_start = time.perf_counter()
+        try:
+            payload_format, data = parse_raw_payload(payload, now_us)
+        except Exception as e:
+            exceptions.append(str(e))
+            continue
+        decode_time = time.perf_counter() - decode_start
+        parse_times.append(decode_time)
+        decode_stats = decode[payload_format]
+        decode_stats[0] += 1
+        decode_stats[2] += decode_time * 1000.0
+
+        if data is None:
+            decode_stats[1] += 1
+            unparsed += 1
+            continue
+
+        if isinstance(data.get('timestamp_us'), np.ndarray):
+            # Binary frame columns; keep arrival order with pending dicts
+            if records:
+                normalize_start = time.perf_counter()
+                pieces.append(normalize_telemetry_records(records, now_us))
+                normalize_time += time.perf_counter() - normalize_start
+                records = []
+            pieces.append(data)
+        else:
+            records.append(data)
+
+    normalize_start = time.perf_counter()
+    if records:
+        pieces.append(normalize_telemetry_records(records, now_us))
+    columns = concat_columns(pieces) if pieces else None
+    return {
+        'columns': columns,
+        'decode': decode,
+        'parse_times': np.asarray(parse_times),
+        'exceptions': exceptions,
+        'unparsed': unparsed,
+        'normalize_time': normalize_time + time.perf_counter() - normalize_start,
+    }
+
+
+def _create_shared_memory(size: int) -> shared_memory.SharedMemory:
+    return shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+
+def encode_payload(payload) -> Tuple[int, bytes]:
+    """Raw payload as (kind, bytes): 0 bytes, 1 str, 2 dict sent as JSON"""
+    if isinstance(payload, (bytes, bytearray)):
+        return 0, bytes(payload)
+    if isinstance(payload, str):
+        return 1, payload.encode()
+    encoded = json_dumps(payload)
+    return 2, encoded.encode() if isinstance(encoded, str) else encoded
+
+
+def decode_payload(kind: int, raw: bytes):
+    """Inverse of encode_payload"""
+    return raw if kind == 0 else raw.decode() if kind == 1 else json_loads(raw)
+
+
+def pack_payloads_to_shared_memory(payloads: List[Any]) -> Tuple[shared_memory.SharedMemory,
+                                                                 np.ndarray, bytes]:
+    """
+    Copy raw payloads into one shared memory block for a worker.
+
+    Returns the block, payload offsets into it and a kind byte per payload
+    (0 bytes, 1 str, 2 dict sent as JSON) so the worker restores the types.
+    """
+    blobs = []
+    kinds = bytearray()
+    for payload in payloads:
+        kind, blob = encode_payload(payload)
+        blobs.append(blob)
+        kinds.append(kind)
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    np.cumsum([len(blob) for blob in blobs], out=offsets[1:])
+    block = _create_shared_memory(int(offsets[-1]))
+    block.buf[:offsets[-1]] = b''.join(blobs)
+    return block, offsets, bytes(kinds)
+
+
+def normalize_in_worker(block_name: str, offsets: np.ndarray, kinds: bytes,
+                        now_us: int) -> Dict[str, Any]:
+    """
+    Worker-process entry point: normalize payloads packed in shared memory.
+
+    The columns are returned in a new shared memory block ('block' and
+    'count'); the caller owns it from then on, copying the columns out and
+    unlinking it.
+    """
+    busy_start = time.perf_counter()
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        payloads = []
+        for index, kind in enumerate(kinds):
+            payloads.append(decode_payload(kind, bytes(block.buf[offsets[index]:offsets[index + 1]])))
+    finally:
+        block.close()
+
+    result = normalize_raw_payloads(payloads, now_us)
+    columns = result.pop('columns')
+    result['block'] = None
+    if columns is not None:
+        count = len(columns['timestamp_us'])
+        out = _create_shared_memory(sum(count * np.dtype(dtype).itemsize
+                                        for _, dtype in TELEMETRY_COLUMNS))
+        if os.name == 'posix':
+            # Handed over to the caller, which unlinks it: the worker must not
+            # report it as leaked (or unlink it) when it exits
+            resource_tracker.unregister(out._name, "shared_memory")
+        position = 0
+        for name, dtype in TELEMETRY_COLUMNS:
+            size = count * np.dtype(dtype).itemsize
+            out.buf[position:position + size] = np.ascontiguousarray(
+                columns[name], dtype=dtype).tobytes()
+            position += size
+        result['block'] = out.name
+        result['count'] = count
+        out.close()
+    result['busy_time'] = time.perf_counter() - busy_start
+    return result
+
+
+def read_columns_from_shared_memory(block_name: str, count: int) -> Dict[str, np.ndarray]:
+    """Copy a worker's result columns out of shared memory and unlink the block"""
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        columns = {}
+        position = 0
+        for name, dtype in TELEMETRY_COLUMNS:
+            columns[name] = np.frombuffer(block.buf, dtype=dtype, count=count,
+                                          offset=position).copy()
+            position += count * np.dtype(dtype).itemsize
+    finally:
+        block.close()
+        block.unlink()
+    return columns
+
+
+class TelemetryBatch:
+    """Typed columns for a block of normalized telemetry samples"""
+
+    def __init__(self, columns: Dict[str, np.ndarray], count: int,
+                 session_id: str, session_name: str,
+                 data_source: Optional[str] = None, block=None,
+                 lsn: Optional[int] = None):
+        self.columns = columns
+        self.count = count
+        self.session_id = session_id
+        self.session_name = session_name
+        self.data_source = data_source
+        # Highest WAL sequence number of the samples in this batch
+        self.lsn = lsn
+        # Backing DB buffer block, handed back once the batch is written
+        self.block = block
+
+    def __len__(self) -> int:
+        return self.count
+
+    def slice(self, start: int, stop: int) -> 'TelemetryBatch':
+        """View of samples [start, stop) sharing this batch's arrays"""
+        stop = min(stop, self.count)
+        return TelemetryBatch(
+            {name: column[start:stop] for name, column in self.columns.items()},
+            stop - start, self.session_id, self.session_name,
+            data_source=self.data_source, lsn=self.lsn,
+        )
+
+    def select(self, mask: np.ndarray) -> 'TelemetryBatch':
+        """Copy of the samples where mask is True"""
+        return TelemetryBatch(
+            {name: column[mask] for name, column in self.columns.items()},
+            int(np.count_nonzero(mask)), self.session_id, self.session_name,
+            data_source=self.data_source, lsn=self.lsn,
+        )
+
+    def _rows(self, column_names: Dict[str, str]) -> List[Dict[str, Any]]:
+        field_names = [name for name, _ in TELEMETRY_COLUMNS[1:]]
+        keys = [column_names.get(name, name) for name in field_names]
+        timestamps = epoch_us_to_iso(self.columns['timestamp_us'])
+        values = [self.columns[name].tolist() for name in field_names]
+
+        return [
+            {
+                'session_id': self.session_id,
+                'session_name': self.session_name,
+                'timestamp': timestamp,
+                **dict(zip(keys, row)),
+            }
+            for timestamp, *row in zip(timestamps, *values)
+        ]
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Build dashboard messages (one dict per sample) from the columns"""
+        records = self._rows({})
+        for record in records:
+            record['data_source'] = self.data_source
+        return records
+
+    def to_db_records(self) -> List[Dict[str, Any]]:
+        """Build Supabase insert rows from the columns"""
+        return self._rows(DB_COLUMN_NAMES)
+
+
+class BoundedStageQueue:
+    """
+    FIFO between two bridge stages, bounded in samples or payloads.
+
+    Entries carry a size; when a put takes the total over capacity the
+    queue's policy (see QUEUE_POLICIES) makes room. One entry is always
+    kept, so an oversized batch still gets through. Under "block" a
+    producer that waited for space may overshoot with its entry; only puts
+    into an already full queue drop the oldest entries.
+    """
+
+    def __init__(self, name: str, capacity: int, policy: str):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"{name}: unknown queue policy {policy!r}")
+        self.name = name
+        self.capacity = capacity
+        self.policy = policy
+        self.size = 0
+        self._entries = deque()  # (item, size)
+        self._not_empty = asyncio.Event()
+        self._has_space = asyncio.Event()
         self.stats = {
-            "messages_received": 0,
-            "messages_republished": 0,
-            "messages_stored_db": 0,
-            "last_message_time": None,
-            "last_db_write_time": None,
-            "errors": 0,
-            "last_error": None,
-            "current_session_id": self.session_id,
-            "current_session_name": self.session_name,
-            "session_start_time": self.session_start_time.isoformat(),
+            "capacity": capacity,
+            "policy": policy,
+            "high_water": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "blocked_seconds": 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, item, size: int = 1):
+        self._entries.append((item, size))
+        self.size += size
+        overshoot_allowed = self.policy == "block" and self.size - size < self.capacity
+        if self.size > self.capacity and len(self._entries) > 1 and not overshoot_allowed:
+            if self.policy == "coalesce_latest":
+                self.stats["coalesced"] += self.size - size
+                self._entries.clear()
+                self._entries.append((item, size))
+                self.size = size
+            else:
+                while self.size > self.capacity and len(self._entries) > 1:
+                    _, dropped = self._entries.popleft()
+                    self.size -= dropped
+                    self.stats["dropped"] += dropped
+        self.stats["high_water"] = max(self.stats["high_water"], self.size)
+        self._not_empty.set()
+
+    def get_nowait(self):
+        if not self._entries:
+            raise asyncio.QueueEmpty
+        item, size = self._entries.popleft()
+        self.size -= size
+        if self.size < self.capacity:
+            self._has_space.set()
+        return item
+
+    def take(self, count: Optional[int] = None) -> List[Any]:
+        """Remove and return up to count entries (all by default), oldest first"""
+        count = len(self._entries) if count is None else min(count, len(self._entries))
+        return [self.get_nowait() for _ in range(count)]
+
+    async def get(self):
+        while not self._entries:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self.get_nowait()
+
+    async def wait_for_space(self, timeout: float = 1.0) -> bool:
+        """Under the block policy, wait until the queue is below capacity; False on timeout"""
+        if self.policy != "block" or self.size < self.capacity:
+            return True
+        blocked_at = time.perf_counter()
+        try:
+            while self.size >= self.capacity:
+                self._has_space.clear()
+                await asyncio.wait_for(self._has_space.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.stats["blocked_seconds"] += time.perf_counter() - blocked_at
+
+
+class ColumnarTelemetryBuffer:
+    """
+    Preallocated columnar ring buffer holding samples until the next DB flush.
+
+    Samples are written into an active block of typed arrays. ``swap()`` hands
+    the filled block to the writer and makes a spare block active (double
+    buffering), so draining never copies. When the active block is full the
+    oldest samples are overwritten; under the "block" policy the bridge
+    stops ingesting until the writer swaps a full block out.
+    """
+
+    def __init__(self, capacity: int, session_id: str, session_name: str,
+                 max_spare_blocks: int = 1, policy: str = DB_BUFFER_POLICY):
+        if policy not in ("drop_oldest", "block"):
+            raise ValueError(f"db_buffer: unsupported queue policy {policy!r}")
+        self.capacity = capacity
+        self.session_id = session_id
+        self.session_name = session_name
+        self.max_spare_blocks = max_spare_blocks
+        self.policy = policy
+        self.overwritten = 0
+        self.high_water = 0
+        self._lock = threading.Lock()
+        self._active = self._allocate_block()
+        self._spare_blocks = [self._allocate_block()]
+        self._head = 0
+        self._count = 0
+        self._oldest_time = None
+        self._max_lsn = None
+
+    def _allocate_block(self) -> Dict[str, np.ndarray]:
+        return {
+            name: np.zeros(self.capacity, dtype=dtype)
+            for name, dtype in TELEMETRY_COLUMNS
         }
 
-        # Binary message parsing (updated for new structure)
-        self.BINARY_FORMAT = "<ffffffI"  # speed, voltage, current, lat, lon,
-        # altitude, message_id
-        self.BINARY_FIELD_NAMES = [
-            'speed_ms',
-            'voltage_v',
-            'current_a',
-            'latitude',
-            'longitude',
-            'altitude',
-            'message_id',
-        ]
-        self.BINARY_MESSAGE_SIZE = struct.calcsize(self.BINARY_FORMAT)
+    def __len__(self) -> int:
+        return self._count
+
+    def oldest_age(self) -> Optional[float]:
+        """Seconds since the oldest unflushed sample was buffered"""
+        oldest_time = self._oldest_time
+        if oldest_time is None:
+            return None
+        return time.monotonic() - oldest_time
+
+    def extend(self, batch: TelemetryBatch):
+        """Append a batch of normalized samples"""
+        count = batch.count
+        columns = batch.columns
+        if count > self.capacity:
+            # Only the newest samples can survive
+            with self._lock:
+                self.overwritten += count - self.capacity
+            columns = {name: column[-self.capacity:]
+                       for name, column in columns.items()}
+            count = self.capacity
+
+        with self._lock:
+            if self._count == 0:
+                self._oldest_time = time.monotonic()
+            start = (self._head + self._count) % self.capacity
+            positions = (start + np.arange(count)) % self.capacity
+            block = self._active
+            for name, _ in TELEMETRY_COLUMNS:
+                block[name][positions] = columns[name]
+
+            if batch.lsn is not None:
+                self._max_lsn = batch.lsn
+
+            overflow = self._count + count - self.capacity
+            if overflow > 0:
+                self._head = (self._head + overflow) % self.capacity
+                self._count = self.capacity
+                self.overwritten += overflow
+            else:
+                self._count += count
+            self.high_water = max(self.high_water, self._count)
+
+    def swap(self) -> Optional[TelemetryBatch]:
+        """Detach the filled block as a batch and activate a spare one"""
+        with self._lock:
+            if self._count == 0:
+                return None
+            block, head, count = self._active, self._head, self._count
+            lsn = self._max_lsn
+            if self._spare_blocks:
+                self._active = self._spare_blocks.pop()
+            else:
+                self._active = self._allocate_block()
+            self._head = 0
+            self._count = 0
+            self._oldest_time = None
+            self._max_lsn = None
+
+        if head == 0:
+            columns = {name: column[:count] for name, column in block.items()}
+        else:
+            # Only reachable after an overwrite, when the block is full
+            columns = {
+                name: np.concatenate((column[head:], column[:head]))
+                for name, column in block.items()
+            }
+
+        return TelemetryBatch(columns, count, self.session_id,
+                              self.session_name, block=block, lsn=lsn)
+
+    def release(self, batch: TelemetryBatch):
+        """Return a written batch's block so it can be reused"""
+        if batch.block is None:
+            return
+        with self._lock:
+            if len(self._spare_blocks) < self.max_spare_blocks:
+                self._spare_blocks.append(batch.block)
+        batch.block = None
+
+
+def concat_batches(batches: List[TelemetryBatch]) -> TelemetryBatch:
+    """Concatenate batches of the same session into one"""
+    first = batches[0]
+    if len(batches) == 1:
+        return first
+    columns = {
+        name: np.concatenate([batch.columns[name] for batch in batches])
+        for name, _ in TELEMETRY_COLUMNS
+    }
+    lsns = [batch.lsn for batch in batches if batch.lsn is not None]
+    return TelemetryBatch(columns, sum(batch.count for batch in batches),
+                          first.session_id, first.session_name,
+                          data_source=first.data_source,
+                          lsn=max(lsns) if lsns else None)
+
+
+def encode_columnar_frame(batch: TelemetryBatch, compression: str = "none",
+                          schema_id: int = COLUMNAR_SCHEMA_ID) -> bytes:
+    """Pack a batch into a compact columnar dashboard frame"""
+    body = b''.join([
+        _pack_str(batch.session_id),
+        _pack_str(batch.session_name),
+        _pack_str(batch.data_source or ''),
+        *(np.ascontiguousarray(batch.columns[name], dtype=dtype).tobytes()
+          for name, dtype in COLUMNAR_SCHEMAS[schema_id]),
+    ])
+    if compression == 'zlib':
+        body = zlib.compress(body, 1)
+    elif compression == 'zstd':
+        body = zstandard.ZstdCompressor(level=3).compress(body)
+    header = COLUMNAR_HEADER.pack(COLUMNAR_MAGIC, COLUMNAR_VERSION, schema_id,
+                                  COLUMNAR_COMPRESSION_IDS[compression], batch.count)
+    return header + body
+
+
+def decode_columnar_frame(data: bytes) -> Optional[TelemetryBatch]:
+    """Inverse of encode_columnar_frame (the dashboard keeps its own copy)"""
+    magic, version, schema_id, compression, count = COLUMNAR_HEADER.unpack_from(data, 0)
+    if magic != COLUMNAR_MAGIC or version != COLUMNAR_VERSION:
+        return None
+    body = data[COLUMNAR_HEADER.size:]
+    if compression == COLUMNAR_COMPRESSION_IDS['zlib']:
+        body = zlib.decompress(body)
+    elif compression == COLUMNAR_COMPRESSION_IDS['zstd']:
+        body = zstandard.ZstdDecompressor().decompress(body)
+
+    session_id, position = _unpack_str(body, 0)
+    session_name, position = _unpack_str(body, position)
+    data_source, position = _unpack_str(body, position)
+    columns = {}
+    for name, dtype in COLUMNAR_SCHEMAS[schema_id]:
+        columns[name] = np.frombuffer(body, dtype=dtype, count=count, offset=position)
+        position += count * np.dtype(dtype).itemsize
+    return TelemetryBatch(columns, count, session_id, session_name,
+                          data_source=data_source)
+
+
+# Binary batch record: magic, CRC-32 of the payload, payload length, WAL
+# sequence number, sample count. The payload holds the session id and name
+# (length-prefixed UTF-8) followed by each column's raw little-endian bytes.
+BATCH_RECORD_MAGIC = b'ETW3'
+BATCH_RECORD_HEADER = struct.Struct('<4sIIQI')
+# Columns stored per record version; columns a record predates replay as
+# zeros (ETW1 predates the derived channels, ETW2 the boot epoch)
+BATCH_RECORD_COLUMNS = {
+    BATCH_RECORD_MAGIC: TELEMETRY_COLUMNS,
+    b'ETW2': tuple((name, dtype) for name, dtype in TELEMETRY_COLUMNS
+                   if name != BOOT_EPOCH_COLUMN),
+    b'ETW1': tuple((name, dtype) for name, dtype in TELEMETRY_COLUMNS
+                   if name not in BRIDGE_COLUMNS),
+}
+
+
+def _pack_str(value: str) -> bytes:
+    encoded = value.encode('utf-8')
+    return struct.pack('<H', len(encoded)) + encoded
+
+
+def _unpack_str(data, offset: int) -> Tuple[str, int]:
+    (length,) = struct.unpack_from('<H', data, offset)
+    start = offset + 2
+    return bytes(data[start:start + length]).decode('utf-8'), start + length
+
+
+def encode_batch_record(batch: TelemetryBatch, lsn: int) -> bytes:
+    """Serialize a batch as one compact binary record"""
+    payload = b''.join([
+        _pack_str(batch.session_id),
+        _pack_str(batch.session_name),
+        *(np.ascontiguousarray(batch.columns[name], dtype=dtype).tobytes()
+          for name, dtype in TELEMETRY_COLUMNS),
+    ])
+    header = BATCH_RECORD_HEADER.pack(
+        BATCH_RECORD_MAGIC, zlib.crc32(payload), len(payload), lsn, batch.count
+    )
+    return header + payload
+
+
+def decode_batch_records(data: bytes) -> Tuple[List[TelemetryBatch], int]:
+    """
+    Decode consecutive batch records.
+
+    Returns the batches and the number of bytes consumed; decoding stops at
+    the first truncated or corrupt record (e.g. a write torn by a crash).
+    """
+    view = memoryview(data)
+    batches = []
+    offset = 0
+    while offset + BATCH_RECORD_HEADER.size <= len(data):
+        magic, crc, length, lsn, count = BATCH_RECORD_HEADER.unpack_from(data, offset)
+        start = offset + BATCH_RECORD_HEADER.size
+        end = start + length
+        if magic not in BATCH_RECORD_COLUMNS or end > len(data):
+            break
+        if zlib.crc32(view[start:end]) != crc:
+            break
+
+        session_id, position = _unpack_str(data, start)
+        session_name, position = _unpack_str(data, position)
+        columns = {name: np.zeros(count, dtype=dtype) for name, dtype in TELEMETRY_COLUMNS}
+        for name, dtype in BATCH_RECORD_COLUMNS[magic]:
+            columns[name] = np.frombuffer(data, dtype=dtype, count=count,
+                                          offset=position)
+            position += count * np.dtype(dtype).itemsize
+
+        batches.append(TelemetryBatch(columns, count, session_id,
+                                      session_name, lsn=lsn))
+        offset = end
+
+    return batches, offset
+
+
+class TelemetryWAL:
+    """
+    Append-only, segment-rotated write-ahead log of normalized batches.
+
+    Every batch is appended before it reaches the DB buffer; ``sync()``
+    fsyncs the appends in groups. ``commit(lsn)`` deletes segments once every
+    batch in them has been confirmed by Supabase. Segments left behind by a
+    previous run are decoded by ``open()`` so they can be replayed.
+    """
+
+    def __init__(self, directory: str = WAL_DIR,
+                 segment_bytes: int = WAL_SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._segments = []  # closed segments: {"path", "last_lsn"}
+        self._active_file = None
+        self._active_path = None
+        self._active_last_lsn = None
+        self._next_lsn = 1
+        self._dirty = False
+
+    def open(self) -> List[TelemetryBatch]:
+        """Open the log and return the batches left by a previous run"""
+        os.makedirs(self.directory, exist_ok=True)
+        recovered = []
+        for filename in sorted(os.listdir(self.directory)):
+            if not (filename.startswith('wal-') and filename.endswith('.log')):
+                continue
+            path = os.path.join(self.directory, filename)
+            with open(path, 'rb') as segment_file:
+                data = segment_file.read()
+
+            batches, consumed = decode_batch_records(data)
+            if consumed < len(data):
+                logger.warning(f"⚠️ WAL segment {filename} has "
+                               f"{len(data) - consumed} unreadable trailing bytes")
+            if not batches:
+                os.remove(path)
+                continue
+            last_lsn = batches[-1].lsn
+            self._segments.append({"path": path, "last_lsn": last_lsn})
+            self._next_lsn = max(self._next_lsn, last_lsn + 1)
+            recovered.extend(batches)
+
+        self._open_active_segment()
+        return recovered
+
+    def _open_active_segment(self):
+        self._active_path = os.path.join(
+            self.directory, f"wal-{self._next_lsn:016d}.log"
+        )
+        self._active_file = open(self._active_path, 'ab')
+        self._active_last_lsn = None
+
+    def _rotate(self):
+        self.sync()
+        self._active_file.close()
+        self._segments.append(
+            {"path": self._active_path, "last_lsn": self._active_last_lsn}
+        )
+        self._open_active_segment()
+
+    def append(self, batch: TelemetryBatch) -> int:
+        """Append a batch and return its log sequence number"""
+        lsn = self._next_lsn
+        self._next_lsn += 1
+        self._active_file.write(encode_batch_record(batch, lsn))
+        self._active_last_lsn = lsn
+        self._dirty = True
+        if self._active_file.tell() >= self.segment_bytes:
+            self._rotate()
+        return lsn
+
+    def sync(self):
+        """Flush and fsync appends made since the last sync"""
+        if self._dirty and self._active_file:
+            self._active_file.flush()
+            os.fsync(self._active_file.fileno())
+            self._dirty = False
+
+    def commit(self, lsn: int):
+        """Delete every segment whose batches are all confirmed up to ``lsn``"""
+        if self._active_last_lsn is not None and self._active_last_lsn <= lsn:
+            self._rotate()
+
+        remaining = []
+        for segment in self._segments:
+            if segment["last_lsn"] <= lsn:
+                try:
+                    os.remove(segment["path"])
+                except FileNotFoundError:
+                    pass
+            else:
+                remaining.append(segment)
+        self._segments = remaining
+
+    def close(self):
+        if self._active_file:
+            self.sync()
+            self._active_file.close()
+            self._active_file = None
+            # Drop the active segment if nothing was written to it
+            if self._active_last_lsn is None:
+                try:
+                    os.remove(self._active_path)
+                except FileNotFoundError:
+                    pass
+
+
+class BatchSpillStore:
+    """
+    Directory of fsynced batch files waiting for the database to come back.
+
+    Each file holds one batch record; files are replayed oldest first and
+    removed only once the database has confirmed them.
+    """
+
+    def __init__(self, directory: str = DB_SPILL_DIR):
+        self.directory = directory
+
+    def write(self, batch: TelemetryBatch) -> str:
+        """Persist a batch and return its file path"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"spill-{time.time_ns():020d}.bin")
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as spill_file:
+            spill_file.write(encode_batch_record(batch, batch.lsn or 0))
+            spill_file.flush()
+            os.fsync(spill_file.fileno())
+        os.replace(temp_path, path)
+        return path
+
+    def pending(self) -> List[str]:
+        """Paths of spilled batches, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        return [
+            os.path.join(self.directory, filename)
+            for filename in sorted(os.listdir(self.directory))
+            if filename.startswith('spill-') and filename.endswith('.bin')
+        ]
+
+    def read(self, path: str) -> Optional[TelemetryBatch]:
+        with open(path, 'rb') as spill_file:
+            batches, _ = decode_batch_records(spill_file.read())
+        return concat_batches(batches) if batches else None
+
+    def remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _db_column_types() -> List[Tuple[str, str]]:
+    """Local table columns (Supabase names) with SQL types"""
+    columns = [('session_id', 'TEXT'), ('session_name', 'TEXT'), ('timestamp', 'TEXT')]
+    for name, dtype in TELEMETRY_COLUMNS[1:]:
+        sql_type = 'BIGINT' if np.dtype(dtype).kind == 'i' else 'DOUBLE'
+        columns.append((DB_COLUMN_NAMES.get(name, name), sql_type))
+    return columns
+
+
+class StorageSink:
+    """
+    Destination for flushed telemetry batches.
+
+    ``write`` runs on a DB worker thread, returns the number of new rows and
+    raises on failure; the bridge retries and spills per sink.
+    """
+
+    name = "sink"
+    # Keeps the rollup and sessions catalog tables as well as raw rows
+    supports_summaries = False
+
+    def __init__(self, spill_dir: str = DB_SPILL_DIR):
+        self.spill_store = BatchSpillStore(spill_dir)
+        # False while writes are failing: new batches spill straight to disk
+        self.available = True
+
+    def write(self, batch: TelemetryBatch) -> int:
+        raise NotImplementedError
+
+    def write_rollups(self, rows: List[Dict[str, Any]], merge: bool = False) -> int:
+        """
+        Upsert rollup rows (only called when supports_summaries is set);
+        with ``merge`` each row is combined with the stored row of its bucket
+        """
+        raise NotImplementedError
+
+    def write_sessions(self, rows: List[Dict[str, Any]]) -> int:
+        """Upsert sessions catalog rows (only called when supports_summaries is set)"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def is_missing_conflict_constraint(error: Exception) -> bool:
+    """True for the PostgREST error of an upsert without a matching unique constraint"""
+    return (getattr(error, 'code', None) == PG_NO_CONFLICT_CONSTRAINT
+            or PG_NO_CONFLICT_CONSTRAINT in str(error))
+
+
+def is_missing_column(error: Exception, names: Tuple[str, ...]) -> bool:
+    """True for a PostgREST error naming one of ``names`` as a column the table lacks"""
+    message = str(error)
+    return ((getattr(error, 'code', None) in PG_MISSING_COLUMN_CODES
+             or any(code in message for code in PG_MISSING_COLUMN_CODES))
+            and any(name in message for name in names))
+
+
+def is_missing_derived_column(error: Exception) -> bool:
+    """True for a PostgREST error naming a derived column the table lacks"""
+    return is_missing_column(error, DERIVED_COLUMNS)
+
+
+def _is_derived_key(key: str) -> bool:
+    """Derived channel column, or one of its rollup columns (roll_deg_min, ...)"""
+    return key in DERIVED_COLUMNS or key.rsplit('_', 1)[0] in DERIVED_COLUMNS
+
+
+def without_derived_columns(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rows with the derived channel columns left out"""
+    return [
+        {key: value for key, value in record.items() if not _is_derived_key(key)}
+        for record in records
+    ]
+
+
+class SupabaseSink(StorageSink):
+    """
+    Idempotent upserts into the Supabase telemetry table.
+
+    Upserts need the unique (session_id, boot_epoch, message_id) constraint
+    from the README. A table still keyed on (session_id, message_id), or
+    without the boot_epoch column, is written with that older key (samples
+    after a transmitter reboot are then dropped as duplicates); without any
+    constraint the sink warns once and falls back to plain inserts, which a
+    retried batch can duplicate. Tables without the derived channel columns
+    (see DB_STORE_DERIVED_COLUMNS) get rows without them.
+    """
+
+    name = "supabase"
+    supports_summaries = True
+
+    def __init__(self, client, spill_dir: str = DB_SPILL_DIR):
+        super().__init__(spill_dir)
+        self.client = client
+        self.upsert_supported = True
+        self.conflict_columns = DB_CONFLICT_COLUMNS
+        self.store_boot_epoch = True
+        # Tables written without the derived channel columns
+        self.tables_without_derived = (
+            set() if DB_STORE_DERIVED_COLUMNS
+            else {SUPABASE_TABLE_NAME, ROLLUP_TABLE_NAME}
+        )
+
+    def _send(self, table_name: str, records: List[Dict[str, Any]], send) -> int:
+        """Run send(records), dropping bridge columns the table turns out to lack"""
+        while True:
+            if table_name in self.tables_without_derived:
+                records = without_derived_columns(records)
+            if table_name == SUPABASE_TABLE_NAME and not self.store_boot_epoch:
+                records = [{key: value for key, value in record.items()
+                            if key != BOOT_EPOCH_COLUMN} for record in records]
+            try:
+                response = send(self.client.table(table_name), records)
+                return len(response.data or [])
+            except Exception as e:
+                if (table_name not in self.tables_without_derived
+                        and is_missing_derived_column(e)):
+                    self.tables_without_derived.add(table_name)
+                    logger.warning(
+                        f"⚠️ {table_name} has no derived channel columns; storing rows "
+                        f"without them. Add the columns from the README to keep them."
+                    )
+                elif (table_name == SUPABASE_TABLE_NAME and self.store_boot_epoch
+                      and is_missing_column(e, (BOOT_EPOCH_COLUMN,))):
+                    self.store_boot_epoch = False
+                    self.conflict_columns = DB_LEGACY_CONFLICT_COLUMNS
+                    logger.warning(
+                        f"⚠️ {table_name} has no {BOOT_EPOCH_COLUMN} column; keying rows on "
+                        f"({DB_LEGACY_CONFLICT_COLUMNS}), so samples after a transmitter "
+                        f"reboot are dropped. Add the column from the README to keep them."
+                    )
+                else:
+                    raise
+
+    def write(self, batch: TelemetryBatch) -> int:
+        return self.write_records(batch.to_db_records())
+
+    def write_records(self, records: List[Dict[str, Any]]) -> int:
+        """Store telemetry rows; returns the number of new rows"""
+        while self.upsert_supported:
+            try:
+                # Upsert so a retried batch never duplicates rows it already wrote
+                return self._send(SUPABASE_TABLE_NAME, records, lambda table, rows: table.upsert(
+                    rows, on_conflict=self.conflict_columns, ignore_duplicates=True
+                ).execute())
+            except Exception as e:
+                if not is_missing_conflict_constraint(e):
+                    raise
+                if self.conflict_columns != DB_LEGACY_CONFLICT_COLUMNS:
+                    self.conflict_columns = DB_LEGACY_CONFLICT_COLUMNS
+                    logger.warning(
+                        f"⚠️ {SUPABASE_TABLE_NAME} has no unique ({DB_CONFLICT_COLUMNS}) "
+                        f"constraint; trying ({DB_LEGACY_CONFLICT_COLUMNS}), which drops "
+                        f"samples after a transmitter reboot. Add the constraint from the README."
+                    )
+                    continue
+                self.upsert_supported = False
+                logger.warning(
+                    f"⚠️ {SUPABASE_TABLE_NAME} has no unique ({DB_LEGACY_CONFLICT_COLUMNS}) "
+                    f"constraint; using plain inserts, so retried batches may "
+                    f"duplicate rows. Add the constraint from the README."
+                )
+        return self._send(SUPABASE_TABLE_NAME, records,
+                          lambda table, rows: table.insert(rows).execute())
+
+    def write_rollups(self, rows: List[Dict[str, Any]], merge: bool = False) -> int:
+        # Open buckets are re-sent as they grow, so later rows replace earlier ones
+        if merge:
+            rows = self._merge_stored_rollups(rows)
+        return self._send(ROLLUP_TABLE_NAME, rows, lambda table, rows: table.upsert(
+            rows, on_conflict=ROLLUP_CONFLICT_COLUMNS
+        ).execute())
+
+    def _merge_stored_rollups(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rows combined with the stored rows of their buckets (one query per resolution)"""
+        groups: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault((row['session_id'], row['resolution_s']), []).append(row)
+
+        merged = []
+        for (session_id, resolution), group in groups.items():
+            bucket_starts = [row['bucket_start'] for row in group]
+            response = (
+                self.client.table(ROLLUP_TABLE_NAME)
+                .select("*")
+                .eq("session_id", session_id)
+                .eq("resolution_s", resolution)
+                .gte("bucket_start", min(bucket_starts))
+                .lte("bucket_start", max(bucket_starts))
+                .execute()
+            )
+            stored_rows = response.data or []
+            # Compare instants: Postgres formats timestamps differently
+            stored = dict(zip(
+                parse_timestamps_us([row['bucket_start'] for row in stored_rows], 0).tolist(),
+                stored_rows,
+            ))
+            for row, start_us in zip(group, parse_timestamps_us(bucket_starts, 0).tolist()):
+                previous = stored.get(start_us)
+                merged.append(row if previous is None else merge_rollup_rows(previous, row))
+        return merged
+
+    def write_sessions(self, rows: List[Dict[str, Any]]) -> int:
+        response = self.client.table(SESSIONS_TABLE_NAME).upsert(
+            rows, on_conflict="session_id"
+        ).execute()
+        return len(response.data or [])
+
+
+class SQLiteSink(StorageSink):
+    """Local SQLite database in WAL mode, with the same key as Supabase"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = SQLITE_PATH, spill_dir: str = DB_SPILL_DIR):
+        super().__init__(os.path.join(spill_dir, self.name))
+        self.path = path
+        self._lock = threading.Lock()
+        self._column_names = [name for name, _ in _db_column_types()]
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        column_sql = ", ".join(f'"{name}" {sql_type}' for name, sql_type in _db_column_types())
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {SUPABASE_TABLE_NAME} "
+            f"({column_sql}, PRIMARY KEY ({DB_CONFLICT_COLUMNS}))"
+        )
+        # Files created by an older bridge lack the columns added since
+        existing = {row[1] for row in self.connection.execute(
+            f"PRAGMA table_info({SUPABASE_TABLE_NAME})"
+        )}
+        for name, sql_type in _db_column_types():
+            if name not in existing:
+                self.connection.execute(
+                    f'ALTER TABLE {SUPABASE_TABLE_NAME} ADD COLUMN "{name}" {sql_type}'
+                )
+        if BOOT_EPOCH_COLUMN not in existing:
+            self._rekey(column_sql)
+        # Highest rowid already copied to Supabase by sync_local_to_supabase
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS sync_state (target TEXT PRIMARY KEY, last_rowid INTEGER)"
+        )
+        self.connection.commit()
+
+    def _rekey(self, column_sql: str):
+        """Rebuild a table keyed before boot_epoch existed; rowids (sync positions) are kept"""
+        names = ", ".join(f'"{name}"' for name in self._column_names)
+        self.connection.execute(
+            f"UPDATE {SUPABASE_TABLE_NAME} SET {BOOT_EPOCH_COLUMN} = 0 "
+            f"WHERE {BOOT_EPOCH_COLUMN} IS NULL"
+        )
+        self.connection.execute(
+            f"CREATE TABLE {SUPABASE_TABLE_NAME}_rekeyed "
+            f"({column_sql}, PRIMARY KEY ({DB_CONFLICT_COLUMNS}))"
+        )
+        self.connection.execute(
+            f"INSERT INTO {SUPABASE_TABLE_NAME}_rekeyed (rowid, {names}) "
+            f"SELECT rowid, {names} FROM {SUPABASE_TABLE_NAME}"
+        )
+        self.connection.execute(f"DROP TABLE {SUPABASE_TABLE_NAME}")
+        self.connection.execute(
+            f"ALTER TABLE {SUPABASE_TABLE_NAME}_rekeyed RENAME TO {SUPABASE_TABLE_NAME}"
+        )
+
+    def write(self, batch: TelemetryBatch) -> int:
+        field_names = [name for name, _ in TELEMETRY_COLUMNS[1:]]
+        timestamps = epoch_us_to_iso(batch.columns['timestamp_us'])
+        values = [batch.columns[name].tolist() for name in field_names]
+        rows = [
+            (batch.session_id, batch.session_name, timestamp, *row)
+            for timestamp, *row in zip(timestamps, *values)
+        ]
+        placeholders = ", ".join("?" * len(self._column_names))
+        with self._lock:
+            cursor = self.connection.executemany(
+                f"INSERT OR IGNORE INTO {SUPABASE_TABLE_NAME} VALUES ({placeholders})", rows
+            )
+            self.connection.commit()
+        return cursor.rowcount
+
+    def pending_sync(self, limit: int, target: str = "supabase") -> Tuple[int, List[Dict[str, Any]]]:
+        """Rows not yet synced to ``target``, oldest first, and the last rowid among them"""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT last_rowid FROM sync_state WHERE target = ?", (target,)
+            ).fetchone()
+            rows = self.connection.execute(
+                f"SELECT rowid, * FROM {SUPABASE_TABLE_NAME} WHERE rowid > ? "
+                f"ORDER BY rowid LIMIT ?", (row[0] if row else 0, limit)
+            ).fetchall()
+        if not rows:
+            return 0, []
+        return rows[-1][0], [dict(zip(self._column_names, row[1:])) for row in rows]
+
+    def mark_synced(self, last_rowid: int, target: str = "supabase"):
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sync_state (target, last_rowid) VALUES (?, ?)",
+                (target, last_rowid),
+            )
+            self.connection.commit()
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+class ParquetSink(StorageSink):
+    """
+    Rolling Parquet files under PARQUET_DIR/session_id=<id>/ (needs pyarrow).
+
+    Each flush is written as a small part file, so it is durable as soon as
+    write returns. A session's parts are compacted into one data file once
+    they hold PARQUET_ROLL_ROWS rows or the oldest is PARQUET_ROLL_SECONDS
+    old, and on close. Data files are named after the parts they replace,
+    so parts left by a crash during compaction are removed on the next
+    start. Like the database sinks, a (session_id, boot_epoch, message_id)
+    key already in the session's files is skipped; files written before
+    boot_epoch existed count as epoch 0.
+    """
+
+    name = "parquet"
+
+    def __init__(self, directory: str = PARQUET_DIR, spill_dir: str = DB_SPILL_DIR):
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("Parquet sink needs pyarrow: pip install pyarrow")
+        super().__init__(os.path.join(spill_dir, self.name))
+        self.directory = directory
+        self._lock = threading.Lock()
+        # session_id -> {"keys": sorted storage keys written, "parts": [(path, rows)],
+        #                "first_part_at": monotonic time}; insertion order is recency
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+
+    def _session_directory(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"session_id={session_id}")
+
+    @staticmethod
+    def _keys(epochs: np.ndarray, message_ids: np.ndarray) -> np.ndarray:
+        """One int64 per (boot_epoch, message_id) pair"""
+        return (np.asarray(epochs, dtype=np.int64) * MESSAGE_ID_MODULUS
+                + np.asarray(message_ids, dtype=np.int64) % MESSAGE_ID_MODULUS)
+
+    def _load_session(self, session_id: str) -> Dict[str, Any]:
+        """Storage keys and uncompacted parts already on disk for a session"""
+        directory = self._session_directory(session_id)
+        os.makedirs(directory, exist_ok=True)
+        filenames = sorted(os.listdir(directory))
+        compacted = []
+        for filename in filenames:
+            if filename.startswith('data-') and filename.endswith('.parquet'):
+                first, last = filename[len('data-'):-len('.parquet')].split('-')
+                compacted.append((first, last))
+
+        keys = []
+        parts = []
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if not filename.endswith('.parquet'):
+                continue
+            if filename.startswith('part-'):
+                stamp = filename[len('part-'):-len('.parquet')]
+                if any(first <= stamp <= last for first, last in compacted):
+                    os.remove(path)  # already in a data file
+                    continue
+            columns = ['message_id']
+            if BOOT_EPOCH_COLUMN in pyarrow.parquet.read_schema(path).names:
+                columns.append(BOOT_EPOCH_COLUMN)
+            table = pyarrow.parquet.read_table(path, columns=columns)
+            message_ids = table.column('message_id').to_numpy()
+            epochs = (table.column(BOOT_EPOCH_COLUMN).fill_null(0).to_numpy()
+                      if BOOT_EPOCH_COLUMN in columns else np.zeros(len(message_ids)))
+            keys.append(self._keys(epochs, message_ids))
+            if filename.startswith('part-'):
+                parts.append((path, table.num_rows))
+
+        return {
+            "keys": np.unique(np.concatenate(keys)) if keys else np.empty(0, dtype=np.int64),
+            "parts": parts,
+            "first_part_at": time.monotonic(),
+        }
+
+    def _session(self, session_id: str) -> Dict[str, Any]:
+        state = self._sessions.pop(session_id, None)
+        if state is None:
+            state = self._load_session(session_id)
+        self._sessions[session_id] = state
+        while len(self._sessions) > PARQUET_MAX_OPEN_SESSIONS:
+            evicted_id = next(iter(self._sessions))
+            self._compact(evicted_id, self._sessions.pop(evicted_id))
+        return state
+
+    def write(self, batch: TelemetryBatch) -> int:
+        with self._lock:
+            state = self._session(batch.session_id)
+
+            # Keep the first arrival of each key not yet on disk
+            keys = self._keys(batch.columns[BOOT_EPOCH_COLUMN], batch.columns['message_id'])
+            _, first = np.unique(keys, return_index=True)
+            keep = np.zeros(batch.count, dtype=bool)
+            keep[first] = True
+            keep &= ~np.isin(keys, state["keys"])
+            if not keep.any():
+                return 0
+            if not keep.all():
+                batch = batch.select(keep)
+                keys = keys[keep]
+
+            columns = {
+                'session_name': pyarrow.array([batch.session_name] * batch.count),
+                'timestamp': pyarrow.array(batch.columns['timestamp_us'],
+                                           type=pyarrow.timestamp('us', tz='UTC')),
+            }
+            for name, _ in TELEMETRY_COLUMNS[1:]:
+                columns[DB_COLUMN_NAMES.get(name, name)] = pyarrow.array(batch.columns[name])
+
+            path = os.path.join(self._session_directory(batch.session_id),
+                                f"part-{time.time_ns():020d}.parquet")
+            pyarrow.parquet.write_table(pyarrow.table(columns), path + ".tmp")
+            os.replace(path + ".tmp", path)
+
+            if not state["parts"]:
+                state["first_part_at"] = time.monotonic()
+            state["parts"].append((path, batch.count))
+            state["keys"] = np.union1d(state["keys"], keys)
+
+            part_rows = sum(rows for _, rows in state["parts"])
+            if (part_rows >= PARQUET_ROLL_ROWS
+                    or time.monotonic() - state["first_part_at"] >= PARQUET_ROLL_SECONDS):
+                # The rows are already durable in their part; retried next time
+                try:
+                    self._compact(batch.session_id, state)
+                except Exception as e:
+                    logger.error(f"❌ Failed to compact Parquet parts of "
+                                 f"{batch.session_id}: {e}")
+            return batch.count
+
+    def _compact(self, session_id: str, state: Dict[str, Any]):
+        """Merge a session's part files into one data file"""
+        parts = state["parts"]
+        if len(parts) > 1:
+            first = os.path.basename(parts[0][0])[len('part-'):-len('.parquet')]
+            last = os.path.basename(parts[-1][0])[len('part-'):-len('.parquet')]
+            path = os.path.join(self._session_directory(session_id),
+                                f"data-{first}-{last}.parquet")
+            # Parts written before a column was added get nulls for it
+            table = pyarrow.concat_tables(
+                [pyarrow.parquet.read_table(part_path) for part_path, _ in parts],
+                promote_options="default",
+            )
+            pyarrow.parquet.write_table(table, path + ".tmp")
+            os.replace(path + ".tmp", path)
+            for part_path, _ in parts:
+                os.remove(part_path)
+        state["parts"] = []
+
+    def close(self):
+        with self._lock:
+            for session_id, state in self._sessions.items():
+                try:
+                    self._compact(session_id, state)
+                except Exception as e:
+                    logger.error(f"❌ Failed to compact Parquet parts of {session_id}: {e}")
+            self._sessions.clear()
+
+
+class DuckDBSink(StorageSink):
+    """Local DuckDB database with the same key as Supabase (needs duckdb)"""
+
+    name = "duckdb"
+
+    def __init__(self, path: str = DUCKDB_PATH, spill_dir: str = DB_SPILL_DIR):
+        if not DUCKDB_AVAILABLE:
+            raise RuntimeError("DuckDB sink needs duckdb: pip install duckdb")
+        super().__init__(os.path.join(spill_dir, self.name))
+        self.path = path
+        self._lock = threading.Lock()
+        self.connection = duckdb.connect(path)
+        column_sql = ", ".join(f'"{name}" {sql_type}' for name, sql_type in _db_column_types())
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {SUPABASE_TABLE_NAME} "
+            f"({column_sql}, PRIMARY KEY ({DB_CONFLICT_COLUMNS}))"
+        )
+        # Files created by an older bridge lack the columns added since
+        existing = {row[1] for row in self.connection.execute(
+            f"PRAGMA table_info({SUPABASE_TABLE_NAME})"
+        ).fetchall()}
+        for name, sql_type in _db_column_types():
+            if name not in existing:
+                self.connection.execute(
+                    f'ALTER TABLE {SUPABASE_TABLE_NAME} ADD COLUMN "{name}" {sql_type}'
+                )
+        if BOOT_EPOCH_COLUMN not in existing:
+            # Primary keys cannot be altered: copy into a table with the new key
+            names = ", ".join(f'"{name}"' for name, _ in _db_column_types())
+            self.connection.execute(
+                f"UPDATE {SUPABASE_TABLE_NAME} SET {BOOT_EPOCH_COLUMN} = 0 "
+                f"WHERE {BOOT_EPOCH_COLUMN} IS NULL"
+            )
+            self.connection.execute(
+                f"CREATE TABLE {SUPABASE_TABLE_NAME}_rekeyed "
+                f"({column_sql}, PRIMARY KEY ({DB_CONFLICT_COLUMNS}))"
+            )
+            self.connection.execute(
+                f"INSERT INTO {SUPABASE_TABLE_NAME}_rekeyed ({names}) "
+                f"SELECT {names} FROM {SUPABASE_TABLE_NAME}"
+            )
+            self.connection.execute(f"DROP TABLE {SUPABASE_TABLE_NAME}")
+            self.connection.execute(
+                f"ALTER TABLE {SUPABASE_TABLE_NAME}_rekeyed RENAME TO {SUPABASE_TABLE_NAME}"
+            )
+
+    def write(self, batch: TelemetryBatch) -> int:
+        # DuckDB scans a dict of NumPy arrays in place: no per-row objects
+        columns = {
+            'session_id': np.full(batch.count, batch.session_id, dtype=object),
+            'session_name': np.full(batch.count, batch.session_name, dtype=object),
+            'timestamp': np.array(epoch_us_to_iso(batch.columns['timestamp_us']), dtype=object),
+        }
+        for name, _ in TELEMETRY_COLUMNS[1:]:
+            columns[DB_COLUMN_NAMES.get(name, name)] = batch.columns[name]
+        with self._lock:
+            self.connection.register("telemetry_batch", columns)
+            try:
+                inserted = self.connection.execute(
+                    f"INSERT OR IGNORE INTO {SUPABASE_TABLE_NAME} SELECT * FROM telemetry_batch"
+                ).fetchone()
+            finally:
+                self.connection.unregister("telemetry_batch")
+        return int(inserted[0]) if inserted else batch.count
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+LOCAL_SINKS = {
+    'sqlite': SQLiteSink,
+    'parquet': ParquetSink,
+    'duckdb': DuckDBSink,
+}
+
+
+def sync_local_to_supabase(path: str = SQLITE_PATH) -> int:
+    """Copy rows of a local SQLite sink that Supabase has not seen yet"""
+    sink = SQLiteSink(path)
+    supabase_sink = SupabaseSink(create_client(SUPABASE_URL, SUPABASE_API_KEY))
+    synced = 0
+    try:
+        while True:
+            last_rowid, records = sink.pending_sync(DB_MAX_BATCH_SIZE)
+            if not records:
+                break
+            supabase_sink.write_records(records)
+            sink.mark_synced(last_rowid)
+            synced += len(records)
+            logger.info(f"☁️ Synced {synced} local records to Supabase")
+    finally:
+        sink.close()
+    return synced
+
+
+class TransportChannel:
+    """Named channel of a Transport, with the publish/subscribe surface of an Ably channel"""
+
+    def __init__(self, transport: 'Transport', channel_name: str):
+        self.transport = transport
+        self.channel_name = channel_name
+
+    async def publish(self, messages: List[Dict[str, Any]]):
+        self.transport.publish(self.channel_name, messages)
+
+    async def subscribe(self, callback):
+        await self.transport.subscribe(self.channel_name, callback)
+
+
+class Transport:
+    """
+    Message transport for the ESP32 input or the dashboard output.
+
+    Messages are published as Ably-style {'name', 'data'} dicts; subscribers
+    are called on the event loop with objects carrying .name and .data
+    (bytes on the byte-oriented transports).
+    """
+
+    name = "base"
+
+    async def connect(self):
+        pass
+
+    def channel(self, channel_name: str):
+        return TransportChannel(self, channel_name)
+
+    def publish(self, channel_name: str, messages: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    async def subscribe(self, channel_name: str, callback):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class AblyTransport(Transport):
+    """Ably realtime (cloud); channels are Ably's own"""
+
+    name = "ably"
+
+    def __init__(self, api_key: str, label: str = "Ably"):
+        self.api_key = api_key
+        self.label = label
+        self.client = None
+
+    async def connect(self):
+        self.client = AblyRealtime(self.api_key)
+        logger.info(f"Waiting for {self.label} connection...")
+        start_time = time.time()
+        while time.time() - start_time < ABLY_CONNECT_TIMEOUT:
+            if self.client.connection.state == 'connected':
+                logger.info(f"✅ {self.label} connection established")
+                return
+            await asyncio.sleep(0.1)
+        logger.info(f"⏰ {self.label} connection timeout, assuming connected")
+
+    def channel(self, channel_name: str):
+        return self.client.channels.get(channel_name)
+
+    async def close(self):
+        if self.client:
+            await self.client.close()
+
+
+# Subscribers of in-process channels: channel name -> callbacks
+_INPROCESS_SUBSCRIBERS: Dict[str, List[Any]] = {}
+
+
+class InProcessTransport(Transport):
+    """Channels inside this process; messages are handed over as they are"""
+
+    name = "inprocess"
+
+    def __init__(self):
+        self._subscriptions = []
+
+    def publish(self, channel_name: str, messages: List[Dict[str, Any]]):
+        for callback in list(_INPROCESS_SUBSCRIBERS.get(channel_name, ())):
+            for message in messages:
+                callback(SimpleNamespace(name=message['name'], data=message['data']))
+
+    async def subscribe(self, channel_name: str, callback):
+        _INPROCESS_SUBSCRIBERS.setdefault(channel_name, []).append(callback)
+        self._subscriptions.append((channel_name, callback))
+
+    async def close(self):
+        for channel_name, callback in self._subscriptions:
+            _INPROCESS_SUBSCRIBERS[channel_name].remove(callback)
+        self._subscriptions = []
+
+
+class MQTTTransport(Transport):
+    """Local MQTT broker (needs paho-mqtt); topics are <prefix>/<channel>/<message name>"""
+
+    name = "mqtt"
+
+    def __init__(self, host: str = MQTT_HOST, port: int = MQTT_PORT,
+                 prefix: str = MQTT_TOPIC_PREFIX):
+        if not PAHO_AVAILABLE:
+            raise RuntimeError("MQTT transport needs paho-mqtt: pip install paho-mqtt")
+        self.host = host
+        self.port = port
+        self.prefix = prefix
+        self.client = None
+        self._loop = None
+        self._callbacks: Dict[str, List[Any]] = {}
+
+    async def connect(self):
+        self._loop = asyncio.get_running_loop()
+        try:
+            self.client = paho_mqtt.Client(paho_mqtt.CallbackAPIVersion.VERSION2)
+        except AttributeError:
+            # paho-mqtt < 2.0
+            self.client = paho_mqtt.Client()
+        self.client.on_connect = self._on_connect
+        self.client.on_message = self._on_message
+        await asyncio.to_thread(self.client.connect, self.host, self.port)
+        self.client.loop_start()
+        logger.info(f"✅ MQTT broker connected at {self.host}:{self.port}")
+
+    def _on_connect(self, client, *args):
+        # Subscriptions are renewed after every (re)connect
+        for channel_name in self._callbacks:
+            client.subscribe(f"{self.prefix}/{channel_name}/#")
+
+    def _on_message(self, client, userdata, msg):
+        channel_name, _, name = msg.topic[len(self.prefix) + 1:].partition('/')
+        for callback in self._callbacks.get(channel_name, ()):
+            self._loop.call_soon_threadsafe(
+                callback, SimpleNamespace(name=name, data=msg.payload)
+            )
+
+    def publish(self, channel_name: str, messages: List[Dict[str, Any]]):
+        for message in messages:
+            self.client.publish(f"{self.prefix}/{channel_name}/{message['name']}",
+                                encode_payload(message['data'])[1])
+
+    async def subscribe(self, channel_name: str, callback):
+        self._callbacks.setdefault(channel_name, []).append(callback)
+        self.client.subscribe(f"{self.prefix}/{channel_name}/#")
+
+    async def close(self):
+        if self.client:
+            self.client.loop_stop()
+            self.client.disconnect()
+
+
+class _UDPReceiver(asyncio.DatagramProtocol):
+    def __init__(self, transport: 'UDPMulticastTransport'):
+        self.owner = transport
+
+    def datagram_received(self, data: bytes, addr):
+        self.owner.dispatch(data)
+
+
+class UDPMulticastTransport(Transport):
+    """LAN multicast, one message per datagram (see UDP_ENVELOPE); no delivery guarantee"""
+
+    name = "udp"
+
+    def __init__(self, group: str = UDP_MULTICAST_GROUP, port: int = UDP_PORT):
+        self.group = group
+        self.port = port
+        self._send_socket = None
+        self._receiver = None
+        self._callbacks: Dict[str, List[Any]] = {}
+
+    async def connect(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, UDP_MULTICAST_TTL)
+        sock.setblocking(False)
+        self._send_socket = sock
+        logger.info(f"✅ UDP multicast on {self.group}:{self.port}")
+
+    def publish(self, channel_name: str, messages: List[Dict[str, Any]]):
+        channel = channel_name.encode()
+        for message in messages:
+            name = message['name'].encode()
+            datagram = (UDP_ENVELOPE.pack(UDP_MAGIC, len(channel), len(name))
+                        + channel + name + encode_payload(message['data'])[1])
+            if len(datagram) > UDP_MAX_DATAGRAM:
+                raise ValueError(f"{len(datagram)} byte message does not fit in a UDP datagram")
+            self._send_socket.sendto(datagram, (self.group, self.port))
+
+    async def subscribe(self, channel_name: str, callback):
+        self._callbacks.setdefault(channel_name, []).append(callback)
+        if self._receiver is not None:
+            return
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(('', self.port))
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                        socket.inet_aton(self.group) + socket.inet_aton('0.0.0.0'))
+        sock.setblocking(False)
+        self._receiver, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: _UDPReceiver(self), sock=sock
+        )
+
+    def dispatch(self, datagram: bytes):
+        if len(datagram) < UDP_ENVELOPE.size:
+            return
+        magic, channel_length, name_length = UDP_ENVELOPE.unpack_from(datagram)
+        if magic != UDP_MAGIC:
+            return
+        offset = UDP_ENVELOPE.size
+        channel_name = datagram[offset:offset + channel_length].decode(errors='replace')
+        offset += channel_length
+        name = datagram[offset:offset + name_length].decode(errors='replace')
+        offset += name_length
+        for callback in self._callbacks.get(channel_name, ()):
+            callback(SimpleNamespace(name=name, data=datagram[offset:]))
+
+    async def close(self):
+        if self._receiver:
+            self._receiver.close()
+        if self._send_socket:
+            self._send_socket.close()
+
+
+TRANSPORTS = {
+    'ably': AblyTransport,
+    'mqtt': MQTTTransport,
+    'udp': UDPMulticastTransport,
+    'inprocess': InProcessTransport,
+}
+
+
+def make_transport(name: str, ably_api_key: str, label: str) -> Transport:
+    if name == 'ably':
+        return AblyTransport(ably_api_key, label)
+    return TRANSPORTS[name]()
+
+
+class FanoutChannel:
+    """
+    Output channel on several transports: the primary is published to
+    directly, each secondary from its own bounded drop-oldest queue, so a
+    slow cloud link never holds up the local one.
+    """
+
+    def __init__(self, primary, secondaries: List[Tuple[str, Any]], on_error=None):
+        self.primary = primary
+        self.secondaries = [
+            (channel, BoundedStageQueue(name, SECONDARY_QUEUE_CAPACITY, "drop_oldest"))
+            for name, channel in secondaries
+        ]
+        self.on_error = on_error
+        self._tasks = []
+
+    @property
+    def queues(self) -> List[BoundedStageQueue]:
+        return [queue for _, queue in self.secondaries]
+
+    async def publish(self, messages: List[Dict[str, Any]]):
+        if not self._tasks:
+            self._tasks = [asyncio.ensure_future(self._drain(channel, queue))
+                           for channel, queue in self.secondaries]
+        for _, queue in self.secondaries:
+            queue.put(messages, len(messages))
+        await self.primary.publish(messages)
+
+    async def _drain(self, channel, queue: BoundedStageQueue):
+        while True:
+            messages = await queue.get()
+            try:
+                await channel.publish(messages)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(queue.name, e)
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class DerivedChannels:
+    """
+    Computes DERIVED_COLUMNS in place, once per sample, as batches arrive.
+
+    Roll and pitch use the dashboard's accelerometer formulas, efficiency is
+    the instantaneous km/kWh, speed and power are averaged over the trailing
+    DERIVED_SMOOTHING_SAMPLES samples and jerk is the time derivative of the
+    acceleration magnitude. Trailing state is carried per session.
+    """
+
+    def __init__(self, window: int = DERIVED_SMOOTHING_SAMPLES,
+                 max_sessions: int = DERIVED_MAX_SESSIONS):
+        self.window = window
+        self.max_sessions = max_sessions
+        # session_id -> {'speed_ms': tail, 'power_w': tail, 'timestamp_us': last,
+        #                'total_acceleration': last}
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+
+    def _smooth(self, values: np.ndarray, tail: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Trailing mean of each value (fewer samples at session start) and the new tail"""
+        joined = np.concatenate([tail, values])
+        sums = np.concatenate([[0.0], np.cumsum(joined)])
+        ends = np.arange(len(tail) + 1, len(joined) + 1)
+        starts = np.maximum(ends - self.window, 0)
+        return ((sums[ends] - sums[starts]) / (ends - starts),
+                joined[max(len(joined) - self.window + 1, 0):])
+
+    def apply(self, batch: TelemetryBatch):
+        if not batch:
+            return
+        columns = batch.columns
+        accel_x, accel_y, accel_z = columns['accel_x'], columns['accel_y'], columns['accel_z']
+
+        roll_denominator = np.sqrt(accel_x ** 2 + accel_z ** 2)
+        roll_denominator[roll_denominator == 0] = 1e-10
+        columns['roll_deg'] = np.degrees(np.arctan2(accel_y, roll_denominator))
+        pitch_denominator = np.sqrt(accel_y ** 2 + accel_z ** 2)
+        pitch_denominator[pitch_denominator == 0] = 1e-10
+        columns['pitch_deg'] = np.degrees(np.arctan2(accel_x, pitch_denominator))
+
+        speed, power = columns['speed_ms'], columns['power_w']
+        drawing = power >= DERIVED_MIN_POWER_W
+        efficiency = np.zeros(len(batch))
+        efficiency[drawing] = speed[drawing] * 3.6 / (power[drawing] / 1000.0)
+        columns['efficiency_km_per_kwh'] = efficiency
+
+        state = self._sessions.pop(batch.session_id, None)
+        if state is None:
+            state = {
+                'speed_ms': np.zeros(0),
+                'power_w': np.zeros(0),
+                'timestamp_us': int(columns['timestamp_us'][0]),
+                'total_acceleration': float(columns['total_acceleration'][0]),
+            }
+        self._sessions[batch.session_id] = state
+        while len(self._sessions) > self.max_sessions:
+            del self._sessions[next(iter(self._sessions))]
+
+        columns['speed_smoothed_ms'], state['speed_ms'] = self._smooth(speed, state['speed_ms'])
+        columns['power_smoothed_w'], state['power_w'] = self._smooth(power, state['power_w'])
+
+        # Jerk against the previous sample; zero where time did not advance
+        timestamps = columns['timestamp_us']
+        acceleration = columns['total_acceleration']
+        previous_timestamps = np.concatenate([[state['timestamp_us']], timestamps[:-1]])
+        previous_acceleration = np.concatenate([[state['total_acceleration']], acceleration[:-1]])
+        dt = (timestamps - previous_timestamps) / 1e6
+        advanced = dt > 0
+        jerk = np.zeros(len(batch))
+        jerk[advanced] = (acceleration[advanced] - previous_acceleration[advanced]) / dt[advanced]
+        columns['jerk_ms3'] = jerk
+        state['timestamp_us'] = int(timestamps[-1])
+        state['total_acceleration'] = float(acceleration[-1])
+
+
+class MessageIdDeduper:
+    """
+    Drops repeated message ids within a sliding window per session.
+
+    Ids are compared with uint32 serial arithmetic, so the window follows
+    the counter across wraparound. Each session holds DEDUP_WINDOW slots
+    indexed by id modulo the window, recording the sender's uptime_seconds
+    for each id seen (NaN when unseen). An id repeated with the same uptime
+    is a duplicate; a seen id arriving with a different uptime means the
+    transmitter rebooted and restarted its counter, so a new window (epoch)
+    begins at that sample. Id 0 (not set by the sender) always passes, and
+    ids further behind than the window cannot be checked and pass without
+    disturbing it. Without uptime (legacy binary) restarts go undetected.
+
+    Each kept sample's boot_epoch is set to the number of restarts seen in
+    its session before it, so the sinks store both epochs' ids.
+    """
+
+    def __init__(self, window: int = DEDUP_WINDOW, max_sessions: int = DEDUP_MAX_SESSIONS):
+        self.window = window
+        self.max_sessions = max_sessions
+        # session_id -> [highest id, uptime per slot]; insertion order is recency
+        self._sessions: Dict[str, list] = {}
+        # session_id -> current epoch; kept when the window is dropped, so a
+        # session's later samples never reuse an earlier epoch's key
+        self._epochs: Dict[str, int] = {}
+        self.duplicates = 0
+        self.restarts = 0
+
+    def _serial_offset(self, ids: np.ndarray, highest: int) -> np.ndarray:
+        """Signed distance of each id ahead of highest, modulo 2**32"""
+        half = MESSAGE_ID_MODULUS // 2
+        return (ids - highest + half) % MESSAGE_ID_MODULUS - half
+
+    def filter(self, batch: TelemetryBatch) -> np.ndarray:
+        """Mask of samples to keep; records their ids as seen"""
+        ids = batch.columns['message_id'].astype(np.int64) % MESSAGE_ID_MODULUS
+        uptimes = batch.columns['uptime_seconds'].astype(np.float64)
+        keep = np.ones(len(ids), dtype=bool)
+        epoch = self._epochs.get(batch.session_id, 0)
+        epochs = np.full(len(ids), epoch, dtype=np.int64)
+        batch.columns[BOOT_EPOCH_COLUMN] = epochs
+        if not ids.any():
+            return keep
+
+        state = self._sessions.pop(batch.session_id, None)
+        start = 0
+        while True:
+            if state is None:
+                first = ids[start:][ids[start:] != 0]
+                state = [int(first[0]) - 1 if len(first) else 0,
+                         np.full(self.window, np.nan)]
+            restart = self._find_restart(state, ids[start:], uptimes[start:])
+            stop = len(ids) if restart is None else start + restart
+            keep[start:stop] = self._record(state, ids[start:stop], uptimes[start:stop])
+            epochs[start:stop] = epoch
+            if restart is None:
+                break
+            self.restarts += 1
+            epoch += 1
+            state = None
+            start = stop
+
+        self._epochs[batch.session_id] = epoch
+        self._sessions[batch.session_id] = state
+        while len(self._sessions) > self.max_sessions:
+            del self._sessions[next(iter(self._sessions))]
+        self.duplicates += int(np.count_nonzero(~keep))
+        return keep
+
+    def _find_restart(self, state: list, ids: np.ndarray,
+                      uptimes: np.ndarray) -> Optional[int]:
+        """Index of the first sample that reuses an id with another uptime"""
+        index = np.flatnonzero((ids != 0) & (uptimes != 0))
+        if not len(index):
+            return None
+        highest, uptime_seen = state
+
+        # Against the window: a seen id at or behind the highest
+        offsets = self._serial_offset(ids[index], highest)
+        recorded = uptime_seen[ids[index] % self.window]
+        behind = (offsets > -self.window) & (offsets <= 0)
+        mismatch = (behind & (recorded != 0)
+                    & (np.abs(recorded - uptimes[index]) > DEDUP_UPTIME_TOLERANCE_S))
+        candidates = [index[mismatch]]
+
+        # Within the batch: the same id twice with different uptimes
+        order = index[np.argsort(ids[index], kind='stable')]
+        repeated = ((ids[order[1:]] == ids[order[:-1]])
+                    & (np.abs(uptimes[order[1:]] - uptimes[order[:-1]])
+                       > DEDUP_UPTIME_TOLERANCE_S))
+        candidates.append(order[1:][repeated])
+
+        candidates = np.concatenate(candidates)
+        return int(candidates.min()) if len(candidates) else None
+
+    def _record(self, state: list, ids: np.ndarray, uptimes: np.ndarray) -> np.ndarray:
+        """Mask of samples to keep within one epoch; advances its window"""
+        keep = np.ones(len(ids), dtype=bool)
+        tracked = ids != 0
+        if not tracked.any():
+            return keep
+
+        # Repeats inside the batch: keep each id's first arrival
+        _, first = np.unique(ids[tracked], return_index=True)
+        tracked_index = np.flatnonzero(tracked)
+        repeated = np.ones(len(tracked_index), dtype=bool)
+        repeated[first] = False
+        keep[tracked_index[repeated]] = False
+        tracked_index = tracked_index[~repeated]
+        batch_ids = ids[tracked_index]
+
+        highest, uptime_seen = state
+        offsets = self._serial_offset(batch_ids, highest)
+        slots = batch_ids % self.window
+        duplicate = ((offsets > -self.window) & (offsets <= 0)
+                     & ~np.isnan(uptime_seen[slots]))
+        keep[tracked_index[duplicate]] = False
+
+        # Advance the window, clearing the slots of ids it now covers
+        advance = int(offsets.max())
+        if advance >= self.window:
+            uptime_seen[:] = np.nan
+        elif advance > 0:
+            uptime_seen[(highest + np.arange(1, advance + 1)) % self.window] = np.nan
+        state[0] = (highest + max(advance, 0)) % MESSAGE_ID_MODULUS
+        fresh = (offsets > advance - self.window) & ~duplicate
+        uptime_seen[slots[fresh]] = uptimes[tracked_index[fresh]]
+        return keep
+
+
+class TelemetryRollups:
+    """
+    Streaming min/max/mean/last/count per field in fixed time buckets.
+
+    Each batch is folded in with one sort and a few reduceat passes per
+    resolution. Changed buckets are emitted by ``collect`` and stay open
+    until they end ROLLUP_GRACE_SECONDS before the session's newest sample;
+    their rows carry every sample of the bucket and replace the stored row.
+
+    Samples for a bucket that may already have a stored row this object did
+    not write (a bucket closed earlier, or any bucket of a batch added with
+    ``merge``, e.g. one replayed from the WAL of a previous run) are kept
+    apart instead. ``collect_partial`` emits them as rows covering only
+    those samples, to be merged into the stored row (merge_rollup_rows).
+    """
+
+    def __init__(self, resolutions: Tuple[int, ...] = ROLLUP_RESOLUTIONS,
+                 fields: Tuple[str, ...] = ROLLUP_FIELDS):
+        self.resolutions = tuple(resolutions)
+        self.fields = tuple(fields)
+        self.db_fields = [DB_COLUMN_NAMES.get(name, name) for name in self.fields]
+        # (session_id, session_name, resolution) -> {bucket: [min, max, sum, last, count, last_us]}
+        self._open: Dict[Tuple[str, str, int], Dict[int, list]] = {}
+        self._dirty = set()
+        self._newest_us: Dict[str, int] = {}
+        # Same layout, for samples to merge into stored rows
+        self._partial: Dict[Tuple[str, str, int], Dict[int, list]] = {}
+        # (session_id, session_name, resolution) -> first bucket not yet closed
+        self._closed_before: Dict[Tuple[str, str, int], int] = {}
+
+    def __len__(self) -> int:
+        return sum(len(buckets) for buckets in self._open.values())
+
+    def add(self, batch: TelemetryBatch, merge: bool = False):
+        if not batch:
+            return
+        timestamps = batch.columns['timestamp_us']
+        values = np.column_stack(
+            [batch.columns[name] for name in self.fields]
+        ).astype(np.float64, copy=False)
+        if not merge:
+            self._newest_us[batch.session_id] = max(
+                self._newest_us.get(batch.session_id, 0), int(timestamps.max())
+            )
+
+        for resolution in self.resolutions:
+            buckets = timestamps // (resolution * 1_000_000)
+            # Group by bucket, oldest sample first so the group's end is its last value
+            order = np.lexsort((timestamps, buckets))
+            sorted_buckets = buckets[order]
+            starts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+            ends = np.r_[starts[1:], len(order)] - 1
+            grouped = values[order]
+            mins = np.fmin.reduceat(grouped, starts, axis=0)
+            maxs = np.fmax.reduceat(grouped, starts, axis=0)
+            sums = np.add.reduceat(grouped, starts, axis=0)
+            counts = ends - starts + 1
+            lasts = grouped[ends]
+            last_us = timestamps[order][ends]
+
+            key = (batch.session_id, batch.session_name, resolution)
+            open_buckets = self._open.setdefault(key, {})
+            closed_before = self._closed_before.get(key)
+            for i, bucket in enumerate(sorted_buckets[starts].tolist()):
+                if bucket in open_buckets:
+                    target = open_buckets
+                elif merge or (closed_before is not None and bucket < closed_before):
+                    target = self._partial.setdefault(key, {})
+                else:
+                    target = open_buckets
+                state = target.get(bucket)
+                if state is None:
+                    target[bucket] = [mins[i], maxs[i], sums[i], lasts[i],
+                                      int(counts[i]), int(last_us[i])]
+                else:
+                    np.fmin(state[0], mins[i], out=state[0])
+                    np.fmax(state[1], maxs[i], out=state[1])
+                    state[2] += sums[i]
+                    if last_us[i] >= state[5]:
+                        state[3] = lasts[i]
+                        state[5] = int(last_us[i])
+                    state[4] += int(counts[i])
+                if target is open_buckets:
+                    self._dirty.add((key, bucket))
+            if not open_buckets:
+                del self._open[key]
+
+    def _row(self, key: Tuple[str, str, int], bucket: int, state: list) -> Dict[str, Any]:
+        session_id, session_name, resolution = key
+        minimum, maximum, total, last, count, _ = state
+        row = {
+            'session_id': session_id,
+            'session_name': session_name,
+            'resolution_s': resolution,
+            'bucket_start': epoch_us_to_iso(
+                np.array([bucket * resolution * 1_000_000], dtype=np.int64)
+            )[0],
+            'sample_count': count,
+        }
+        for name, low, high, mean, latest in zip(
+            self.db_fields, minimum.tolist(), maximum.tolist(),
+            (total / count).tolist(), last.tolist()
+        ):
+            row[f'{name}_min'] = low if math.isfinite(low) else None
+            row[f'{name}_max'] = high if math.isfinite(high) else None
+            row[f'{name}_mean'] = mean if math.isfinite(mean) else None
+            row[f'{name}_last'] = latest if math.isfinite(latest) else None
+        return row
+
+    def collect(self, final: bool = False) -> List[Dict[str, Any]]:
+        """Rows for every bucket changed since the last call; closes expired buckets"""
+        rows = [
+            self._row(key, bucket, self._open[key][bucket])
+            for key, bucket in sorted(self._dirty, key=lambda item: (item[0][2], item[1]))
+        ]
+        self._dirty.clear()
+
+        for key in list(self._open):
+            session_id, _, resolution = key
+            open_buckets = self._open[key]
+            if final:
+                closing = list(open_buckets)
+            else:
+                cutoff_us = self._newest_us[session_id] - ROLLUP_GRACE_SECONDS * 1_000_000
+                closing = [b for b in open_buckets
+                           if (b + 1) * resolution * 1_000_000 <= cutoff_us]
+            if closing:
+                self._closed_before[key] = max(self._closed_before.get(key, 0),
+                                               max(closing) + 1)
+            for bucket in closing:
+                del open_buckets[bucket]
+            if not open_buckets:
+                del self._open[key]
+        return rows
+
+    def collect_partial(self) -> List[Dict[str, Any]]:
+        """Rows of the samples to merge into stored rows, added since the last call"""
+        rows = [
+            self._row(key, bucket, state)
+            for key, buckets in self._partial.items()
+            for bucket, state in sorted(buckets.items())
+        ]
+        self._partial.clear()
+        return rows
+
+
+def merge_rollup_rows(stored: Dict[str, Any], added: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Rollup row covering the samples of both rows.
+
+    Counts add up, means are weighted by them and ``added`` (the later
+    samples) supplies the last values, falling back to ``stored`` where
+    either side has no value.
+    """
+    stored_count = stored.get('sample_count') or 0
+    added_count = added.get('sample_count') or 0
+    merged = dict(added)
+    merged['sample_count'] = stored_count + added_count
+    for key, value in added.items():
+        previous = stored.get(key)
+        if previous is None or not key.endswith(('_min', '_max', '_mean', '_last')):
+            continue
+        if value is None:
+            merged[key] = previous
+        elif key.endswith('_min'):
+            merged[key] = min(previous, value)
+        elif key.endswith('_max'):
+            merged[key] = max(previous, value)
+        elif key.endswith('_mean') and merged['sample_count']:
+            merged[key] = ((previous * stored_count + value * added_count)
+                           / merged['sample_count'])
+    return merged
+
+
+def summarize_batch(batch: TelemetryBatch,
+                    fields: Tuple[str, ...] = ROLLUP_FIELDS) -> Tuple[np.ndarray, ...]:
+    """Per-field min, max and sum of a batch, shared by every coalesced tier"""
+    values = np.column_stack(
+        [batch.columns[name] for name in fields]
+    ).astype(np.float64, copy=False)
+    return (np.fmin.reduce(values, axis=0), np.fmax.reduce(values, axis=0),
+            np.add.reduce(values, axis=0))
+
+
+class CoalescedTier:
+    """
+    One coalesced dashboard channel: per session, the latest sample plus
+    min/max/mean of every field since the last ``collect``.
+    """
+
+    def __init__(self, channel_name: str, interval: float,
+                 fields: Tuple[str, ...] = ROLLUP_FIELDS):
+        self.channel_name = channel_name
+        self.interval = interval
+        self.fields = tuple(fields)
+        # session_id -> [min, max, sum, count, latest sample as a one-row batch]
+        self._pending: Dict[str, list] = {}
+        self.next_due = 0.0
+
+    def add(self, batch: TelemetryBatch, summary: Tuple[np.ndarray, ...]):
+        minimum, maximum, total = summary
+        latest = batch.slice(batch.count - 1, batch.count)
+        state = self._pending.get(batch.session_id)
+        if state is None:
+            self._pending[batch.session_id] = [minimum.copy(), maximum.copy(),
+                                               total.copy(), batch.count, latest]
+            return
+        np.fmin(state[0], minimum, out=state[0])
+        np.fmax(state[1], maximum, out=state[1])
+        state[2] += total
+        state[3] += batch.count
+        state[4] = latest
+
+    def collect(self) -> List[Dict[str, Any]]:
+        """One 'telemetry_coalesced' message per session seen since the last call"""
+        messages = []
+        for minimum, maximum, total, count, latest in self._pending.values():
+            record = latest.to_records()[0]
+            record['interval_s'] = self.interval
+            record['sample_count'] = count
+            for key, values in (('min', minimum), ('max', maximum), ('mean', total / count)):
+                record[key] = {
+                    name: value if math.isfinite(value) else None
+                    for name, value in zip(self.fields, values.tolist())
+                }
+            messages.append({'name': 'telemetry_coalesced', 'data': record})
+        self._pending.clear()
+        return messages
+
+
+class SessionCatalog:
+    """Running per-session summary of stored rows for the sessions table"""
+
+    def __init__(self):
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._dirty = set()
+
+    def add(self, batch: TelemetryBatch, records_written: int):
+        if not batch:
+            return
+        columns = batch.columns
+        entry = self._sessions.get(batch.session_id)
+        if entry is None:
+            entry = self._sessions[batch.session_id] = {
+                'session_name': batch.session_name,
+                'start_us': int(columns['timestamp_us'].min()),
+                'end_us': 0,
+                'record_count': 0,
+                'samples': 0,
+                'speed_sum': 0.0,
+                'max_speed_ms': 0.0,
+                'power_sum': 0.0,
+                'max_power_w': 0.0,
+                'energy_j': 0.0,
+                'distance_m': 0.0,
+            }
+        entry['start_us'] = min(entry['start_us'], int(columns['timestamp_us'].min()))
+        entry['end_us'] = max(entry['end_us'], int(columns['timestamp_us'].max()))
+        entry['record_count'] += records_written
+        entry['samples'] += len(batch)
+        entry['speed_sum'] += float(columns['speed_ms'].sum())
+        entry['max_speed_ms'] = max(entry['max_speed_ms'], float(columns['speed_ms'].max()))
+        entry['power_sum'] += float(columns['power_w'].sum())
+        entry['max_power_w'] = max(entry['max_power_w'], float(columns['power_w'].max()))
+        # Cumulative counters: the session total is the largest value seen
+        entry['energy_j'] = max(entry['energy_j'], float(columns['energy_j'].max()))
+        entry['distance_m'] = max(entry['distance_m'], float(columns['distance_m'].max()))
+        self._dirty.add(batch.session_id)
+
+    def collect(self) -> List[Dict[str, Any]]:
+        """Catalog rows for sessions that changed since the last call"""
+        rows = []
+        for session_id in sorted(self._dirty):
+            entry = self._sessions[session_id]
+            start, end = epoch_us_to_iso(
+                np.array([entry['start_us'], entry['end_us']], dtype=np.int64)
+            )
+            rows.append({
+                'session_id': session_id,
+                'session_name': entry['session_name'],
+                'start_time': start,
+                'end_time': end,
+                'record_count': entry['record_count'],
+                'avg_speed_ms': entry['speed_sum'] / entry['samples'],
+                'max_speed_ms': entry['max_speed_ms'],
+                'avg_power_w': entry['power_sum'] / entry['samples'],
+                'max_power_w': entry['max_power_w'],
+                'energy_j': entry['energy_j'],
+                'distance_m': entry['distance_m'],
+                'updated_at': datetime.now(timezone.utc).isoformat(),
+            })
+        self._dirty.clear()
+        return rows
+
+    def mark_dirty(self, session_ids: List[str]):
+        """Re-send these sessions with the next collect (after a failed write)"""
+        self._dirty.update(session_ids)
+
+
+def backfill_sessions_catalog(page_size: int = 1000) -> int:
+    """Build catalog rows for every session in the telemetry table (one full scan)"""
+    client = create_client(SUPABASE_URL, SUPABASE_API_KEY)
+    catalog = SessionCatalog()
+    now_us = (datetime.now(timezone.utc) - UNIX_EPOCH) // timedelta(microseconds=1)
+    offset = 0
+    while True:
+        response = (
+            client.table(SUPABASE_TABLE_NAME)
+            .select("session_id, session_name, timestamp, speed_ms, power_w, "
+                    "energy_j, distance_m")
+            .order("timestamp", desc=False)
+            .range(offset, offset + page_size - 1)
+            .execute()
+        )
+        records = response.data or []
+        by_session: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            by_session.setdefault(record["session_id"], []).append(record)
+        for session_id, session_records in by_session.items():
+            batch = TelemetryBatch(
+                normalize_telemetry_records(session_records, now_us), len(session_records),
+                session_id, session_records[0].get("session_name") or "",
+            )
+            catalog.add(batch, len(batch))
+        if len(records) < page_size:
+            break
+        offset += page_size
+        logger.info(f"🔎 Scanned {offset} telemetry rows")
+
+    rows = catalog.collect()
+    for start in range(0, len(rows), page_size):
+        client.table(SESSIONS_TABLE_NAME).upsert(
+            rows[start:start + page_size], on_conflict="session_id"
+        ).execute()
+    return len(rows)
+
+
+def _open_capture(path: str, mode: str):
+    return gzip.open(path, mode) if path.endswith('.gz') else open(path, mode)
+
+
+class CaptureWriter:
+    """Records raw incoming payloads with their arrival times (--record)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.payloads = 0
+        self._file = _open_capture(path, 'wb')
+        self._file.write(CAPTURE_MAGIC)
+
+    def write(self, payload, arrival_us: int):
+        kind, raw = encode_payload(payload)
+        self._file.write(CAPTURE_RECORD_HEADER.pack(arrival_us, kind, len(raw)))
+        self._file.write(raw)
+        self.payloads += 1
+
+    def close(self):
+        self._file.close()
+
+
+def read_capture(path: str) -> Iterator[Tuple[int, Any]]:
+    """(arrival_us, payload) per recorded payload; a truncated tail is ignored"""
+    with _open_capture(path, 'rb') as f:
+        if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"{path} is not a telemetry capture")
+        try:
+            while True:
+                header = f.read(CAPTURE_RECORD_HEADER.size)
+                if len(header) < CAPTURE_RECORD_HEADER.size:
+                    return
+                arrival_us, kind, length = CAPTURE_RECORD_HEADER.unpack(header)
+                raw = f.read(length)
+                if len(raw) < length:
+                    return
+                yield arrival_us, decode_payload(kind, raw)
+        except EOFError:
+            # gzip stream cut off by a crash
+            return
+
+
+def read_stored_session(session_id: str,
+                        page_size: int = REPLAY_PAGE_SIZE) -> Iterator[Tuple[int, Any]]:
+    """A stored session's rows as ESP32 JSON payloads, timed by their sample timestamps"""
+    client = create_client(SUPABASE_URL, SUPABASE_API_KEY)
+    field_names = [name for name, _ in TELEMETRY_COLUMNS[1:] if name not in BRIDGE_COLUMNS]
+    offset = 0
+    while True:
+        response = (
+            client.table(SUPABASE_TABLE_NAME)
+            .select("*")
+            .eq("session_id", session_id)
+            .order("timestamp", desc=False)
+            .range(offset, offset + page_size - 1)
+            .execute()
+        )
+        records = response.data or []
+        for record in records:
+            payload = {'timestamp': record['timestamp']}
+            for name in field_names:
+                value = record.get(DB_COLUMN_NAMES.get(name, name))
+                if value is not None:
+                    payload[name] = value
+            yield iso_to_epoch_us(record['timestamp']), json_dumps(payload)
+        if len(records) < page_size:
+            return
+        offset += page_size
+
+
+class ReplaySource:
+    """Timed raw payloads fed back through the ingest path (--replay)"""
+
+    def __init__(self, name: str, payloads: Iterable[Tuple[int, Any]],
+                 speed: Optional[float] = 1.0):
+        self.name = name
+        self.payloads = payloads
+        # Multiple of the recorded pace; None replays as fast as the bridge keeps up
+        self.speed = speed
+
+    @classmethod
+    def from_capture(cls, path: str, speed: Optional[float] = 1.0) -> 'ReplaySource':
+        return cls(path, read_capture(path), speed)
+
+    @classmethod
+    def from_session(cls, session_id: str, speed: Optional[float] = 1.0) -> 'ReplaySource':
+        return cls(f"session {session_id}", read_stored_session(session_id), speed)
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram (seconds) in the Prometheus bucket layout"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._bounds = np.asarray(buckets, dtype=np.float64)
+        # Per-bucket (non-cumulative) counts; the last slot is +Inf
+        self.counts = np.zeros(len(buckets) + 1, dtype=np.int64)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def observe_many(self, values: np.ndarray):
+        """Record a whole column of latencies in one vectorized pass"""
+        if not len(values):
+            return
+        indices = np.searchsorted(self._bounds, values, side='left')
+        self.counts += np.bincount(indices, minlength=len(self.counts))
+        self.count += len(values)
+        self.sum += float(np.sum(values))
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile"""
+        if not self.count:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), q * self.count))
+        return self.buckets[index] if index < len(self.buckets) else math.inf
+
+    def render(self, name: str, labels: str = "") -> List[str]:
+        lines = []
+        cumulative = np.cumsum(self.counts)
+        bucket_labels = f"{labels}," if labels else ""
+        for bound, total in zip(self.buckets, cumulative):
+            lines.append(f'{name}_bucket{{{bucket_labels}le="{bound}"}} {total}')
+        lines.append(f'{name}_bucket{{{bucket_labels}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f'{name}_sum{suffix} {self.sum}')
+        lines.append(f'{name}_count{suffix} {self.count}')
+        return lines
+
+
+def _profile_report_path(directory: str, prefix: str, extension: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    return os.path.join(directory, f"{prefix}-{stamp}-{os.getpid()}.{extension}")
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for a running bridge.
+
+    A daemon thread records every other thread's stack each interval; the
+    report is in collapsed-stack format ("frame;frame;... count" per line,
+    root first), as read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR,
+                 interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self.stacks: Dict[str, int] = {}
+        self.sample_count = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self.active:
+            return
+        self.stacks = {}
+        self.sample_count = 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop,
+                                        name="bridge-profiler", daemon=True)
+        self._thread.start()
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} "
+                                 f"({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, str(thread_id)))
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.sample_count += 1
+
+    def stop(self) -> Optional[str]:
+        """Stop sampling and write the collapsed stacks; returns the report path"""
+        if not self.active:
+            return None
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+        path = _profile_report_path(self.directory, "stacks", "collapsed")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1]):
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+class AllocationTracker:
+    """tracemalloc on demand; stopping writes the largest allocation sites"""
+
+    def __init__(self, directory: str = PROFILE_DIR, top: int = PROFILE_TOP_ALLOCATIONS,
+                 frames: int = PROFILE_TRACEMALLOC_FRAMES):
+        self.directory = directory
+        self.top = top
+        self.frames = frames
+
+    @property
+    def active(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not self.active:
+            tracemalloc.start(self.frames)
+
+    def stop(self) -> Optional[str]:
+        """Snapshot, stop tracing and write the report; returns the report path"""
+        if not self.active:
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        statistics = snapshot.statistics('traceback')
+        path = _profile_report_path(self.directory, "allocations", "txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"Traced memory: {current / 1e6:.1f} MB current, "
+                    f"{peak / 1e6:.1f} MB peak\n")
+            f.write(f"Top {min(self.top, len(statistics))} of {len(statistics)} "
+                    f"allocation sites:\n\n")
+            for rank, stat in enumerate(statistics[:self.top], 1):
+                f.write(f"#{rank}: {stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                for line in stat.traceback.format(most_recent_first=True):
+                    f.write(f"    {line}\n")
+                f.write("\n")
+        return path
+
+
+class LoadGenerator:
+    """
+    Seeded, vectorized mock telemetry for one or more simulated vehicles.
+
+    Each call to ``generate`` advances every vehicle by a number of ticks
+    and returns normalized columns, vehicles interleaved in time order.
+    Vehicle v's n-th sample has message_id ``n * vehicles + v + 1``, so ids
+    stay unique within a session. The same seed yields the same samples.
+    """
+
+    def __init__(self, rate_hz: float = 10.0, vehicles: int = 1, seed: int = 0,
+                 payload_format: str = 'frame', ramp: bool = False,
+                 samples_per_frame: Optional[int] = None):
+        self.rate_hz = rate_hz
+        self.vehicles = vehicles
+        self.seed = seed
+        self.payload_format = payload_format
+        # None packs each vehicle's whole chunk into one frame
+        self.samples_per_frame = samples_per_frame
+        self.ramp = ramp
+        self.rng = np.random.default_rng(seed)
+
+        # Per-vehicle state
+        self.phase = self.rng.uniform(0.0, 2 * np.pi, vehicles)
+        self.base_altitude = 100.0 + self.rng.uniform(-5.0, 5.0, vehicles)
+        self.energy = np.zeros(vehicles)
+        self.distance = np.zeros(vehicles)
+        self.simulation_time = 0.0
+        self.ticks = 0
+
+    def generate(self, ticks: int, now_us: int) -> Dict[str, np.ndarray]:
+        """Advance ``ticks`` samples per vehicle, the last one stamped ``now_us``"""
+        dt = 1.0 / self.rate_hz
+        shape = (ticks, self.vehicles)
+        normal = self.rng.normal
+        steps = np.arange(1, ticks + 1)[:, None]
+        t = self.simulation_time + steps * dt
+        angle = t + self.phase
+
+        # Vehicle dynamics and electrical system
+        speed = np.clip(15.0 + 5.0 * np.sin(0.05 * angle) + normal(0, 0.5, shape), 0, 25)
+        voltage = np.clip(48.0 + normal(0, 1.5, shape), 40, 55)
+        current = np.clip(8.0 + speed * 0.2 + normal(0, 1.0, shape), 0, 15)
+        power = voltage * current
+
+        # Energy and distance integration, carried over between calls
+        energy = self.energy + np.cumsum(power * dt, axis=0)
+        distance = self.distance + np.cumsum(speed * dt, axis=0)
+        self.energy = energy[-1]
+        self.distance = distance[-1]
+
+        # GPS on a circular track with altitude variation
+        latitude = 40.7128 + 0.001 * np.sin(0.025 * angle) + normal(0, 0.00001, shape)
+        longitude = -74.0060 + 0.001 * np.cos(0.025 * angle) + normal(0, 0.00001, shape)
+        altitude = self.base_altitude + 10.0 * np.sin(0.015 * angle) + normal(0, 1.0, shape)
+
+        # IMU
+        turning_rate = 2.0 * np.sin(0.04 * angle)
+        vibration = speed * 0.02
+        gyro_x = normal(0, 0.5, shape)
+        gyro_y = normal(0, 0.3, shape)
+        gyro_z = turning_rate + normal(0, 0.8, shape)
+        accel_x = 0.25 * np.cos(0.05 * angle) + normal(0, 0.2, shape) + normal(0, 1.0, shape) * vibration
+        accel_y = turning_rate * speed * 0.1 + normal(0, 0.1, shape) + normal(0, 1.0, shape) * vibration
+        accel_z = 9.81 + normal(0, 0.05, shape) + normal(0, 1.0, shape) * vibration
+        total_acceleration = np.sqrt(accel_x ** 2 + accel_y ** 2 + accel_z ** 2)
+
+        tick_ids = self.ticks + steps - 1
+        timestamps = now_us - ((ticks - steps) * dt * 1e6).astype(np.int64)
+        self.simulation_time = float(t[-1, 0])
+        self.ticks += ticks
+
+        columns = {
+            'timestamp_us': np.broadcast_to(timestamps, shape),
+            'speed_ms': speed,
+            'voltage_v': voltage,
+            'current_a': current,
+            'power_w': power,
+            'energy_j': energy,
+            'distance_m': distance,
+            'latitude': latitude,
+            'longitude': longitude,
+            'altitude': altitude,
+            'gyro_x': gyro_x,
+            'gyro_y': gyro_y,
+            'gyro_z': gyro_z,
+            'accel_x': accel_x,
+            'accel_y': accel_y,
+            'accel_z': accel_z,
+            'total_acceleration': total_acceleration,
+            'message_id': tick_ids * self.vehicles + np.arange(self.vehicles) + 1,
+            'uptime_seconds': np.broadcast_to(t, shape),
+        }
+        return {
+            name: np.ascontiguousarray(columns[name], dtype=dtype).ravel()
+            for name, dtype in TELEMETRY_COLUMNS if name not in BRIDGE_COLUMNS
+        }
+
+    def payloads(self, columns: Dict[str, np.ndarray]) -> List[Union[bytes, str]]:
+        """Encode generated samples as the ESP32 would send them"""
+        if self.payload_format == 'frame':
+            # Frames per vehicle, like each car's TelemetryFrameEncoder
+            count = len(columns['message_id']) // self.vehicles
+            frame_size = self.samples_per_frame or count
+            return [
+                encode_telemetry_frame({
+                    name: column[vehicle::self.vehicles][start:start + frame_size]
+                    for name, column in columns.items()
+                })
+                for vehicle in range(self.vehicles)
+                for start in range(0, count, frame_size)
+            ]
+
+        field_names = [name for name in columns if name != 'timestamp_us']
+        timestamps = epoch_us_to_iso(columns['timestamp_us'])
+        values = [columns[name].tolist() for name in field_names]
+        return [
+            json_dumps({'timestamp': timestamp, **dict(zip(field_names, row))})
+            for timestamp, *row in zip(timestamps, *values)
+        ]
+
+
+class TelemetryBridgeWithDB:
+    """
+    Bridge class that:
+    1. Subscribes to ESP32 telemetry on the input transport (Ably by default)
+       OR generates mock data
+    2. Republishes to dashboard channel for real-time updates
+    3. Batches and stores data in Supabase database when enough records are
+       buffered or the oldest has waited 9 seconds
+    4. Manages sessions for historical data retrieval
+    """
+
+    def __init__(self, mock_mode: bool = False, session_name: Optional[str] = None,
+                 load_generator: Optional[LoadGenerator] = None,
+                 sink_names: Optional[List[str]] = None, workers: int = INGEST_WORKERS,
+                 tiers: Optional[Dict[str, float]] = None,
+                 profile: bool = False, trace_allocations: bool = False,
+                 capture_path: Optional[str] = None, replay: Optional[ReplaySource] = None,
+                 input_transport: str = INPUT_TRANSPORT,
+                 output_transports: Optional[List[str]] = None):
+        # Generated load and replayed traffic are mock data, stored and
+        # republished as such
+        self.load_generator = load_generator
+        self.replay = replay
+        self.input_transport = input_transport
+        self.output_transports = list(output_transports or OUTPUT_TRANSPORTS)
+        # Connected transports and fan-out channels, closed on shutdown
+        self.transports: List[Transport] = []
+        self._fanout_channels: List[FanoutChannel] = []
+        self.mock_mode = mock_mode or load_generator is not None or replay is not None
+        # Raw payloads are recorded here as they arrive (--record)
+        self.capture = CaptureWriter(capture_path) if capture_path else None
+        self.supabase_client = None
+        # Storage sinks, created in connect_sinks(); the first is the system of record
+        self.sink_names = list(sink_names or STORAGE_SINKS)
+        self.sinks: List[StorageSink] = []
+        self.esp32_channel = None
+        self.dashboard_channel = None
+        # Coalesced output tiers, fed from the same ingest pass as the raw channel
+        self.tiers = [
+            CoalescedTier(channel_name, interval) for channel_name, interval
+            in (DASHBOARD_TIERS if tiers is None else tiers).items()
+        ]
+        self.tier_channels = {}
+        self.running = False
+        # Normalized batches for the dashboard publisher, sized in samples
+        self.message_queue = BoundedStageQueue("republish", REPUBLISH_QUEUE_CAPACITY,
+                                               REPUBLISH_QUEUE_POLICY)
+        # Raw payloads from the ingest callback, normalized in batches
+        self.raw_ingest = BoundedStageQueue("raw_ingest", RAW_INGEST_CAPACITY,
+                                            RAW_INGEST_POLICY)
+        self._ingest_event = asyncio.Event()
+        self.deduper = MessageIdDeduper()
+        # Worker processes (started in run()) and their dispatched chunks as
+        # (input block, future, payload count), accepted in dispatch order
+        self.workers = max(0, workers)
+        self._worker_pool = None
+        self._workers_ready = False
+        self._worker_pool_started = 0.0
+        self._worker_pending = deque()
+        self._worker_pending_event = asyncio.Event()
+        self.derived = DerivedChannels()
+        self.republish_batch_window = REPUBLISH_BATCH_WINDOW
+        self.republish_max_batch = REPUBLISH_MAX_BATCH
+        self.dashboard_wire_format = DASHBOARD_WIRE_FORMAT
+        self.dashboard_compression = DASHBOARD_COMPRESSION
+        if self.dashboard_compression == "zstd" and not ZSTD_AVAILABLE:
+            logger.warning("⚠️ zstandard not installed, using zlib for dashboard frames")
+            self.dashboard_compression = "zlib"
+        self.session_id = str(uuid.uuid4())
+        self.session_start_time = datetime.now(timezone.utc)
+
+        # Session name (user supplied). If None, use a generated default.
+        if session_name and session_name.strip():
+            self.session_name = session_name.strip()
+        else:
+            # sensible default if user provided empty name
+            short_id = self.session_id[:8]
+            self.session_name = f"Session {short_id}"
+
+        self.db_buffer = ColumnarTelemetryBuffer(
+            DB_BUFFER_CAPACITY, self.session_id, self.session_name,
+            max_spare_blocks=DB_MAX_INFLIGHT_BATCHES, policy=DB_BUFFER_POLICY,
+        )
+        # Set whenever the writer swaps the buffer, for ingest blocked on a full one
+        self._db_space_event = asyncio.Event()
+        self.db_flush_size = MAX_BATCH_SIZE
+        self._db_flush_event = asyncio.Event()
+        self._timed_db_writes = 0
+
+        # Blocking sink writes run on a bounded worker pool; commits are
+        # acknowledged in submission order from _db_pending
+        self._db_executor = ThreadPoolExecutor(
+            max_workers=DB_MAX_INFLIGHT_BATCHES * len(self.sink_names) + 1,
+            thread_name_prefix="db-writer",
+        )
+        self._db_inflight_slots = asyncio.Semaphore(DB_MAX_INFLIGHT_BATCHES)
+        # (batch, future, holds_slot, submitted_at) per in-flight write
+        self._db_pending = deque()
+        self._db_pending_event = asyncio.Event()
+
+        # While a sink is failing, new batches spill straight to its spill
+        # store; retrying batches hold at most DB_RETRY_MEMORY_BUDGET samples
+        self.spill_dir = DB_SPILL_DIR
+        self._retrying_samples = 0
+
+        # Time-bucket rollups of the samples the summary sink has stored,
+        # written alongside the raw flushes; rows that failed to write wait
+        # in _rollup_rows (keyed by bucket) for the next flush, rows to merge
+        # into stored buckets in _rollup_merge_rows
+        self.rollups = TelemetryRollups()
+        self._rollup_rows: Dict[Tuple[str, int, str], Dict[str, Any]] = {}
+        self._rollup_merge_rows: Dict[Tuple[str, int, str], Dict[str, Any]] = {}
+        self._summary_task = None
+        # Summary of the rows this session has stored, for the sessions table
+        self.session_catalog = SessionCatalog()
+
+        # Write-ahead log; truncation stops below any batch that was neither
+        # stored nor spilled, so it is replayed on the next start
+        self.wal = TelemetryWAL()
+        self._wal_open = False
+        self._wal_recovered = []
+
+        # Set as each connection comes up; ingest starts before either is ready
+        self._sinks_ready = asyncio.Event()
+        self._dashboard_ready = asyncio.Event()
+        # Batches some sink could neither store nor spill: (lsn, copy or None,
+        # sinks). The WAL is truncated only below the oldest of them
+        self._unspilled = deque()
+        self._last_unspilled_retry = 0.0
+        self._wal_acknowledged_lsn = 0
+        self._wal_committed_lsn = 0
+
+        # Statistics
+        # Per-stage latency histograms, served with the stats on /metrics
+        self.latency = {stage: LatencyHistogram() for stage in LATENCY_STAGES}
+        self.loop_lag = LatencyHistogram()
+        self._metrics_server = None
+
+        # Opt-in profiling, started in run() or toggled by SIGUSR1/SIGUSR2
+        self.profiler = SamplingProfiler()
+        self.allocations = AllocationTracker()
+        self._profile_on_start = profile
+        self._trace_allocations_on_start = trace_allocations
+
+        self.stats = {
+            "messages_received": 0,
+            "messages_republished": 0,
+            "publish_calls": 0,
+            "bytes_received": 0,
+            "bytes_published": 0,
+            "messages_stored_db": 0,
+            "last_message_time": None,
+            "last_db_write_time": None,
+            "errors": 0,
+            "last_error": None,
+            "current_session_id": self.session_id,
+            "current_session_name": self.session_name,
+            "session_start_time": self.session_start_time.isoformat(),
+            "db_flush": {
+                "flushes": 0,
+                "flushes_by_size": 0,
+                "flushes_by_age": 0,
+                "flush_size_threshold": self.db_flush_size,
+                "last_batch_size": 0,
+                "max_batch_size": 0,
+                "last_insert_latency_ms": 0.0,
+                "avg_insert_latency_ms": 0.0,
+                "max_insert_latency_ms": 0.0,
+                "inflight_batches": 0,
+            },
+            "json_backend": JSON_BACKEND,
+            "decode": {
+                payload_format: {"count": 0, "errors": 0, "total_ms": 0.0}
+                for payload_format in PAYLOAD_FORMATS
+            },
+            "db_retry": {
+                "retries": 0,
+                "batches_spilled": 0,
+                "samples_spilled": 0,
+                "spilled_batches_pending": 0,
+                "spilled_batches_recovered": 0,
+                "unspilled_batches": 0,
+            },
+            "dedup": {
+                "duplicates_dropped": 0,
+                "sender_restarts": 0,
+            },
+            "workers": {
+                "processes": self.workers,
+                "chunks": 0,
+                "payloads": 0,
+                "inflight_chunks": 0,
+                "busy_seconds": 0.0,
+                "utilization": 0.0,
+                "pool_failures": 0,
+                "payloads_recovered": 0,
+            },
+            "tiers": {
+                channel_name: {
+                    "interval_s": interval,
+                    "messages_published": 0,
+                    "samples": 0,
+                    "publish_calls": 0,
+                }
+                for channel_name, interval in [(DASHBOARD_CHANNEL_NAME, 0.0)] + [
+                    (tier.channel_name, tier.interval) for tier in self.tiers
+                ]
+            },
+            "queues": {
+                "raw_ingest": self.raw_ingest.stats,
+                "republish": self.message_queue.stats,
+                "db_buffer": {
+                    "capacity": self.db_buffer.capacity,
+                    "policy": self.db_buffer.policy,
+                    "high_water": 0,
+                    "dropped": 0,
+                    "coalesced": 0,
+                    "blocked_seconds": 0.0,
+                },
+            },
+            "sinks": {},
+            "rollups": {
+                "open_buckets": 0,
+                "rows_written": 0,
+                "rows_pending": 0,
+                "rows_dropped": 0,
+                "last_write_latency_ms": 0.0,
+            },
+            "loop_lag": {
+                "last_ms": 0.0,
+                "max_ms": 0.0,
+            },
+            "profiling": {
+                "sampling": False,
+                "tracing_allocations": False,
+                "last_report": None,
+            },
+            "startup_timings": {},
+        }
+
+        # Mock data simulation state
+        self.cumulative_distance = 0.0
+        self.cumulative_energy = 0.0
+        self.simulation_time = 0
+        self.prev_speed = 0.0
+        self.message_count = 0
+        self.base_altitude = 100.0  # Base altitude for simulation
+
+        # Signal handling
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, self._profile_signal_handler)
+            signal.signal(signal.SIGUSR2, self._profile_signal_handler)
+
+        logger.info(f"🆔 New session started: {self.session_id}")
+        logger.info(f"📝 Session name: {self.session_name}")
+
+        if self.mock_mode:
+            logger.info("🎭 MOCK MODE ENABLED - Will generate simulated telemetry data")
+        else:
+            logger.info("🔗 REAL MODE ENABLED - Will connect to ESP32 for real telemetry data")
+
+    def _signal_handler(self, signum, frame):
+        logger.info(f"Received signal {signum}, shutting down...")
+        self.running = False
+
+    def _profile_signal_handler(self, signum, frame):
+        """SIGUSR1 toggles the sampling profiler, SIGUSR2 allocation tracing"""
+        tool = self.profiler if signum == signal.SIGUSR1 else self.allocations
+        if tool.active:
+            # Reports are written off the event loop
+            threading.Thread(target=self._write_profile_report, args=(tool,),
+                             daemon=True).start()
+        else:
+            self._start_profiling(tool)
+
+    def _start_profiling(self, tool):
+        tool.start()
+        self.stats["profiling"]["sampling"] = self.profiler.active
+        self.stats["profiling"]["tracing_allocations"] = self.allocations.active
+        logger.info(f"🔬 {type(tool).__name__} started; signal again to write the report")
+
+    def _write_profile_report(self, tool):
+        try:
+            path = tool.stop()
+            if path:
+                self.stats["profiling"]["last_report"] = path
+                logger.info(f"🔬 Profile report written to {path}")
+        except Exception as e:
+            logger.error(f"❌ Failed to write profile report: {e}")
+            self.stats["errors"] += 1
+            self.stats["last_error"] = str(e)
+        self.stats["profiling"]["sampling"] = self.profiler.active
+        self.stats["profiling"]["tracing_allocations"] = self.allocations.active
+
+    async def connect_supabase(self) -> bool:
+        """Initialize Supabase client connection"""
+        try:
+            self.supabase_client = create_client(SUPABASE_URL, SUPABASE_API_KEY)
+            logger.info("✅ Connected to Supabase database")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to connect to Supabase: {e}")
+            self.stats["errors"] += 1
+            self.stats["last_error"] = str(e)
+            return False
+
+    async def connect_sinks(self) -> bool:
+        """Open the configured storage sinks; Supabase is optional next to a local sink"""
+        sinks = []
+        for name in self.sink_names:
+            if name == "supabase":
+                if await self.connect_supabase():
+                    sinks.append(SupabaseSink(self.supabase_client, self.spill_dir))
+                elif len(self.sink_names) > 1:
+                    logger.warning("⚠️ Supabase unavailable, storing locally only; "
+                                   "upload later with --sync-local")
+                else:
+                    return False
+                continue
+
+            try:
+                sink = LOCAL_SINKS[name](spill_dir=self.spill_dir)
+            except Exception as e:
+                logger.error(f"❌ Failed to open {name} sink: {e}")
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+                return False
+            logger.info(f"✅ Opened local {name} sink")
+            sinks.append(sink)
+
+        self.sinks = sinks
+        self.stats["sinks"] = {
+            sink.name: {"rows_written": 0, "batches_written": 0, "errors": 0,
+                        "batches_spilled": 0}
+            for sink in sinks
+        }
+        return bool(sinks)
+
+    async def connect_esp32_subscriber(self) -> bool:
+        """Subscribe to the ESP32 telemetry on the input transport"""
+        if self.mock_mode:
+            return True
+        try:
+            transport = make_transport(self.input_transport, ESP32_ABLY_API_KEY, "ESP32")
+            await transport.connect()
+            self.transports.append(transport)
+            self.esp32_channel = transport.channel(ESP32_CHANNEL_NAME)
+            await self.esp32_channel.subscribe(self._on_esp32_message_received)
+            logger.info(f"✅ Connected to ESP32 channel: {ESP32_CHANNEL_NAME} "
+                        f"({transport.name})")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to connect to ESP32 source: {e}")
+            self.stats["errors"] += 1
+            self.stats["last_error"] = str(e)
+            return False
+
+    async def connect_dashboard_publisher(self) -> bool:
+        """Connect the dashboard output transports; the first one is primary"""
+        try:
+            transports = [make_transport(name, DASHBOARD_ABLY_API_KEY, "Dashboard")
+                          for name in self.output_transports]
+            results = await asyncio.gather(*(transport.connect() for transport in transports),
+                                           return_exceptions=True)
+            if isinstance(results[0], BaseException):
+                raise results[0]
+            connected = [transports[0]]
+            # A secondary that cannot connect is left out; the primary carries on
+            for transport, result in zip(transports[1:], results[1:]):
+                if isinstance(result, BaseException):
+                    logger.warning(f"⚠️ Secondary {transport.name} output unavailable: {result}")
+                else:
+                    connected.append(transport)
+            self.transports.extend(connected)
+
+            self.dashboard_channel = self._output_channel(connected, DASHBOARD_CHANNEL_NAME)
+            logger.info(f"✅ Connected to Dashboard channel: {DASHBOARD_CHANNEL_NAME} "
+                        f"({' + '.join(transport.name for transport in connected)})")
+            for tier in self.tiers:
+                self.tier_channels[tier.channel_name] = self._output_channel(
+                    connected, tier.channel_name
+                )
+                logger.info(f"✅ Coalesced tier every {tier.interval:g}s: {tier.channel_name}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to connect to Dashboard output: {e}")
+            self.stats["errors"] += 1
+            self.stats["last_error"] = str(e)
+            return False
+
+    def _output_channel(self, transports: List[Transport], channel_name: str):
+        """The channel on the primary transport, fanned out to any secondaries"""
+        primary = transports[0].channel(channel_name)
+        if len(transports) == 1:
+            return primary
+        fanout = FanoutChannel(
+            primary,
+            [(f"{transport.name}:{channel_name}", transport.channel(channel_name))
+             for transport in transports[1:]],
+            on_error=self._record_secondary_error,
+        )
+        self._fanout_channels.append(fanout)
+        for queue in fanout.queues:
+            self.stats["queues"][queue.name] = queue.stats
+        return fanout
+
+    def _record_secondary_error(self, name: str, error: Exception):
+        logger.error(f"❌ Failed to publish to secondary output {name}: {error}")
+        self.stats["errors"] += 1
+        self.stats["last_error"] = str(error)
+
+    async def _timed_connect(self, name: str, connect, ready: Optional[asyncio.Event]) -> bool:
+        """Run one connection step, recording how long it took"""
+        connect_start = time.perf_counter()
+        connected = await connect
+        elapsed = time.perf_counter() - connect_start
+        self.stats["startup_timings"][name] = round(elapsed, 3)
+        logger.info(f"⏱️ {name} {'ready' if connected else 'failed'} after {elapsed:.2f}s")
+        if connected and ready is not None:
+            ready.set()
+        return connected
+
+    async def connect_all(self):
+        """Connect sinks, source and dashboard concurrently; stop the bridge if one is missing"""
+        connect_start = time.perf_counter()
+        sinks_ok, source_ok, dashboard_ok = await asyncio.gather(
+            self._timed_connect("storage", self.connect_sinks(), self._sinks_ready),
+            self._timed_connect("esp32", self.connect_esp32_subscriber(), None),
+            self._timed_connect("dashboard", self.connect_dashboard_publisher(),
+                                self._dashboard_ready),
+        )
+        self.stats["startup_timings"]["total"] = round(time.perf_counter() - connect_start, 3)
+
+        if not sinks_ok:
+            logger.error("❌ Failed to open storage sinks, exiting")
+        elif not source_ok and not self.mock_mode:
+            logger.error("❌ Failed to connect to ESP32, exiting")
+        elif not dashboard_ok:
+            logger.error("❌ Failed to connect to dashboard, exiting")
+        else:
+            logger.info(f"🔌 All connections ready after "
+                        f"{self.stats['startup_timings']['total']:.2f}s")
+            return
+        self.running = False
+
+    async def _wait_until_ready(self, ready: asyncio.Event) -> bool:
+        """Wait for a connection step; False if the bridge stops first"""
+        while self.running and not ready.is_set():
+            try:
+                await asyncio.wait_for(ready.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+        return ready.is_set()
+
+    def generate_mock_telemetry_data(self) -> Dict[str, Any]:
+        """Generate realistic mock telemetry data"""
+        current_time = datetime.now(timezone.utc)
+
+        # Generate realistic vehicle dynamics
+        base_speed = 15.0 + 5.0 * math.sin(self.simulation_time * 0.1)
+        speed_variation = random.gauss(0, 1.5)
+        speed = max(0, min(25, base_speed + speed_variation))
+
+        # Electrical system simulation
+        voltage = max(40, min(55, 48.0 + random.gauss(0, 1.5)))
+        current = max(0, min(15, 8.0 + speed * 0.2 + random.gauss(0, 1.0)))
+        power = voltage * current
+
+        # Energy and distance integration
+        energy_delta = power * MOCK_DATA_INTERVAL
+        distance_delta = speed * MOCK_DATA_INTERVAL
+        self.cumulative_energy += energy_delta
+        self.cumulative_distance += distance_delta
+
+        # GPS simulation (circular track with altitude variation)
+        base_lat, base_lon = 40.7128, -74.0060
+        lat_offset = 0.001 * math.sin(self.simulation_time * 0.05)
+        lon_offset = 0.001 * math.cos(self.simulation_time * 0.05)
+        latitude = base_lat + lat_offset + random.gauss(0, 0.0001)
+        longitude = base_lon + lon_offset + random.gauss(0, 0.0001)
+
+        # Altitude simulation (varies with track elevation)
+        altitude_variation = 10.0 * math.sin(self.simulation_time * 0.03)
+        altitude = self.base_altitude + altitude_variation + random.gauss(0, 1.0)
+
+        # IMU simulation
+        turning_rate = 2.0 * math.sin(self.simulation_time * 0.08)
+        gyro_x = random.gauss(0, 0.5)
+        gyro_y = random.gauss(0, 0.3)
+        gyro_z = turning_rate + random.gauss(0, 0.8)
+
+        # Acceleration simulation
+        speed_acceleration = (speed - self.prev_speed) / MOCK_DATA_INTERVAL
+        self.prev_speed = speed
+
+        accel_x = speed_acceleration + random.gauss(0, 0.2)
+        accel_y = turning_rate * speed * 0.1 + random.gauss(0, 0.1)
+        accel_z = 9.81 + random.gauss(0, 0.05)
+
+        # Add vibration effects
+        vibration_factor = speed * 0.02
+        accel_x += random.gauss(0, vibration_factor)
+        accel_y += random.gauss(0, vibration_factor)
+        accel_z += random.gauss(0, vibration_factor)
+
+        # Calculate total acceleration
+        total_acceleration = math.sqrt(accel_x**2 + accel_y**2 + accel_z**2)
+
+        self.simulation_time += 1
+        self.message_count += 1
+
+        return {
+            'timestamp': current_time.isoformat(),
+            'speed_ms': round(speed, 2),
+            'voltage_v': round(voltage, 2),
+            'current_a': round(current, 2),
+            'power_w': round(power, 2),
+            'energy_j': round(self.cumulative_energy, 2),
+            'distance_m': round(self.cumulative_distance, 2),
+            'latitude': round(latitude, 6),
+            'longitude': round(longitude, 6),
+            'altitude': round(altitude, 2),
+            'gyro_x': round(gyro_x, 3),
+            'gyro_y': round(gyro_y, 3),
+            'gyro_z': round(gyro_z, 3),
+            'accel_x': round(accel_x, 3),
+            'accel_y': round(accel_y, 3),
+            'accel_z': round(accel_z, 3),
+            'total_acceleration': round(total_acceleration, 3),
+            'message_id': self.message_count,
+            'uptime_seconds': self.simulation_time * MOCK_DATA_INTERVAL,
+            'data_source': 'MOCK_GENERATOR',
+            'session_id': self.session_id,
+            'session_name': self.session_name,
+        }
+
+    def _make_batch(self, pieces: List[Dict[str, np.ndarray]]) -> TelemetryBatch:
+        """Join normalized column blocks into a batch for this session"""
+        columns = concat_columns(pieces)
+        data_source = 'ESP32_REAL' if not self.mock_mode else 'MOCK_GENERATOR'
+        return TelemetryBatch(columns, len(columns['timestamp_us']),
+                              self.session_id, self.session_name,
+                              data_source=data_source)
+
+    def _on_esp32_message_received(self, message):
+        """Queue an incoming ESP32 payload for batch normalization"""
+        logger.debug(f"📨 Received message from ESP32 - Type: {type(message.data)}")
+        if isinstance(message.data, (bytes, bytearray, str)):
+            self.stats["bytes_received"] += len(message.data)
+        if self.capture:
+            try:
+                self.capture.write(message.data, time.time_ns() // 1000)
+            except Exception as e:
+                logger.error(f"❌ Failed to record payload, recording stopped: {e}")
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+                self.capture = None
+        self.raw_ingest.put(message.data)
+        self._ingest_event.set()
+
+    def _process_raw_ingest(self):
+        """Parse and normalize all queued raw payloads as one batch"""
+        if not self.raw_ingest:
+            return
+        now_us = (datetime.now(timezone.utc) - UNIX_EPOCH) // timedelta(microseconds=1)
+        payloads = self.raw_ingest.take()
+        self._accept_normalized(normalize_raw_payloads(payloads, now_us))
+
+    def _accept_normalized(self, result: Dict[str, Any]):
+        """Record a normalization pass and fan its batch out"""
+        for payload_format, (count, errors, total_ms) in result['decode'].items():
+            decode_stats = self.stats["decode"][payload_format]
+            decode_stats["count"] += count
+            decode_stats["errors"] += errors
+            decode_stats["total_ms"] += total_ms
+        self.latency["parse"].observe_many(result['parse_times'])
+
+        for error in result['exceptions']:
+            logger.error(f"❌ Error handling ESP32 message: {error}")
+            self.stats["errors"] += 1
+            self.stats["last_error"] = error
+        for _ in range(result['unparsed']):
+            logger.error("❌ Failed to parse message in any known format")
+            self.stats["errors"] += 1
+            self.stats["last_error"] = "Failed to parse message"
+
+        if result['columns'] is None:
+            return
+        batch = self._make_batch([result['columns']])
+        self.latency["normalize"].observe(result['normalize_time'])
+        if not batch:
+            return
+
+        # Drop repeated message ids (reconnects, sender retries) before the
+        # batch is logged or fanned out
+        keep = self.deduper.filter(batch)
+        self.stats["dedup"]["sender_restarts"] = self.deduper.restarts
+        if not keep.all():
+            self.stats["dedup"]["duplicates_dropped"] = self.deduper.duplicates
+            logger.debug(f"♻️ Dropped {len(batch) - int(keep.sum())} duplicate messages")
+            batch = batch.select(keep)
+            if not batch:
+                return
+        self.derived.apply(batch)
+
+        # Log the batch before it is buffered or republished
+        if self._wal_open:
+            try:
+                batch.lsn = self.wal.append(batch)
+            except OSError as e:
+                logger.error(f"❌ Failed to append to WAL: {e}")
+                self.stats["errors"] += 1
+                self.stats["last_error"] = f"WAL write error: {str(e)}"
+
+        # Add to message queue for real-time republishing
+        self.message_queue.put((time.perf_counter(), batch), len(batch))
+        if self.tiers:
+            summary = summarize_batch(batch)
+            for tier in self.tiers:
+                tier.add(batch, summary)
+
+        # Add to database buffer, waking the writer once a flush is due
+        self.db_buffer.extend(batch)
+        if len(self.db_buffer) >= self.db_flush_size:
+            self._db_flush_event.set()
+        self._refresh_queue_stats()
+
+        self.stats["messages_received"] += batch.count
+        self.stats["last_message_time"] = datetime.now(timezone.utc)
+
+        logger.debug(
+            f"📊 Normalized {batch.count} messages - last speed: "
+            f"{batch.columns['speed_ms'][-1]:.2f} m/s, power: "
+            f"{batch.columns['power_w'][-1]:.2f} W"
+        )
+
+    async def ingest_loop(self):
+        """Normalize raw payloads in batches as soon as they arrive"""
+        while self.running:
+            try:
+                try:
+                    await asyncio.wait_for(self._ingest_event.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue
+                # Let a burst accumulate briefly so it is normalized as one batch
+                await asyncio.sleep(INGEST_BATCH_WINDOW)
+                # Under the block policy, wait for the stages downstream to drain
+                await self._wait_for_downstream_space()
+                self._ingest_event.clear()
+                if self._workers_ready:
+                    self._dispatch_raw_ingest()
+                else:
+                    self._process_raw_ingest()
+            except Exception as e:
+                logger.error(f"❌ Error in ingest loop: {e}")
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+
+    async def _wait_for_space(self, queue: BoundedStageQueue):
+        """Hold a producer while a blocking queue is full (until shutdown)"""
+        while self.running and not await queue.wait_for_space():
+            pass
+
+    async def _wait_for_downstream_space(self):
+        await self._wait_for_space(self.message_queue)
+        if self.db_buffer.policy != "block":
+            return
+        blocked_at = time.perf_counter()
+        while self.running and len(self.db_buffer) >= self.db_buffer.capacity:
+            self._db_space_event.clear()
+            self._db_flush_event.set()
+            try:
+                await asyncio.wait_for(self._db_space_event.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+        self.stats["queues"]["db_buffer"]["blocked_seconds"] += time.perf_counter() - blocked_at
+
+    async def start_worker_pool(self) -> bool:
+        """Start the worker processes; ingest stays in-loop until they are up"""
+        try:
+            self._worker_pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            # Spawned workers import this module first; wait for that once
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(self._worker_pool, os.getpid)
+                                   for _ in range(self.workers)))
+        except Exception as e:
+            logger.error(f"❌ Failed to start ingest workers, normalizing in-loop: {e}")
+            self.stats["errors"] += 1
+            self.stats["last_error"] = str(e)
+            return False
+
+        self._worker_pool_started = time.perf_counter()
+        self._workers_ready = True
+        logger.info(f"🧵 Parsing and normalizing on {self.workers} worker processes")
+        return True
+
+    def _dispatch_raw_ingest(self):
+        """Hand queued payloads to the workers in chunks, spread across the pool"""
+        limit = self.workers * WORKER_MAX_INFLIGHT_PER_PROCESS
+        loop = asyncio.get_running_loop()
+        now_us = (datetime.now(timezone.utc) - UNIX_EPOCH) // timedelta(microseconds=1)
+        chunk_size = min(WORKER_MAX_CHUNK_PAYLOADS,
+                         max(1, math.ceil(len(self.raw_ingest) / self.workers)))
+        # Payloads beyond the in-flight limit wait in raw_ingest
+        while self.raw_ingest and len(self._worker_pending) < limit:
+            payloads = self.raw_ingest.take(chunk_size)
+            block, offsets, kinds = pack_payloads_to_shared_memory(payloads)
+            try:
+                future = loop.run_in_executor(self._worker_pool, normalize_in_worker,
+                                              block.name, offsets, kinds, now_us)
+            except BrokenProcessPool as e:
+                block.close()
+                block.unlink()
+                self._retire_worker_pool(e)
+                self._accept_normalized(normalize_raw_payloads(payloads, now_us))
+                self._process_raw_ingest()
+                return
+            # The payloads stay referenced so a chunk lost with its worker
+            # can still be normalized in-loop
+            self._worker_pending.append((block, future, payloads, now_us))
+            self.stats["workers"]["chunks"] += 1
+            self.stats["workers"]["payloads"] += len(payloads)
+        self.stats["workers"]["inflight_chunks"] = len(self._worker_pending)
+        self._worker_pending_event.set()
+
+    def _accept_worker_result(self, result: Dict[str, Any]):
+        """Copy a worker's columns out of shared memory and fan its batch out"""
+        result['columns'] = None
+        if result['block'] is not None:
+            result['columns'] = read_columns_from_shared_memory(result['block'],
+                                                                result['count'])
+        worker_stats = self.stats["workers"]
+        worker_stats["busy_seconds"] += result['busy_time']
+        elapsed = time.perf_counter() - self._worker_pool_started
+        worker_stats["utilization"] = worker_stats["busy_seconds"] / (self.workers * elapsed)
+        self._accept_normalized(result)
+
+    async def _accept_next_worker_result(self):
+        """Wait for the oldest dispatched chunk and fan its batch out"""
+        try:
+            await self._worker_pending[0][1]
+        except BrokenProcessPool as e:
+            self._retire_worker_pool(e)
+            return
+        except Exception:
+            pass  # reported below, with the chunk released
+
+        block, future, _, _ = self._worker_pending.popleft()
+        try:
+            self._accept_worker_result(future.result())
+        except Exception as e:
+            logger.error(f"❌ Error in ingest worker: {e}")
+            self.stats["errors"] += 1
+            self.stats["last_error"] = str(e)
+        finally:
+            block.close()
+            block.unlink()
+            self.stats["workers"]["inflight_chunks"] = len(self._worker_pending)
+            # Payloads held back by the in-flight limit can go now
+            if self.raw_ingest:
+                self._ingest_event.set()
+
+    def _retire_worker_pool(self, error: Exception):
+        """
+        Drop a pool whose worker process died and normalize the chunks it
+        held in-loop, in dispatch order so samples stay in arrival order.
+        Ingest continues in-loop until worker_results_loop rebuilds the pool.
+        """
+        logger.error(f"❌ Ingest worker process died, normalizing in-loop: {error}")
+        self.stats["errors"] += 1
+        self.stats["last_error"] = f"Ingest worker pool broken: {str(error)}"
+        self.stats["workers"]["pool_failures"] += 1
+        self._workers_ready = False
+        if self._worker_pool is not None:
+            self._worker_pool.shutdown(wait=False, cancel_futures=True)
+            self._worker_pool = None
+
+        recovered = 0
+        while self._worker_pending:
+            block, future, payloads, now_us = self._worker_pending.popleft()
+            try:
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    self._accept_worker_result(future.result())
+                else:
+                    future.cancel()
+                    recovered += len(payloads)
+                    self._accept_normalized(normalize_raw_payloads(payloads, now_us))
+            except Exception as e:
+                logger.error(f"❌ Error normalizing payloads of a failed worker: {e}")
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+            finally:
+                block.close()
+                block.unlink()
+        self.stats["workers"]["payloads_recovered"] += recovered
+        self.stats["workers"]["inflight_chunks"] = 0
+        if self.raw_ingest:
+            self._ingest_event.set()
+
+    async def worker_results_loop(self):
+        """Accept worker results in dispatch order so samples stay in arrival order"""
+        if not await self.start_worker_pool():
+            return
+        while self.running:
+            try:
+                if self._worker_pool is None:
+                    # The pool broke; rebuild it unless it keeps breaking
+                    if self.stats["workers"]["pool_failures"] > WORKER_POOL_MAX_RESTARTS:
+                        logger.warning("⚠️ Ingest workers keep failing; staying in-loop")
+                        return
+                    if not await self.start_worker_pool():
+                        return
+                    continue
+                if not self._worker_pending:
+                    self._worker_pending_event.clear()
+                    try:
+                        await asyncio.wait_for(self._worker_pending_event.wait(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._accept_next_worker_result()
+            except Exception as e:
+                logger.error(f"❌ Error in worker results loop: {e}")
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+
+    async def generate_mock_data_loop(self):
+        """Generate mock data at regular intervals"""
+        if not self.mock_mode:
+            return
+
+        while self.running:
+            try:
+                mock_data = self.generate_mock_telemetry_data()
+
+                # Feed the same batch ingest path as real ESP32 messages
+                await self._wait_for_space(self.raw_ingest)
+                self.raw_ingest.put(mock_data)
+                self._ingest_event.set()
+
+                await asyncio.sleep(MOCK_DATA_INTERVAL)
+
+            except Exception as e:
+                logger.error(f"❌ Error generating mock data: {e}")
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+
+    def _load_queue_depth(self) -> int:
+        return (len(self.raw_ingest) + len(self._worker_pending)
+                + len(self.message_queue) + len(self._db_pending))
+
+    def _finish_load_step(self, step: Dict[str, Any], elapsed: float) -> bool:
+        """Log one load-test step and return whether the bridge kept up with it"""
+        generator = self.load_generator
+        offered = step["generated"] / elapsed
+        normalized = (self.stats["messages_received"] - step["received"]) / elapsed
+        republished = (self.stats["messages_republished"] - step["republished"]) / elapsed
+        depth = self._load_queue_depth()
+        overwritten = self.db_buffer.overwritten - step["overwritten"]
+
+        sustained = (
+            normalized >= LOAD_SUSTAINED_RATIO * offered
+            and republished >= LOAD_SUSTAINED_RATIO * offered
+            and depth <= step["depth"] + max(10, 0.05 * step["generated"])
+            and not overwritten
+        )
+        load_stats = self.stats["load_test"]
+        load_stats.update({
+            "rate_hz": generator.rate_hz,
+            "offered_per_s": offered,
+            "normalized_per_s": normalized,
+            "republished_per_s": republished,
+            "queue_depth": depth,
+        })
+        if sustained:
+            load_stats["max_sustained_per_s"] = max(load_stats["max_sustained_per_s"], offered)
+
+        logger.info(
+            f"🏋️ Load {generator.rate_hz:g} Hz x {generator.vehicles} - "
+            f"offered {offered:.0f}/s, normalized {normalized:.0f}/s, "
+            f"republished {republished:.0f}/s, queue depth "
+            f"{step['depth']}→{depth}, overwritten {overwritten}: "
+            f"{'sustained' if sustained else 'queues growing'}"
+        )
+        return sustained
+
+    async def load_generator_loop(self):
+        """Feed generated payloads through the ESP32 ingest path at the configured rate"""
+        generator = self.load_generator
+        loop = asyncio.get_running_loop()
+        self.stats["load_test"] = {
+            "vehicles": generator.vehicles,
+            "seed": generator.seed,
+            "payload_format": generator.payload_format,
+            "max_sustained_per_s": 0.0,
+        }
+        logger.info(f"🏋️ Load generator: {generator.rate_hz:g} Hz x "
+                    f"{generator.vehicles} vehicles, {generator.payload_format} "
+                    f"payloads, seed {generator.seed}"
+                    f"{', ramping' if generator.ramp else ''}")
+
+        def new_step() -> Dict[str, Any]:
+            return {
+                "start": loop.time(),
+                "ticks": 0,
+                "generated": 0,
+                "received": self.stats["messages_received"],
+                "republished": self.stats["messages_republished"],
+                "overwritten": self.db_buffer.overwritten,
+                "depth": self._load_queue_depth(),
+            }
+
+        step = new_step()
+        while self.running:
+            try:
+                await asyncio.sleep(LOAD_TICK_INTERVAL)
+                elapsed = loop.time() - step["start"]
+
+                # Generate every tick that is due, so the average rate is exact
+                due = int(elapsed * generator.rate_hz) - step["ticks"]
+                due = min(due, max(1, int(generator.rate_hz * LOAD_MAX_CATCH_UP)))
+                if due > 0:
+                    await self._wait_for_space(self.raw_ingest)
+                    now_us = (datetime.now(timezone.utc) - UNIX_EPOCH) // timedelta(microseconds=1)
+                    columns = generator.generate(due, now_us)
+                    for payload in generator.payloads(columns):
+                        self._on_esp32_message_received(SimpleNamespace(data=payload))
+                    step["ticks"] += due
+                    step["generated"] += due * generator.vehicles
+
+                if elapsed < LOAD_STEP_SECONDS:
+                    continue
+
+                sustained = self._finish_load_step(step, elapsed)
+                if generator.ramp:
+                    next_rate = generator.rate_hz * LOAD_RAMP_FACTOR
+                    if not sustained or generator.rate_hz >= LOAD_MAX_RATE_HZ:
+                        best = self.stats["load_test"]["max_sustained_per_s"]
+                        logger.info(
+                            f"🏁 Max sustainable throughput: {best:.0f} samples/s "
+                            f"({generator.vehicles} vehicles"
+                            f"{', limited by the generator cap' if sustained else ''})"
+                        )
+                        self.running = False
+                        break
+                    generator.rate_hz = min(next_rate, LOAD_MAX_RATE_HZ)
+                step = new_step()
+
+            except Exception as e:
+                logger.error(f"❌ Error generating load: {e}")
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+
+    async def replay_loop(self):
+        """Feed recorded payloads through the ESP32 ingest path at N x their recorded pace"""
+        replay = self.replay
+        loop = asyncio.get_running_loop()
+        payloads = iter(replay.payloads)
+        replay_stats = self.stats["replay"] = {
+            "source": replay.name,
+            "speed": replay.speed or "max",
+            "payloads": 0,
+            "elapsed_s": 0.0,
+        }
+        logger.info(f"⏯️ Replaying {replay.name} at "
+                    f"{'max speed' if replay.speed is None else f'{replay.speed:g}x'}")
+
+        start = loop.time()
+        first_us = None
+        try:
+            while self.running:
+                # File and database reads stay off the event loop
+                chunk = await asyncio.to_thread(
+                    lambda: list(islice(payloads, REPLAY_CHUNK_PAYLOADS))
+                )
+                if not chunk:
+                    break
+                if replay.speed is None:
+                    while self.running and self._load_queue_depth() >= REPLAY_MAX_BACKLOG:
+                        await asyncio.sleep(0.01)
+                await self._wait_for_space(self.raw_ingest)
+
+                for arrival_us, payload in chunk:
+                    if not self.running:
+                        break
+                    if first_us is None:
+                        first_us = arrival_us
+                    if replay.speed is not None:
+                        delay = (start + (arrival_us - first_us) / 1e6 / replay.speed
+                                 - loop.time())
+                        if delay > 0.001:
+                            await asyncio.sleep(delay)
+                    self._on_esp32_message_received(SimpleNamespace(data=payload))
+                    replay_stats["payloads"] += 1
+                # Let ingest run between chunks of a max-speed replay
+                await asyncio.sleep(0)
+        except Exception as e:
+            logger.error(f"❌ Error replaying {replay.name}: {e}")
+            self.stats["errors"] += 1
+            self.stats["last_error"] = str(e)
+
+        replay_stats["elapsed_s"] = round(loop.time() - start, 3)
+        if self.running:
+            logger.info(f"🏁 Replay finished: {replay_stats['payloads']} payloads in "
+                        f"{replay_stats['elapsed_s']:.1f}s")
+            self.running = False
+
+    async def _collect_republish_batch(self, first: Tuple[float, TelemetryBatch]) -> TelemetryBatch:
+        """Gather batches queued behind ``first`` until the batch window closes"""
+        loop = asyncio.get_running_loop()
+        entries = [first]
+        pending_samples = len(first[1])
+        deadline = loop.time() + self.republish_batch_window
+
+        while pending_samples < self.republish_max_batch:
+            try:
+                entry = self.message_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self.message_queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            entries.append(entry)
+            pending_samples += len(entry[1])
+
+        dequeued_at = time.perf_counter()
+        for enqueued_at, _ in entries:
+            self.latency["queue_wait"].observe(dequeued_at - enqueued_at)
+        return concat_batches([batch for _, batch in entries])
+
+    def _encode_dashboard_messages(self, batch: TelemetryBatch) -> List[Dict[str, Any]]:
+        """Build the Ably messages for one publish call in the configured wire format"""
+        if self.dashboard_wire_format == "columnar":
+            frame = encode_columnar_frame(batch, self.dashboard_compression)
+            self.stats["bytes_published"] += len(frame)
+            return [{'name': 'telemetry_columnar', 'data': frame}]
+
+        return [
+            {'name': 'telemetry_update', 'data': message_data}
+            for message_data in batch.to_records()
+        ]
+
+    async def republish_messages(self):
+        """Republish messages to dashboard channel for real-time updates"""
+        # Batches queue up until the dashboard channel is connected
+        if not await self._wait_until_ready(self._dashboard_ready):
+            return
+        while self.running:
+            try:
+                try:
+                    first = await asyncio.wait_for(self.message_queue.get(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue
+                pending = await self._collect_republish_batch(first)
+                await self._publish_to_dashboard(pending)
+
+                source_info = "MOCK" if self.mock_mode else "ESP32"
+                logger.debug(f"📡 Republished {len(pending)} "
+                             f"{source_info} messages")
+
+            except Exception as e:
+                logger.error(f"❌ Error in republish loop: {e}")
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+
+    async def _publish_to_dashboard(self, pending: TelemetryBatch):
+        """Publish samples to the dashboard channel, one call per REPUBLISH_MAX_BATCH samples"""
+        for start in range(0, len(pending), self.republish_max_batch):
+            chunk = pending.slice(start, start + self.republish_max_batch)
+            try:
+                messages = self._encode_dashboard_messages(chunk)
+                publish_start = time.perf_counter()
+                await self.dashboard_channel.publish(messages)
+                self.latency["publish"].observe(time.perf_counter() - publish_start)
+                self._observe_end_to_end("end_to_end_publish", chunk)
+                self.stats["messages_republished"] += len(chunk)
+                self.stats["publish_calls"] += 1
+                tier_stats = self.stats["tiers"][DASHBOARD_CHANNEL_NAME]
+                tier_stats["messages_published"] += len(messages)
+                tier_stats["samples"] += len(chunk)
+                tier_stats["publish_calls"] += 1
+            except Exception as e:
+                logger.error(f"❌ Failed to republish {len(chunk)} "
+                             f"messages: {e}")
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+
+    async def _drain_republish_queue(self):
+        """Publish what is still queued for the dashboard (on shutdown)"""
+        entries = self.message_queue.take()
+        if not entries:
+            return
+        pending = concat_batches([batch for _, batch in entries])
+        await self._publish_to_dashboard(pending)
+        logger.info(f"📡 Published the last {len(pending)} queued messages")
+
+    async def _publish_tier(self, tier: CoalescedTier):
+        """Publish what a coalesced tier gathered since its last interval"""
+        messages = tier.collect()
+        channel = self.tier_channels.get(tier.channel_name)
+        if not messages or channel is None:
+            return
+        try:
+            await channel.publish(messages)
+            tier_stats = self.stats["tiers"][tier.channel_name]
+            tier_stats["messages_published"] += len(messages)
+            tier_stats["samples"] += sum(message['data']['sample_count']
+                                         for message in messages)
+            tier_stats["publish_calls"] += 1
+        except Exception as e:
+            logger.error(f"❌ Failed to publish to {tier.channel_name}: {e}")
+            self.stats["errors"] += 1
+            self.stats["last_error"] = str(e)
+
+    async def tier_publish_loop(self):
+        """Publish every coalesced tier once per its interval"""
+        if not self.tiers or not await self._wait_until_ready(self._dashboard_ready):
+            return
+        loop = asyncio.get_running_loop()
+        for tier in self.tiers:
+            tier.next_due = loop.time() + tier.interval
+        while self.running:
+            try:
+                next_due = min(tier.next_due for tier in self.tiers)
+                await asyncio.sleep(min(max(next_due - loop.time(), 0.0), 1.0))
+                now = loop.time()
+                for tier in self.tiers:
+                    if tier.next_due <= now:
+                        # A late tick is not made up; the next one keeps the cadence
+                        tier.next_due = max(tier.next_due + tier.interval, now)
+                        await self._publish_tier(tier)
+            except Exception as e:
+                logger.error(f"❌ Error in tier publish loop: {e}")
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+
+    async def database_batch_writer(self):
+        """Write buffered data once the flush size is reached or the oldest record is too old"""
+        # Samples buffer (and are logged to the WAL) until the sinks are open
+        if not await self._wait_until_ready(self._sinks_ready):
+            return
+
+        # Recovered batches go first so commits (and WAL truncation) stay in LSN order
+        if self._wal_recovered:
+            try:
+                await self.replay_wal_backlog(self._wal_recovered)
+            except Exception as e:
+                logger.error(f"❌ Error replaying WAL: {e}")
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+            self._wal_recovered = []
 
-        # Mock data simulation state
-        self.cumulative_distance = 0.0
-        self.cumulative_energy = 0.0
-        self.simulation_time = 0
-        self.prev_speed = 0.0
-        self.message_count = 0
-        self.base_altitude = 100.0  # Base altitude for simulation
+        while self.running:
+            try:
+                oldest_age = self.db_buffer.oldest_age()
+                if oldest_age is None:
+                    timeout = 1.0
+                else:
+                    timeout = min(max(DB_BATCH_INTERVAL - oldest_age, 0.0), 1.0)
 
-        # Signal handling
-        signal.signal(signal.SIGINT, self._signal_handler)
-        signal.signal(signal.SIGTERM, self._signal_handler)
+                try:
+                    await asyncio.wait_for(self._db_flush_event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._db_flush_event.clear()
 
-        logger.info(f"🆔 New session started: {self.session_id}")
-        logger.info(f"📝 Session name: {self.session_name}")
+                if len(self.db_buffer) >= self.db_flush_size:
+                    reason = "size"
+                elif (self.db_buffer.oldest_age() or 0.0) >= DB_BATCH_INTERVAL:
+                    reason = "age"
+                else:
+                    continue
 
-        if self.mock_mode:
-            logger.info("🎭 MOCK MODE ENABLED - Will generate simulated telemetry data")
-        else:
-            logger.info("🔗 REAL MODE ENABLED - Will connect to ESP32 for real telemetry data")
+                # Detach the filled buffer block; appends continue in the spare
+                batch = self.db_buffer.swap()
+                self._db_space_event.set()
 
-    def _signal_handler(self, signum, frame):
-        logger.info(f"Received signal {signum}, shutting down...")
-        self.running = False
+                # Hand the batch to the DB worker pool if we have data
+                if batch is not None:
+                    self.stats["db_flush"]["flushes"] += 1
+                    self.stats["db_flush"][f"flushes_by_{reason}"] += 1
+                    await self._submit_batch_to_database(batch)
 
-    async def connect_supabase(self) -> bool:
-        """Initialize Supabase client connection"""
-        try:
-            self.supabase_client = create_client(SUPABASE_URL, SUPABASE_API_KEY)
-            logger.info("✅ Connected to Supabase database")
-            return True
-        except Exception as e:
-            logger.error(f"❌ Failed to connect to Supabase: {e}")
-            self.stats["errors"] += 1
-            self.stats["last_error"] = str(e)
-            return False
+                # Rollups and the sessions catalog follow the same cadence;
+                # one summary write in flight at a time
+                if self._summary_task is None or self._summary_task.done():
+                    self._summary_task = asyncio.ensure_future(self.write_summaries())
 
-    async def connect_esp32_subscriber(self) -> bool:
-        """Connect to ESP32 MQTT source via Ably"""
-        if self.mock_mode:
-            return True
-        try:
-            self.esp32_client = AblyRealtime(ESP32_ABLY_API_KEY)
-            await self._wait_for_connection(self.esp32_client, "ESP32")
-            self.esp32_channel = self.esp32_client.channels.get(ESP32_CHANNEL_NAME)
-            await self.esp32_channel.subscribe(self._on_esp32_message_received)
-            logger.info(f"✅ Connected to ESP32 channel: {ESP32_CHANNEL_NAME}")
-            return True
-        except Exception as e:
-            logger.error(f"❌ Failed to connect to ESP32 source: {e}")
-            self.stats["errors"] += 1
-            self.stats["last_error"] = str(e)
-            return False
+            except Exception as e:
+                logger.error(f"❌ Error in database batch writer: {e}")
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
 
-    async def connect_dashboard_publisher(self) -> bool:
-        """Connect to dashboard output channel via Ably"""
+    async def write_summaries(self, final: bool = False):
+        """Upsert changed rollup buckets, then changed sessions catalog rows"""
+        await self.write_rollups(final)
+        await self.write_session_catalog()
+
+    async def write_session_catalog(self):
+        """Upsert the catalog rows of sessions whose stored data changed"""
+        sinks = [sink for sink in self.sinks if sink.supports_summaries]
+        rows = self.session_catalog.collect()
+        if not rows or not sinks:
+            return
+        if not all(sink.available for sink in sinks):
+            self.session_catalog.mark_dirty([row['session_id'] for row in rows])
+            return
+
+        loop = asyncio.get_running_loop()
         try:
-            self.dashboard_client = AblyRealtime(DASHBOARD_ABLY_API_KEY)
-            await self._wait_for_connection(self.dashboard_client, "Dashboard")
-            self.dashboard_channel = self.dashboard_client.channels.get(
-                DASHBOARD_CHANNEL_NAME
-            )
-            logger.info(f"✅ Connected to Dashboard channel: {DASHBOARD_CHANNEL_NAME}")
-            return True
+            await asyncio.gather(*(
+                loop.run_in_executor(self._db_executor, sink.write_sessions, rows)
+                for sink in sinks
+            ))
+            logger.debug(f"🗂️ Updated {len(rows)} sessions catalog rows")
         except Exception as e:
-            logger.error(f"❌ Failed to connect to Dashboard output: {e}")
+            logger.error(f"❌ Failed to update sessions catalog: {e}")
             self.stats["errors"] += 1
-            self.stats["last_error"] = str(e)
-            return False
+            self.stats["last_error"] = f"Sessions catalog write error: {str(e)}"
+            self.session_catalog.mark_dirty([row['session_id'] for row in rows])
 
-    async def _wait_for_connection(self, client, name: str, timeout=10):
-        """Wait for Ably client to connect"""
-        logger.info(f"Waiting for {name} connection...")
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            if client.connection.state == 'connected':
-                logger.info(f"✅ {name} connection established")
-                return
-            await asyncio.sleep(0.1)
-        logger.info(f"⏰ {name} connection timeout, assuming connected")
+    async def write_rollups(self, final: bool = False):
+        """Upsert the rollup buckets changed since the last write"""
+        rollup_stats = self.stats["rollups"]
+        for row in self.rollups.collect(final):
+            key = (row['session_id'], row['resolution_s'], row['bucket_start'])
+            self._rollup_rows[key] = row
+        # Rows to merge cover only their own samples, so pending ones add up
+        for row in self.rollups.collect_partial():
+            key = (row['session_id'], row['resolution_s'], row['bucket_start'])
+            pending = self._rollup_merge_rows.get(key)
+            self._rollup_merge_rows[key] = (row if pending is None
+                                            else merge_rollup_rows(pending, row))
+        rollup_stats["open_buckets"] = len(self.rollups)
 
-    def generate_mock_telemetry_data(self) -> Dict[str, Any]:
-        """Generate realistic mock telemetry data"""
-        current_time = datetime.now(timezone.utc)
+        # Bounded while writes fail: the oldest buckets are dropped first
+        for pending in (self._rollup_rows, self._rollup_merge_rows):
+            overflow = len(pending) - ROLLUP_MAX_PENDING_ROWS
+            if overflow > 0:
+                for key in list(pending)[:overflow]:
+                    del pending[key]
+                rollup_stats["rows_dropped"] += overflow
+        rollup_stats["rows_pending"] = len(self._rollup_rows) + len(self._rollup_merge_rows)
 
-        # Generate realistic vehicle dynamics
-        base_speed = 15.0 + 5.0 * math.sin(self.simulation_time * 0.1)
-        speed_variation = random.gauss(0, 1.5)
-        speed = max(0, min(25, base_speed + speed_variation))
+        sinks = [sink for sink in self.sinks if sink.supports_summaries]
+        if not sinks:
+            self._rollup_rows.clear()
+            self._rollup_merge_rows.clear()
+            rollup_stats["rows_pending"] = 0
+            return
+        if not rollup_stats["rows_pending"] or not all(sink.available for sink in sinks):
+            return
 
-        # Electrical system simulation
-        voltage = max(40, min(55, 48.0 + random.gauss(0, 1.5)))
-        current = max(0, min(15, 8.0 + speed * 0.2 + random.gauss(0, 1.0)))
-        power = voltage * current
+        loop = asyncio.get_running_loop()
+        write_start = time.perf_counter()
+        written = 0
+        # Replacing rows first: a bucket closed with a pending row may have
+        # late samples to merge into it
+        for pending, merge in ((self._rollup_rows, False), (self._rollup_merge_rows, True)):
+            if not pending:
+                continue
+            rows = list(pending.values())
+            try:
+                await asyncio.gather(*(
+                    loop.run_in_executor(self._db_executor, sink.write_rollups, rows, merge)
+                    for sink in sinks
+                ))
+            except Exception as e:
+                logger.error(f"❌ Failed to write {len(rows)} rollup rows: {e}")
+                self.stats["errors"] += 1
+                self.stats["last_error"] = f"Rollup write error: {str(e)}"
+                return
+            pending.clear()
+            written += len(rows)
+            rollup_stats["rows_written"] += len(rows)
+            rollup_stats["rows_pending"] -= len(rows)
 
-        # Energy and distance integration
-        energy_delta = power * MOCK_DATA_INTERVAL
-        distance_delta = speed * MOCK_DATA_INTERVAL
-        self.cumulative_energy += energy_delta
-        self.cumulative_distance += distance_delta
+        rollup_stats["last_write_latency_ms"] = (time.perf_counter() - write_start) * 1000.0
+        logger.debug(f"📈 Wrote {written} rollup rows")
 
-        # GPS simulation (circular track with altitude variation)
-        base_lat, base_lon = 40.7128, -74.0060
-        lat_offset = 0.001 * math.sin(self.simulation_time * 0.05)
-        lon_offset = 0.001 * math.cos(self.simulation_time * 0.05)
-        latitude = base_lat + lat_offset + random.gauss(0, 0.0001)
-        longitude = base_lon + lon_offset + random.gauss(0, 0.0001)
+    def _record_insert_latency(self, batch_size: int, latency: float):
+        """Update flush statistics and re-tune the flush size from insert latency"""
+        flush_stats = self.stats["db_flush"]
+        latency_ms = latency * 1000.0
+        flush_stats["last_batch_size"] = batch_size
+        flush_stats["max_batch_size"] = max(flush_stats["max_batch_size"], batch_size)
+        flush_stats["last_insert_latency_ms"] = latency_ms
+        flush_stats["max_insert_latency_ms"] = max(
+            flush_stats["max_insert_latency_ms"], latency_ms
+        )
+        self._timed_db_writes += 1
+        flush_stats["avg_insert_latency_ms"] += (
+            latency_ms - flush_stats["avg_insert_latency_ms"]
+        ) / self._timed_db_writes
 
-        # Altitude simulation (varies with track elevation)
-        altitude_variation = 10.0 * math.sin(self.simulation_time * 0.03)
-        altitude = self.base_altitude + altitude_variation + random.gauss(0, 1.0)
+        # Halve on slow inserts; grow only when the size threshold was binding
+        if latency > DB_TARGET_INSERT_LATENCY:
+            self.db_flush_size = max(DB_MIN_BATCH_SIZE, self.db_flush_size // 2)
+        elif (latency < DB_TARGET_INSERT_LATENCY / 2
+              and batch_size >= self.db_flush_size):
+            self.db_flush_size = min(DB_MAX_BATCH_SIZE, int(self.db_flush_size * 1.5))
+        flush_stats["flush_size_threshold"] = self.db_flush_size
 
-        # IMU simulation
-        turning_rate = 2.0 * math.sin(self.simulation_time * 0.08)
-        gyro_x = random.gauss(0, 0.5)
-        gyro_y = random.gauss(0, 0.3)
-        gyro_z = turning_rate + random.gauss(0, 0.8)
+    async def _submit_batch_to_database(self, batch: TelemetryBatch):
+        """Start writing a batch, spilling it to disk while every sink is failing"""
+        if not any(sink.available for sink in self.sinks):
+            unspilled = [sink for sink in self.sinks if not self._spill_batch(batch, sink)]
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(("failed" if unspilled else "spilled", 0.0, unspilled))
+            self._db_pending.append((batch, future, False, time.perf_counter()))
+        else:
+            await self._db_inflight_slots.acquire()
+            task = asyncio.ensure_future(self._insert_with_retry(batch))
+            self._db_pending.append((batch, task, True, time.perf_counter()))
 
-        # Acceleration simulation
-        speed_acceleration = (speed - self.prev_speed) / MOCK_DATA_INTERVAL
-        self.prev_speed = speed
+        self.stats["db_flush"]["inflight_batches"] = len(self._db_pending)
+        self._db_pending_event.set()
 
-        accel_x = speed_acceleration + random.gauss(0, 0.2)
-        accel_y = turning_rate * speed * 0.1 + random.gauss(0, 0.1)
-        accel_z = 9.81 + random.gauss(0, 0.05)
+    def _write_to_sink(self, sink: StorageSink, batch: TelemetryBatch) -> Tuple[int, float]:
+        """Write a batch to one sink (runs on a DB worker thread)"""
+        if not batch:
+            return 0, 0.0
+        write_start = time.perf_counter()
+        rows_written = sink.write(batch)
+        return rows_written, time.perf_counter() - write_start
 
-        # Add vibration effects
-        vibration_factor = speed * 0.02
-        accel_x += random.gauss(0, vibration_factor)
-        accel_y += random.gauss(0, vibration_factor)
-        accel_z += random.gauss(0, vibration_factor)
+    def _spill_batch(self, batch: TelemetryBatch, sink: StorageSink) -> bool:
+        """Move a batch to a sink's disk spill store"""
+        try:
+            sink.spill_store.write(batch)
+        except OSError as e:
+            logger.error(f"❌ Failed to spill batch for {sink.name} to disk: {e}")
+            self.stats["errors"] += 1
+            self.stats["last_error"] = f"Spill write error: {str(e)}"
+            return False
 
-        # Calculate total acceleration
-        total_acceleration = math.sqrt(accel_x**2 + accel_y**2 + accel_z**2)
+        retry_stats = self.stats["db_retry"]
+        retry_stats["batches_spilled"] += 1
+        retry_stats["samples_spilled"] += len(batch)
+        retry_stats["spilled_batches_pending"] += 1
+        self.stats["sinks"][sink.name]["batches_spilled"] += 1
+        logger.warning(f"💽 Spilled {len(batch)} records to disk until {sink.name} "
+                       f"is reachable")
+        return True
 
-        self.simulation_time += 1
-        self.message_count += 1
+    async def _insert_with_retry(self, batch: TelemetryBatch):
+        """
+        Write a batch to every sink, retrying failed sinks with backoff and
+        jitter before spilling. Returns the status, the write latency and the
+        sinks that have the batch neither stored nor spilled.
+        """
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        holds_memory = False
+        status = "committed"
+        latency = 0.0
+        unspilled = []
 
-        return {
-            'timestamp': current_time.isoformat(),
-            'speed_ms': round(speed, 2),
-            'voltage_v': round(voltage, 2),
-            'current_a': round(current, 2),
-            'power_w': round(power, 2),
-            'energy_j': round(self.cumulative_energy, 2),
-            'distance_m': round(self.cumulative_distance, 2),
-            'latitude': round(latitude, 6),
-            'longitude': round(longitude, 6),
-            'altitude': round(altitude, 2),
-            'gyro_x': round(gyro_x, 3),
-            'gyro_y': round(gyro_y, 3),
-            'gyro_z': round(gyro_z, 3),
-            'accel_x': round(accel_x, 3),
-            'accel_y': round(accel_y, 3),
-            'accel_z': round(accel_z, 3),
-            'total_acceleration': round(total_acceleration, 3),
-            'message_id': self.message_count,
-            'uptime_seconds': self.simulation_time * MOCK_DATA_INTERVAL,
-            'data_source': 'MOCK_GENERATOR',
-            'session_id': self.session_id,
-            'session_name': self.session_name,
-        }
+        # Sinks already known to be down spill straight away
+        pending = []
+        for sink in self.sinks:
+            if sink.available:
+                pending.append(sink)
+            elif not self._spill_batch(batch, sink):
+                unspilled.append(sink)
+            elif status == "committed":
+                status = "spilled"
 
-    def _parse_json_message(self, data_bytes: bytes) -> Optional[Dict]:
-        """Parse JSON message from bytes"""
         try:
-            if isinstance(data_bytes, (bytes, bytearray)):
-                data_str = data_bytes.decode('utf-8')
-            else:
-                data_str = str(data_bytes)
-
-            parsed_data = json.loads(data_str)
-            logger.debug(f"✅ Successfully parsed JSON message with "
-                         f"{len(parsed_data)} fields")
-            return parsed_data
-        except (json.JSONDecodeError, UnicodeDecodeError) as e:
-            logger.debug(f"JSON parsing failed: {e}")
-            return None
+            while pending:
+                results = await asyncio.gather(*(
+                    loop.run_in_executor(self._db_executor, self._write_to_sink, sink, batch)
+                    for sink in pending
+                ), return_exceptions=True)
 
-    def _parse_binary_message(self, data_bytes: bytes) -> Optional[Dict]:
-        """Parse binary message from bytes"""
-        if len(data_bytes) != self.BINARY_MESSAGE_SIZE:
-            logger.debug(
-                f"Binary message size mismatch. Expected "
-                f"{self.BINARY_MESSAGE_SIZE}, got {len(data_bytes)}"
-            )
-            return None
+                failed = []
+                for sink, result in zip(pending, results):
+                    if isinstance(result, Exception):
+                        logger.error(f"❌ Failed to write batch to {sink.name} "
+                                     f"(attempt {attempt + 1}/{DB_RETRY_ATTEMPTS}): {result}")
+                        self.stats["errors"] += 1
+                        self.stats["last_error"] = f"Database write error: {str(result)}"
+                        self.stats["sinks"][sink.name]["errors"] += 1
+                        if sink.available:
+                            logger.warning(f"⚠️ {sink.name} unreachable, new batches "
+                                           f"will spill to disk")
+                            sink.available = False
+                        failed.append(sink)
+                    else:
+                        rows_written, sink_latency = result
+                        sink.available = True
+                        latency = max(latency, sink_latency)
+                        self._record_db_write(sink, batch, rows_written)
 
-        try:
-            unpacked_values = struct.unpack(self.BINARY_FORMAT, data_bytes)
-            data_dict = dict(zip(self.BINARY_FIELD_NAMES, unpacked_values))
-            data_dict['power_w'] = data_dict['voltage_v'] * data_dict['current_a']
-            logger.debug(f"✅ Successfully parsed binary message")
-            return data_dict
-        except struct.error as e:
-            logger.debug(f"Binary parsing failed: {e}")
-            return None
+                pending = failed
+                if not pending:
+                    break
 
-    def _normalize_telemetry_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Normalize and enhance telemetry data for consistent format"""
-        normalized = data.copy()
+                attempt += 1
+                if not holds_memory:
+                    holds_memory = True
+                    self._retrying_samples += len(batch)
+                if (attempt >= DB_RETRY_ATTEMPTS
+                        or self._retrying_samples > DB_RETRY_MEMORY_BUDGET):
+                    for sink in pending:
+                        if not self._spill_batch(batch, sink):
+                            unspilled.append(sink)
+                        elif status == "committed":
+                            status = "spilled"
+                    break
 
-        # Add session information (user-supplied name + uuid)
-        normalized['session_id'] = self.session_id
-        normalized['session_name'] = self.session_name
+                self.stats["db_retry"]["retries"] += 1
+                delay = random.uniform(
+                    0, min(DB_RETRY_MAX_DELAY, DB_RETRY_BASE_DELAY * 2 ** attempt)
+                )
+                await asyncio.sleep(delay)
+        finally:
+            if holds_memory:
+                self._retrying_samples -= len(batch)
 
-        # Ensure we have a current timestamp
-        if 'timestamp' not in normalized or normalized['timestamp'].startswith(
-            '1970-01-01'
-        ):
-            normalized['timestamp'] = datetime.now(timezone.utc).isoformat()
+        return ("failed" if unspilled else status), latency, unspilled
 
-        # Ensure timestamp is properly formatted for database
-        if isinstance(normalized['timestamp'], str):
-            try:
-                dt = datetime.fromisoformat(normalized['timestamp'].replace('Z',
-                                                                           '+00:00'))
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-                normalized['timestamp'] = dt.isoformat()
-            except ValueError:
-                normalized['timestamp'] = datetime.now(timezone.utc).isoformat()
-
-        # Ensure all required fields are present with reasonable defaults
-        required_fields = {
-            'speed_ms': 0.0,
-            'voltage_v': 0.0,
-            'current_a': 0.0,
-            'power_w': 0.0,
-            'energy_j': 0.0,
-            'distance_m': 0.0,
-            'latitude': 0.0,
-            'longitude': 0.0,
-            'altitude': 0.0,
-            'gyro_x': 0.0,
-            'gyro_y': 0.0,
-            'gyro_z': 0.0,
-            'accel_x': 0.0,
-            'accel_y': 0.0,
-            'accel_z': 0.0,
-            'total_acceleration': 0.0,
-            'message_id': 0,
-            'uptime_seconds': 0.0
-        }
+    def _hold_unspilled(self, batch: TelemetryBatch, sinks: List[StorageSink]):
+        """Keep a copy of a batch some sinks could not spill, blocking WAL truncation from its LSN"""
+        held_samples = sum(len(held) for _, held, _ in self._unspilled if held is not None)
+        copy = None
+        if held_samples + len(batch) <= DB_RETRY_MEMORY_BUDGET:
+            copy = batch.select(np.ones(len(batch), dtype=bool))
+        else:
+            logger.warning(f"⚠️ {len(batch)} unspilled records left to the WAL; "
+                           f"they will be replayed on the next start")
+        if not self._unspilled:
+            logger.warning("⚠️ WAL kept from this batch on until it is spilled")
+        self._unspilled.append((batch.lsn, copy, sinks))
+        self.stats["db_retry"]["unspilled_batches"] = len(self._unspilled)
 
-        for field, default_value in required_fields.items():
-            if field not in normalized:
-                normalized[field] = default_value
-
-        # Calculate power if not present
-        if 'power_w' not in normalized or normalized['power_w'] == 0:
-            normalized['power_w'] = normalized['voltage_v'] * normalized['current_a']
-
-        # Calculate total acceleration if not present
-        if 'total_acceleration' not in normalized or normalized[
-            'total_acceleration'
-        ] == 0:
-            normalized['total_acceleration'] = math.sqrt(
-                normalized['accel_x']**2 +
-                normalized['accel_y']**2 +
-                normalized['accel_z']**2
-            )
+    def _retry_unspilled_spills(self):
+        """Spill held batches again; truncate the WAL once none is left"""
+        now = time.monotonic()
+        if not self._unspilled or now - self._last_unspilled_retry < DB_SPILL_RETRY_INTERVAL:
+            return
+        self._last_unspilled_retry = now
 
-        # Add data source tag
-        normalized['data_source'] = 'ESP32_REAL' if not self.mock_mode else 'MOCK_GENERATOR'
+        while self._unspilled:
+            lsn, batch, sinks = self._unspilled[0]
+            if batch is None:
+                break
+            sinks[:] = [sink for sink in sinks if not self._spill_batch(batch, sink)]
+            if sinks:
+                break
+            self._unspilled.popleft()
+        self.stats["db_retry"]["unspilled_batches"] = len(self._unspilled)
+        if not self._unspilled:
+            logger.info("✅ Unspilled batches are on disk; WAL truncation resumed")
+        self._commit_wal()
 
-        return normalized
+    def _commit_wal(self):
+        """Truncate the WAL up to the last acknowledged batch before any unspilled one"""
+        lsn = self._wal_acknowledged_lsn
+        if self._unspilled and self._unspilled[0][0] is not None:
+            lsn = min(lsn, self._unspilled[0][0] - 1)
+        if lsn > self._wal_committed_lsn:
+            self.wal.commit(lsn)
+            self._wal_committed_lsn = lsn
 
-    def _on_esp32_message_received(self, message):
-        """Handle incoming messages from ESP32 with improved parsing"""
+    async def _acknowledge_next_batch(self):
+        """Wait for the oldest in-flight write and record its outcome"""
+        batch, future, holds_slot, submitted_at = self._db_pending[0]
         try:
-            logger.debug(f"📨 Received message from ESP32 - Type: {type(message.data)}")
-
-            data = None
-
-            # Try to parse the message data
-            if isinstance(message.data, (bytes, bytearray)):
-                # Try JSON first (most common case)
-                data = self._parse_json_message(message.data)
-                if data is None:
-                    # If JSON fails, try binary parsing
-                    data = self._parse_binary_message(message.data)
-            elif isinstance(message.data, str):
-                try:
-                    data = json.loads(message.data)
-                except json.JSONDecodeError:
-                    logger.error("❌ Failed to parse string as JSON")
-            elif isinstance(message.data, dict):
-                data = message.data
-            else:
-                logger.warning(f"⚠️ Unhandled message data type: {type(message.data)}")
-                return
+            status, latency, unspilled = await future
+            self._retry_unspilled_spills()
 
-            if data is None:
-                logger.error("❌ Failed to parse message in any known format")
-                self.stats["errors"] += 1
-                self.stats["last_error"] = "Failed to parse message"
+            if status == "failed":
+                # Some sink has the batch neither stored nor spilled: hold it
+                # and retry the spill; the WAL keeps it until then
+                if batch.lsn is not None:
+                    self._hold_unspilled(batch, unspilled)
                 return
 
-            # Normalize the data (this will attach session_name/session_id)
-            normalized_data = self._normalize_telemetry_data(data)
-
-            # Add to message queue for real-time republishing
-            self.message_queue.put(normalized_data)
+            # Stored or spilled for every sink: the WAL no longer needs the batch
+            if batch.lsn is not None:
+                self._wal_acknowledged_lsn = max(self._wal_acknowledged_lsn, batch.lsn)
+                self._commit_wal()
 
-            # Add to database buffer
-            with self.db_buffer_lock:
-                self.db_buffer.append(normalized_data)
-
-            self.stats["messages_received"] += 1
-            self.stats["last_message_time"] = datetime.now(timezone.utc)
+            if status == "spilled" or not batch:
+                return
 
-            logger.debug(
-                f"📊 ESP32 Data Processed - Speed: {normalized_data.get('speed_ms', 0):.2f} "
-                f"m/s, Power: {normalized_data.get('power_w', 0):.2f} W, "
-                f"Altitude: {normalized_data.get('altitude', 0):.2f} m"
-            )
+            self._record_insert_latency(len(batch), latency)
+            self.latency["db_commit"].observe(time.perf_counter() - submitted_at)
+            self._observe_end_to_end("end_to_end_db", batch)
 
         except Exception as e:
-            logger.error(f"❌ Error handling ESP32 message: {e}")
+            logger.error(f"❌ Failed to write batch to database: {e}")
             self.stats["errors"] += 1
-            self.stats["last_error"] = str(e)
+            self.stats["last_error"] = f"Database write error: {str(e)}"
+        finally:
+            self._db_pending.popleft()
+            self.stats["db_flush"]["inflight_batches"] = len(self._db_pending)
+            self.db_buffer.release(batch)
+            if holds_slot:
+                self._db_inflight_slots.release()
 
-    async def generate_mock_data_loop(self):
-        """Generate mock data at regular intervals"""
-        if not self.mock_mode:
+    def _observe_end_to_end(self, stage: str, batch: TelemetryBatch):
+        """Record the age of each sample in a batch, measured from its timestamp"""
+        now_us = (datetime.now(timezone.utc) - UNIX_EPOCH) // timedelta(microseconds=1)
+        ages = (now_us - batch.columns['timestamp_us']) / 1e6
+        self.latency[stage].observe_many(np.maximum(ages, 0.0))
+
+    def _record_db_write(self, sink: StorageSink, batch: TelemetryBatch, records_written: int):
+        sink_stats = self.stats["sinks"][sink.name]
+        sink_stats["rows_written"] += records_written
+        sink_stats["batches_written"] += 1
+        # Rollups count what the summary table's sink stored, so a batch
+        # replayed from the WAL is folded in exactly when it lands. Batches
+        # of earlier sessions are merged into their stored buckets; one
+        # whose rows were all stored already (before a crash) adds nothing
+        if sink.supports_summaries and records_written:
+            self.rollups.add(batch, merge=batch.session_id != self.session_id)
+        if sink is not self.sinks[0]:
+            logger.debug(f"💾 Wrote {records_written} records to {sink.name}")
             return
 
+        # The first sink is the system of record for the headline counters
+        self.stats["messages_stored_db"] += records_written
+        self.stats["last_db_write_time"] = datetime.now(timezone.utc)
+        # Only this run's session: an upsert from a partial replay of an
+        # earlier session would overwrite that session's complete row
+        if batch.session_id == self.session_id:
+            self.session_catalog.add(batch, records_written)
+
+        if records_written:
+            logger.info(
+                f"💾 Wrote {records_written} records to {sink.name} "
+                f"(Session: {batch.session_name} / {batch.session_id[:8]}...)"
+            )
+        if records_written < len(batch):
+            logger.debug(f"{len(batch) - records_written} records were "
+                         f"already stored, skipped as duplicates")
+
+    async def spill_drain_loop(self):
+        """Write spilled batches back to their sinks, backing off while they are down"""
+        if not await self._wait_until_ready(self._sinks_ready):
+            return
+        delay = DB_RETRY_BASE_DELAY
+        loop = asyncio.get_running_loop()
         while self.running:
             try:
-                mock_data = self.generate_mock_telemetry_data()
+                await asyncio.sleep(delay)
+                self._retry_unspilled_spills()
+                pending_counts = {sink: len(sink.spill_store.pending()) for sink in self.sinks}
+                self.stats["db_retry"]["spilled_batches_pending"] = sum(pending_counts.values())
 
-                # Add to message queue for real-time republishing
-                self.message_queue.put(mock_data)
+                for sink, pending_count in pending_counts.items():
+                    if not pending_count:
+                        # Nothing left on disk: let the next batch probe the sink
+                        sink.available = True
+                        continue
 
-                # Add to database buffer
-                with self.db_buffer_lock:
-                    self.db_buffer.append(mock_data)
+                    for path in sink.spill_store.pending():
+                        if not self.running:
+                            break
+                        batch = sink.spill_store.read(path)
+                        if batch is None:
+                            logger.warning(f"⚠️ Discarding unreadable spill file {path}")
+                            sink.spill_store.remove(path)
+                            continue
 
-                self.stats["messages_received"] += 1
-                self.stats["last_message_time"] = datetime.now(timezone.utc)
+                        rows_written, _ = await loop.run_in_executor(
+                            self._db_executor, self._write_to_sink, sink, batch
+                        )
+                        sink.spill_store.remove(path)
+                        sink.available = True
+                        self.stats["db_retry"]["spilled_batches_recovered"] += 1
+                        self.stats["db_retry"]["spilled_batches_pending"] -= 1
+                        self._record_db_write(sink, batch, rows_written)
 
-                await asyncio.sleep(MOCK_DATA_INTERVAL)
+                delay = DB_RETRY_BASE_DELAY
 
             except Exception as e:
-                logger.error(f"❌ Error generating mock data: {e}")
+                delay = min(DB_RETRY_MAX_DELAY, delay * 2)
+                logger.warning(f"⚠️ Spilled batches not written yet, retrying in "
+                               f"{delay:.1f}s: {e}")
                 self.stats["errors"] += 1
-                self.stats["last_error"] = str(e)
+                self.stats["last_error"] = f"Spill replay error: {str(e)}"
 
-    async def republish_messages(self):
-        """Republish messages to dashboard channel for real-time updates"""
-        while self.running:
+    async def database_commit_acknowledger(self):
+        """Acknowledge database commits in the order batches were submitted"""
+        while self.running or self._db_pending:
             try:
-                if not self.message_queue.empty():
-                    messages_to_publish = []
-                    while not self.message_queue.empty() and len(
-                        messages_to_publish
-                    ) < 10:
-                        messages_to_publish.append(self.message_queue.get_nowait())
-
-                    for message_data in messages_to_publish:
-                        try:
-                            await self.dashboard_channel.publish(
-                                'telemetry_update', message_data
-                            )
-                            self.stats["messages_republished"] += 1
-                        except Exception as e:
-                            logger.error(f"❌ Failed to republish message: {e}")
-                            self.stats["errors"] += 1
-                            self.stats["last_error"] = str(e)
-
-                    if messages_to_publish:
-                        source_info = "MOCK" if self.mock_mode else "ESP32"
-                        logger.debug(f"📡 Republished {len(messages_to_publish)} "
-                                     f"{source_info} messages")
-
-                await asyncio.sleep(0.1)
+                if not self._db_pending:
+                    self._db_pending_event.clear()
+                    try:
+                        await asyncio.wait_for(self._db_pending_event.wait(), 1.0)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self._acknowledge_next_batch()
 
             except Exception as e:
-                logger.error(f"❌ Error in republish loop: {e}")
+                logger.error(f"❌ Error in database commit acknowledger: {e}")
                 self.stats["errors"] += 1
                 self.stats["last_error"] = str(e)
 
-    async def database_batch_writer(self):
-        """Write batched data to Supabase database every 9 seconds"""
+    async def _write_batch_to_database(self, batch: TelemetryBatch):
+        """Write a batch to Supabase and wait until every earlier batch is acknowledged"""
+        await self._submit_batch_to_database(batch)
+        while self._db_pending:
+            await self._acknowledge_next_batch()
+
+    async def wal_sync_loop(self):
+        """Fsync WAL appends in groups"""
         while self.running:
             try:
-                await asyncio.sleep(DB_BATCH_INTERVAL)
-
-                # Get current batch of data
-                batch_data = []
-                with self.db_buffer_lock:
-                    if self.db_buffer:
-                        batch_data = self.db_buffer.copy()
-                        self.db_buffer.clear()
-
-                # Write batch to database if we have data
-                if batch_data:
-                    await self._write_batch_to_database(batch_data)
-
+                await asyncio.sleep(WAL_FSYNC_INTERVAL)
+                self.wal.sync()
             except Exception as e:
-                logger.error(f"❌ Error in database batch writer: {e}")
+                logger.error(f"❌ Error syncing WAL: {e}")
                 self.stats["errors"] += 1
                 self.stats["last_error"] = str(e)
 
-    async def _write_batch_to_database(self, batch_data: List[Dict[str, Any]]):
-        """Write a batch of telemetry data to Supabase database"""
-        try:
-            if not self.supabase_client or not batch_data:
-                return
+    async def replay_wal_backlog(self, recovered: List[TelemetryBatch]):
+        """
+        Resubmit batches recovered from the WAL of a previous run.
 
-            # Prepare data for database insertion
-            db_records = []
-            for record in batch_data:
-                db_record = {
-                    'session_id': record['session_id'],
-                    'session_name': record.get('session_name', self.session_name),
-                    'timestamp': record['timestamp'],
-                    'speed_ms': record['speed_ms'],
-                    'voltage_v': record['voltage_v'],
-                    'current_a': record['current_a'],
-                    'power_w': record['power_w'],
-                    'energy_j': record['energy_j'],
-                    'distance_m': record['distance_m'],
-                    'latitude': record['latitude'],
-                    'longitude': record['longitude'],
-                    'altitude_m': record['altitude'],
-                    'gyro_x': record['gyro_x'],
-                    'gyro_y': record['gyro_y'],
-                    'gyro_z': record['gyro_z'],
-                    'accel_x': record['accel_x'],
-                    'accel_y': record['accel_y'],
-                    'accel_z': record['accel_z'],
-                    'total_acceleration': record['total_acceleration'],
-                    'message_id': record['message_id'],
-                    'uptime_seconds': record['uptime_seconds'],
-                }
-                db_records.append(db_record)
+        One write per logged batch: each lies within one of the previous
+        run's flushes, so it was stored whole or not at all before the
+        crash, and the rows a write reports as new tell the rollups
+        whether to count it.
+        """
+        for batch in recovered:
+            await self._submit_batch_to_database(batch)
 
-            # Insert batch into database
-            response = self.supabase_client.table(SUPABASE_TABLE_NAME).insert(
-                db_records
-            ).execute()
+    def render_metrics(self) -> str:
+        """Stats, queue depths and latency histograms in Prometheus text format"""
+        prefix = "telemetry_bridge"
+        lines = []
 
-            if response.data:
-                records_written = len(response.data)
-                self.stats["messages_stored_db"] += records_written
-                self.stats["last_db_write_time"] = datetime.now(timezone.utc)
+        def metric(name: str, metric_type: str, help_text: str, value, labels: str = ""):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {metric_type}")
+            lines.append(f"{prefix}_{name}{{{labels}}} {value}" if labels
+                         else f"{prefix}_{name} {value}")
 
-                logger.info(
-                    f"💾 Wrote {records_written} records to database "
-                    f"(Session: {self.session_name} / {self.session_id[:8]}...)"
-                )
+        metric("messages_received_total", "counter", "Samples normalized from the source",
+               self.stats["messages_received"])
+        metric("messages_republished_total", "counter", "Samples published to the dashboard",
+               self.stats["messages_republished"])
+        metric("messages_stored_db_total", "counter", "Rows confirmed by Supabase",
+               self.stats["messages_stored_db"])
+        metric("publish_calls_total", "counter", "Dashboard publish calls",
+               self.stats["publish_calls"])
+        metric("bytes_received_total", "counter", "Raw payload bytes received",
+               self.stats["bytes_received"])
+        metric("bytes_published_total", "counter", "Columnar frame bytes published",
+               self.stats["bytes_published"])
+        metric("errors_total", "counter", "Errors logged by the bridge", self.stats["errors"])
+        metric("duplicates_dropped_total", "counter", "Samples dropped as repeated message ids",
+               self.stats["dedup"]["duplicates_dropped"])
+        lines.append(f"# HELP {prefix}_tier_messages_published_total "
+                     f"Dashboard messages published per output channel")
+        lines.append(f"# TYPE {prefix}_tier_messages_published_total counter")
+        for channel_name, tier_stats in self.stats["tiers"].items():
+            lines.append(f'{prefix}_tier_messages_published_total{{channel="{channel_name}"}} '
+                         f'{tier_stats["messages_published"]}')
+        metric("db_flushes_total", "counter", "Database flushes",
+               self.stats["db_flush"]["flushes"])
+        metric("db_retries_total", "counter", "Database write retries",
+               self.stats["db_retry"]["retries"])
+
+        lines.append(f"# HELP {prefix}_decoded_payloads_total Payloads decoded by format")
+        lines.append(f"# TYPE {prefix}_decoded_payloads_total counter")
+        for payload_format, decode_stats in self.stats["decode"].items():
+            lines.append(f'{prefix}_decoded_payloads_total{{format="{payload_format}"}} '
+                         f'{decode_stats["count"]}')
+
+        metric("raw_ingest_depth", "gauge", "Raw payloads waiting for normalization",
+               len(self.raw_ingest))
+        metric("republish_queue_depth", "gauge", "Batches waiting to be republished",
+               len(self.message_queue))
+        metric("db_buffer_samples", "gauge", "Samples buffered for the next flush",
+               len(self.db_buffer))
+        metric("db_buffer_overwritten_total", "counter",
+               "Samples overwritten because the DB buffer was full",
+               self.db_buffer.overwritten)
+        for name, metric_type, help_text in (
+            ("queue_high_water", "gauge", "Most entries (samples or payloads) an inter-stage "
+                                          "queue has held"),
+            ("queue_dropped_total", "counter", "Entries dropped by a full queue's policy"),
+            ("queue_coalesced_total", "counter", "Entries replaced by a newer one in a full queue"),
+            ("queue_blocked_seconds_total", "counter", "Time producers waited on a full queue"),
+        ):
+            field = name[len("queue_"):].replace("_total", "")
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {metric_type}")
+            for queue_name, queue_stats in self._refresh_queue_stats().items():
+                lines.append(f'{prefix}_{name}{{queue="{queue_name}"}} {queue_stats[field]}')
+        metric("db_flush_size_threshold", "gauge", "Current adaptive flush size",
+               self.db_flush_size)
+        metric("db_inflight_batches", "gauge", "Batches written but not yet acknowledged",
+               len(self._db_pending))
+        metric("db_retrying_samples", "gauge", "Samples held in memory for retry",
+               self._retrying_samples)
+        metric("spilled_batches_pending", "gauge", "Spilled batches waiting for the database",
+               self.stats["db_retry"]["spilled_batches_pending"])
+        metric("worker_inflight_chunks", "gauge", "Payload chunks dispatched to ingest workers",
+               len(self._worker_pending))
+        metric("worker_utilization", "gauge", "Busy fraction of the ingest worker processes",
+               self.stats["workers"]["utilization"])
+        metric("rollup_rows_written_total", "counter", "Rollup rows upserted",
+               self.stats["rollups"]["rows_written"])
+        metric("rollup_rows_pending", "gauge", "Rollup rows waiting to be written",
+               self.stats["rollups"]["rows_pending"])
+
+        name = f"{prefix}_event_loop_lag_seconds"
+        lines.append(f"# HELP {name} Delay of event-loop timers past their deadline")
+        lines.append(f"# TYPE {name} histogram")
+        lines.extend(self.loop_lag.render(name))
+
+        name = f"{prefix}_stage_latency_seconds"
+        lines.append(f"# HELP {name} Per-stage pipeline latency")
+        lines.append(f"# TYPE {name} histogram")
+        for stage, histogram in self.latency.items():
+            lines.extend(histogram.render(name, f'stage="{stage}"'))
+
+        return "\n".join(lines) + "\n"
+
+    async def _handle_metrics_request(self, reader: asyncio.StreamReader,
+                                      writer: asyncio.StreamWriter):
+        """Answer one HTTP request: GET /metrics, anything else is a 404"""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5.0)
+            while True:
+                header = await asyncio.wait_for(reader.readline(), timeout=5.0)
+                if header in (b'\r\n', b'\n', b''):
+                    break
+
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+                status, body = "200 OK", self.render_metrics().encode('utf-8')
             else:
-                logger.warning("⚠️ Database write returned no data")
+                status, body = "404 Not Found", b"Not Found\n"
 
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode('latin-1') + body
+            )
+            await writer.drain()
         except Exception as e:
-            logger.error(f"❌ Failed to write batch to database: {e}")
-            self.stats["errors"] += 1
-            self.stats["last_error"] = f"Database write error: {str(e)}"
+            logger.debug(f"Metrics request failed: {e}")
+        finally:
+            writer.close()
+
+    async def start_metrics_server(self):
+        """Serve /metrics on METRICS_HOST:METRICS_PORT"""
+        if METRICS_PORT is None:
+            return
+        try:
+            self._metrics_server = await asyncio.start_server(
+                self._handle_metrics_request, METRICS_HOST, METRICS_PORT
+            )
+            logger.info(f"📈 Metrics at http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            logger.warning(f"⚠️ Metrics endpoint not started: {e}")
+
+    def _refresh_queue_stats(self) -> Dict[str, Dict[str, Any]]:
+        db_buffer_stats = self.stats["queues"]["db_buffer"]
+        db_buffer_stats["high_water"] = self.db_buffer.high_water
+        db_buffer_stats["dropped"] = self.db_buffer.overwritten
+        return self.stats["queues"]
+
+    async def loop_lag_monitor(self):
+        """Measure how late the event loop runs a timer; blocking work on the loop shows here"""
+        loop = asyncio.get_running_loop()
+        while self.running:
+            expected = loop.time() + LOOP_LAG_INTERVAL
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            lag = max(loop.time() - expected, 0.0)
+            self.loop_lag.observe(lag)
+            lag_stats = self.stats["loop_lag"]
+            lag_stats["last_ms"] = lag * 1000
+            lag_stats["max_ms"] = max(lag_stats["max_ms"], lag * 1000)
 
     async def print_stats(self):
         """Print periodic statistics"""
         while self.running:
             try:
-                await asyncio.sleep(30)
+                # Wake every second so shutdown is not held up by the interval
+                for _ in range(30):
+                    if not self.running:
+                        return
+                    await asyncio.sleep(1)
 
                 mode_info = "MOCK DATA" if self.mock_mode else "ESP32 DATA"
                 buffer_size = len(self.db_buffer)
+                if self.db_buffer.overwritten:
+                    logger.warning(
+                        f"⚠️ DB buffer full, {self.db_buffer.overwritten} "
+                        f"oldest samples overwritten so far"
+                    )
 
                 logger.info(
                     f"📊 STATS ({mode_info}) - "
@@ -585,6 +4973,12 @@ class TelemetryBridgeWithDB:
                     f"Republished: {self.stats['messages_republished']}, "
                     f"DB Stored: {self.stats['messages_stored_db']}, "
                     f"Buffer: {buffer_size}, "
+                    f"Flushes: {self.stats['db_flush']['flushes']} "
+                    f"(size {self.db_flush_size}, "
+                    f"avg {self.stats['db_flush']['avg_insert_latency_ms']:.0f} ms), "
+                    f"p99 publish/DB: "
+                    f"≤{self.latency['end_to_end_publish'].quantile(0.99):g}s/"
+                    f"≤{self.latency['end_to_end_db'].quantile(0.99):g}s, "
                     f"Errors: {self.stats['errors']}, "
                     f"Session: {self.session_name} ({self.session_id[:8]}...)"
                 )
@@ -592,42 +4986,85 @@ class TelemetryBridgeWithDB:
                 if self.stats['last_error']:
                     logger.info(f"🔍 Last Error: {self.stats['last_error']}")
 
+                logger.info("🚦 Queues (high water / capacity): " + ", ".join(
+                    f"{queue_name} {queue_stats['high_water']}/{queue_stats['capacity']}"
+                    + (f" dropped {queue_stats['dropped']}" if queue_stats['dropped'] else "")
+                    + (f" coalesced {queue_stats['coalesced']}" if queue_stats['coalesced'] else "")
+                    for queue_name, queue_stats in self._refresh_queue_stats().items()
+                ))
+
+                lag_stats = self.stats["loop_lag"]
+                logger.info(f"⏱️ Event loop lag: last {lag_stats['last_ms']:.1f} ms, "
+                            f"max {lag_stats['max_ms']:.1f} ms, "
+                            f"p99 ≤{self.loop_lag.quantile(0.99):g}s")
+
+                spilled = self.stats["db_retry"]["spilled_batches_pending"]
+                if spilled:
+                    logger.info(f"💽 {spilled} spilled batches waiting for the database")
+
+                if self.tiers:
+                    logger.info("📶 Tiers: " + ", ".join(
+                        f"{channel_name} {tier_stats['messages_published']} msgs"
+                        for channel_name, tier_stats in self.stats["tiers"].items()
+                    ))
+
+                if self._workers_ready:
+                    worker_stats = self.stats["workers"]
+                    logger.info(f"🧵 Workers: {self.workers}, "
+                                f"utilization {worker_stats['utilization']:.0%}, "
+                                f"{worker_stats['inflight_chunks']} chunks in flight")
+
             except Exception as e:
                 logger.error(f"❌ Error in stats loop: {e}")
 
     async def run(self):
         """Main run loop for the telemetry bridge"""
         try:
-            # Connect to Supabase first
-            if not await self.connect_supabase():
-                logger.error("❌ Failed to connect to Supabase, exiting")
-                return
-
-            # Connect to ESP32 source (or skip if mock mode)
-            if not await self.connect_esp32_subscriber() and not self.mock_mode:
-                logger.error("❌ Failed to connect to ESP32, exiting")
-                return
+            # Open the WAL and pick up anything a previous run left unconfirmed;
+            # it is local, so ingest can log samples while connections come up
+            self._wal_recovered = self.wal.open()
+            self._wal_open = True
+            if self._wal_recovered:
+                logger.info(
+                    f"♻️ Replaying {sum(len(b) for b in self._wal_recovered)} "
+                    f"samples from the WAL of a previous run"
+                )
 
-            # Connect to dashboard output
-            if not await self.connect_dashboard_publisher():
-                logger.error("❌ Failed to connect to dashboard, exiting")
-                return
+            await self.start_metrics_server()
 
             self.running = True
+            if self._profile_on_start:
+                self._start_profiling(self.profiler)
+            if self._trace_allocations_on_start:
+                self._start_profiling(self.allocations)
             logger.info(
-                f"🚀 Telemetry bridge started successfully "
+                f"🚀 Telemetry bridge starting "
                 f"(Session: {self.session_name} / {self.session_id[:8]}...)"
             )
 
-            # Start all async tasks
+            # Start all async tasks; connections are made concurrently and
+            # the republisher and DB writer wait for their own connection
             tasks = [
+                self.connect_all(),
+                self.ingest_loop(),
                 self.republish_messages(),
+                self.tier_publish_loop(),
                 self.database_batch_writer(),
+                self.database_commit_acknowledger(),
+                self.spill_drain_loop(),
+                self.wal_sync_loop(),
+                self.loop_lag_monitor(),
                 self.print_stats()
             ]
+            if self.workers:
+                tasks.append(self.worker_results_loop())
 
             # Add mock data generation if in mock mode
-            if self.mock_mode:
+            if self.load_generator:
+                tasks.append(self.load_generator_loop())
+            elif self.replay:
+                tasks.append(self.replay_loop())
+            elif self.mock_mode:
                 tasks.append(self.generate_mock_data_loop())
 
             # Run all tasks concurrently
@@ -645,20 +5082,56 @@ class TelemetryBridgeWithDB:
         try:
             logger.info("🧹 Cleaning up...")
 
-            # Write any remaining buffered data to database
-            with self.db_buffer_lock:
-                remaining = self.db_buffer.copy()
-                self.db_buffer.clear()
+            # Normalize anything still queued (after what the workers hold, to
+            # keep arrival order), then write remaining buffered data
+            while self._worker_pending:
+                await self._accept_next_worker_result()
+            if self._worker_pool is not None:
+                self._worker_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_raw_ingest()
+            if self._dashboard_ready.is_set():
+                await self._drain_republish_queue()
+            remaining = self.db_buffer.swap()
 
-            if remaining:
+            if not self._sinks_ready.is_set():
+                # Never stored anywhere: the WAL keeps it for the next start
+                if remaining is not None:
+                    logger.warning(f"⚠️ No storage sink opened; {len(remaining)} records "
+                                   f"stay in the WAL for the next start")
+            elif remaining is not None:
                 logger.info(f"💾 Writing final batch of {len(remaining)} records to database")
                 await self._write_batch_to_database(remaining)
+            else:
+                while self._db_pending:
+                    await self._acknowledge_next_batch()
+
+            if self._sinks_ready.is_set():
+                if self._summary_task is not None:
+                    await self._summary_task
+                await self.write_summaries(final=True)
+            self._db_executor.shutdown(wait=False)
+            for sink in self.sinks:
+                sink.close()
+
+            if self._metrics_server:
+                self._metrics_server.close()
+
+            for tool in (self.profiler, self.allocations):
+                if tool.active:
+                    self._write_profile_report(tool)
+
+            if self.capture:
+                self.capture.close()
+                logger.info(f"📼 Recorded {self.capture.payloads} payloads to {self.capture.path}")
+
+            if self._wal_open:
+                self.wal.close()
 
-            # Close Ably connections
-            if self.esp32_client:
-                await self.esp32_client.close()
-            if self.dashboard_client:
-                await self.dashboard_client.close()
+            # Close the transports (Ably connections, local sockets)
+            for fanout in self._fanout_channels:
+                await fanout.close()
+            for transport in self.transports:
+                await transport.close()
 
             # Supabase client doesn't need explicit cleanup
 
@@ -681,7 +5154,7 @@ def get_user_preferences() -> (bool, str):
     print("This bridge will:")
     print("  • Connect to ESP32 telemetry OR generate mock data")
     print("  • Republish to dashboard for real-time updates")
-    print("  • Store data in Supabase database every 9 seconds")
+    print("  • Store data in Supabase database in adaptive batches (at most 9 s old)")
     print("  • Manage sessions for historical data retrieval")
     print()
     print("Choose data source mode:")
@@ -726,17 +5199,155 @@ def get_user_preferences() -> (bool, str):
     return mock_mode, session_name
 
 
-async def main():
+def parse_tier(value: str) -> Tuple[str, float]:
+    """CHANNEL:SECONDS command-line tier specification"""
+    channel_name, _, interval = value.rpartition(':')
+    try:
+        seconds = float(interval)
+    except ValueError:
+        seconds = 0.0
+    if not channel_name or not seconds > 0:
+        raise argparse.ArgumentTypeError(f"expected CHANNEL:SECONDS, got {value!r}")
+    return channel_name, seconds
+
+
+def parse_speed(value: str) -> Optional[float]:
+    """Replay speed: a multiple of the recorded pace, or "max" (None)"""
+    if value == "max":
+        return None
+    try:
+        speed = float(value)
+    except ValueError:
+        speed = 0.0
+    if not speed > 0:
+        raise argparse.ArgumentTypeError(f"expected a positive number or 'max', got {value!r}")
+    return speed
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Command-line options; without --load-test the bridge asks interactively"""
+    parser = argparse.ArgumentParser(
+        description="ESP32 telemetry bridge to the dashboard and Supabase"
+    )
+    parser.add_argument("--load-test", action="store_true",
+                        help="feed seeded generated telemetry instead of asking for a data source")
+    parser.add_argument("--rate", type=float, default=10.0,
+                        help="samples per second per vehicle "
+                             f"({LOAD_MIN_RATE_HZ:g}-{LOAD_MAX_RATE_HZ:g})")
+    parser.add_argument("--vehicles", type=int, default=1,
+                        help="number of simulated vehicles")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="random seed of the generated telemetry")
+    parser.add_argument("--payload-format", choices=("frame", "json"), default="frame",
+                        help="payload encoding of the generated telemetry")
+    parser.add_argument("--samples-per-frame", type=int, default=None,
+                        help="samples per generated frame (default: all samples due "
+                             "for a vehicle in one frame)")
+    parser.add_argument("--ramp", action="store_true",
+                        help=f"multiply the rate by {LOAD_RAMP_FACTOR:g} every "
+                             f"{LOAD_STEP_SECONDS:g} s until queues grow, then report "
+                             f"the max sustainable throughput and stop")
+    parser.add_argument("--record", metavar="PATH",
+                        help="record every raw incoming payload with its arrival time "
+                             "(gzip-compressed if PATH ends in .gz)")
+    replay_group = parser.add_mutually_exclusive_group()
+    replay_group.add_argument("--replay", metavar="PATH",
+                              help="feed a --record capture through the bridge instead of "
+                                   "asking for a data source; stops at the end")
+    replay_group.add_argument("--replay-session", metavar="SESSION_ID",
+                              help=f"replay a session stored in the {SUPABASE_TABLE_NAME} table")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, metavar="N|max",
+                        help="replay at N x the recorded pace, or as fast as the bridge "
+                             "keeps up (default: 1)")
+    parser.add_argument("--session-name", help="session name for --load-test and replays")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, metavar="N",
+                        help="parse and normalize on N worker processes "
+                             "(default: on the event loop)")
+    parser.add_argument("--tiers", nargs="*", type=parse_tier, metavar="CHANNEL:SECONDS",
+                        help="coalesced dashboard channels next to the full-rate one "
+                             "(default: " + " ".join(
+                                 f"{name}:{interval:g}" for name, interval in DASHBOARD_TIERS.items()
+                             ) + "; no value disables them)")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"sample thread stacks from the start (SIGUSR1 toggles at "
+                             f"runtime); collapsed stacks go to {PROFILE_DIR}/")
+    parser.add_argument("--trace-allocations", action="store_true",
+                        help=f"run tracemalloc from the start (SIGUSR2 toggles at "
+                             f"runtime); top allocations go to {PROFILE_DIR}/")
+    parser.add_argument("--input-transport", choices=tuple(TRANSPORTS), default=INPUT_TRANSPORT,
+                        help="transport the ESP32 telemetry arrives on")
+    parser.add_argument("--output-transports", nargs="+", choices=tuple(TRANSPORTS),
+                        default=list(OUTPUT_TRANSPORTS),
+                        help="dashboard output transports; the first is published to "
+                             "directly, the rest asynchronously (e.g. udp ably)")
+    parser.add_argument("--sinks", nargs="+", default=list(STORAGE_SINKS),
+                        choices=("supabase", *LOCAL_SINKS),
+                        help="storage sinks written on every flush (the first one "
+                             "is the system of record)")
+    parser.add_argument("--sync-local", metavar="SQLITE_PATH", nargs="?", const=SQLITE_PATH,
+                        help="upload rows of a local SQLite sink to Supabase and exit")
+    parser.add_argument("--backfill-sessions", action="store_true",
+                        help=f"rebuild the {SESSIONS_TABLE_NAME} catalog from every "
+                             f"stored row and exit")
+    args = parser.parse_args(argv)
+
+    if not LOAD_MIN_RATE_HZ <= args.rate <= LOAD_MAX_RATE_HZ:
+        parser.error(f"--rate must be between {LOAD_MIN_RATE_HZ:g} and {LOAD_MAX_RATE_HZ:g}")
+    if args.vehicles < 1:
+        parser.error("--vehicles must be at least 1")
+    return args
+
+
+async def main(args: argparse.Namespace):
     """Main application entry point"""
     try:
-        mock_mode, session_name = get_user_preferences()
+        if args.sync_local:
+            synced = await asyncio.to_thread(sync_local_to_supabase, args.sync_local)
+            logger.info(f"✅ {synced} local records synced to Supabase")
+            return
+        if args.backfill_sessions:
+            cataloged = await asyncio.to_thread(backfill_sessions_catalog)
+            logger.info(f"✅ {cataloged} sessions written to the {SESSIONS_TABLE_NAME} catalog")
+            return
+
+        load_generator = None
+        replay = None
+        if args.replay or args.replay_session:
+            if args.replay:
+                replay = ReplaySource.from_capture(args.replay, args.speed)
+            else:
+                replay = ReplaySource.from_session(args.replay_session, args.speed)
+            mock_mode = True
+            session_name = args.session_name or f"M Replay {str(uuid.uuid4())[:8]}"
+            if not session_name.startswith("M "):
+                session_name = "M " + session_name
+        elif args.load_test:
+            load_generator = LoadGenerator(args.rate, args.vehicles, args.seed,
+                                           args.payload_format, args.ramp,
+                                           args.samples_per_frame)
+            mock_mode = True
+            session_name = args.session_name or f"M Load test {str(uuid.uuid4())[:8]}"
+            if not session_name.startswith("M "):
+                session_name = "M " + session_name
+        else:
+            mock_mode, session_name = get_user_preferences()
 
         print("\n" + "-" * 70)
         print("🔧 STARTING TELEMETRY BRIDGE WITH DATABASE...")
         print("-" * 70)
 
         bridge = TelemetryBridgeWithDB(mock_mode=mock_mode,
-                                      session_name=session_name)
+                                      session_name=session_name,
+                                      load_generator=load_generator,
+                                      sink_names=args.sinks,
+                                      workers=args.workers,
+                                      tiers=None if args.tiers is None else dict(args.tiers),
+                                      profile=args.profile,
+                                      trace_allocations=args.trace_allocations,
+                                      capture_path=args.record,
+                                      replay=replay,
+                                      input_transport=args.input_transport,
+                                      output_transports=args.output_transports)
         await bridge.run()
 
     except KeyboardInterrupt:
@@ -749,7 +5360,7 @@ async def main():
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        asyncio.run(main(parse_args()))
     except KeyboardInterrupt:
         logger.info("🛑 Bridge interrupted")
     except Exception as e:
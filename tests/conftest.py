@@ -0,0 +1,27 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import maindata  # noqa: E402
+
+
+def make_batch(message_ids, uptimes=None, session_id="session-1"):
+    """TelemetryBatch with the given ids (and uptimes) and zero elsewhere"""
+    count = len(message_ids)
+    columns = {
+        name: np.zeros(count, dtype=dtype) for name, dtype in maindata.TELEMETRY_COLUMNS
+    }
+    columns['timestamp_us'] = 1_700_000_000_000_000 + np.arange(count, dtype=np.int64) * 1000
+    columns['message_id'] = np.asarray(message_ids, dtype=np.int64)
+    if uptimes is not None:
+        columns['uptime_seconds'] = np.asarray(uptimes, dtype=np.float64)
+    return maindata.TelemetryBatch(columns, count, session_id, "Test session")
+
+
+@pytest.fixture
+def batch_factory():
+    return make_batch
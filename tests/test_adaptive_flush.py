@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+import maindata
+from maindata import (
+    DB_MAX_BATCH_SIZE,
+    DB_MIN_BATCH_SIZE,
+    DB_TARGET_INSERT_LATENCY,
+    TelemetryBridgeWithDB,
+)
+
+
+@pytest.fixture
+def bridge():
+    bridge = TelemetryBridgeWithDB(mock_mode=True)
+    bridge.db_flush_size = 100
+    return bridge
+
+
+def test_slow_insert_halves_flush_size(bridge):
+    bridge._record_insert_latency(100, DB_TARGET_INSERT_LATENCY * 2)
+    assert bridge.db_flush_size == 50
+    for _ in range(20):
+        bridge._record_insert_latency(50, DB_TARGET_INSERT_LATENCY * 2)
+    assert bridge.db_flush_size == DB_MIN_BATCH_SIZE
+
+
+def test_fast_insert_grows_flush_size_only_when_size_bound(bridge):
+    bridge._record_insert_latency(10, DB_TARGET_INSERT_LATENCY / 4)
+    assert bridge.db_flush_size == 100
+    bridge._record_insert_latency(100, DB_TARGET_INSERT_LATENCY / 4)
+    assert bridge.db_flush_size == 150
+    for _ in range(20):
+        bridge._record_insert_latency(bridge.db_flush_size, DB_TARGET_INSERT_LATENCY / 4)
+    assert bridge.db_flush_size == DB_MAX_BATCH_SIZE
+
+
+def test_moderate_latency_keeps_flush_size(bridge):
+    bridge._record_insert_latency(100, DB_TARGET_INSERT_LATENCY * 0.75)
+    assert bridge.db_flush_size == 100
+
+
+def test_flush_statistics(bridge):
+    bridge._record_insert_latency(100, 0.2)
+    bridge._record_insert_latency(40, 0.4)
+    flush_stats = bridge.stats["db_flush"]
+    assert flush_stats["last_batch_size"] == 40
+    assert flush_stats["max_batch_size"] == 100
+    assert flush_stats["last_insert_latency_ms"] == pytest.approx(400.0)
+    assert flush_stats["max_insert_latency_ms"] == pytest.approx(400.0)
+    assert flush_stats["avg_insert_latency_ms"] == pytest.approx(300.0)
+    assert flush_stats["flush_size_threshold"] == bridge.db_flush_size
+
+
+def test_writer_flushes_on_size_then_on_age(bridge, batch_factory, monkeypatch):
+    monkeypatch.setattr(maindata, "DB_BATCH_INTERVAL", 0.2)
+    bridge.db_flush_size = 3
+    submitted = []
+
+    async def submit(batch):
+        submitted.append(batch.columns['message_id'].tolist())
+
+    async def no_summaries(final=False):
+        pass
+
+    bridge._submit_batch_to_database = submit
+    bridge.write_summaries = no_summaries
+
+    async def scenario():
+        bridge.running = True
+        bridge._sinks_ready.set()
+        writer = asyncio.ensure_future(bridge.database_batch_writer())
+        bridge.db_buffer.extend(batch_factory([1, 2, 3, 4]))
+        bridge._db_flush_event.set()
+        await asyncio.sleep(0.05)
+        size_flushes = list(submitted)
+
+        bridge.db_buffer.extend(batch_factory([5]))
+        await asyncio.sleep(0.05)
+        before_age = list(submitted)
+        await asyncio.sleep(0.3)
+        bridge.running = False
+        await writer
+        return size_flushes, before_age
+
+    size_flushes, before_age = asyncio.run(scenario())
+    assert size_flushes == [[1, 2, 3, 4]]
+    assert before_age == size_flushes
+    assert submitted == [[1, 2, 3, 4], [5]]
+    assert bridge.stats["db_flush"]["flushes_by_size"] == 1
+    assert bridge.stats["db_flush"]["flushes_by_age"] == 1
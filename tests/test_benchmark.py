@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+import maindata
+from benchmark_bridge import compare_with_baseline, parse_args, run_scenario
+
+
+def scenario_result(throughput, publish_p99, db_p99, cpu, **overrides):
+    return {
+        "rate_hz": 100.0, "vehicles": 1, "payload_format": "frame",
+        "samples_per_frame": None, "wire_format": "json", "workers": 0,
+        "throughput_per_s": throughput,
+        "publish_latency": {"p99_ms": publish_p99},
+        "db_latency": {"p99_ms": db_p99},
+        "cpu_percent": cpu,
+        **overrides,
+    }
+
+
+def test_compare_with_baseline(tmp_path):
+    baseline = tmp_path / "bench.json"
+    baseline.write_text(json.dumps({"scenarios": [
+        scenario_result(100.0, 10.0, None, 20.0),
+        scenario_result(100.0, 10.0, 5.0, 20.0, vehicles=10),
+    ]}))
+    results = {"scenarios": [
+        scenario_result(110.0, 5.0, 4.0, 20.0),
+        scenario_result(100.0, 10.0, 5.0, 20.0, workers=2),
+    ]}
+    assert compare_with_baseline(results, str(baseline)) == [
+        "100 Hz x 1 frame/json: throughput +10.0% publish p99 -50.0% cpu +0.0%"
+    ]
+
+
+def test_scenario_stores_and_publishes_every_sample(monkeypatch):
+    monkeypatch.setattr(maindata, "METRICS_PORT", None)
+    args = parse_args(["--duration", "1.0"])
+    scenario = {"rate_hz": 50.0, "vehicles": 2, "payload_format": "frame",
+                "samples_per_frame": None, "wire_format": "columnar", "workers": 0}
+    result = asyncio.run(run_scenario(scenario, args))
+    assert result["samples_offered"] > 0
+    assert result["samples_received"] == result["samples_offered"]
+    assert result["samples_published"] == result["samples_offered"]
+    assert result["samples_stored"] == result["samples_offered"]
+    assert result["lost_samples"] == 0
+    assert result["errors"] == 0
@@ -0,0 +1,102 @@
+import argparse
+import asyncio
+import gzip
+from types import SimpleNamespace
+
+import pytest
+
+from maindata import (
+    CaptureWriter,
+    ReplaySource,
+    TelemetryBridgeWithDB,
+    parse_speed,
+    read_capture,
+)
+
+PAYLOADS = [b"\x01\x02binary", '{"message_id": 1}', {"message_id": 2, "speed_ms": 3.5}]
+
+
+@pytest.mark.parametrize("file_name", ["race.cap", "race.cap.gz"])
+def test_capture_round_trip(tmp_path, file_name):
+    path = str(tmp_path / file_name)
+    writer = CaptureWriter(path)
+    for index, payload in enumerate(PAYLOADS):
+        writer.write(payload, 1_000 + index)
+    writer.close()
+    assert writer.payloads == 3
+    assert list(read_capture(path)) == [(1_000 + index, payload)
+                                        for index, payload in enumerate(PAYLOADS)]
+
+
+def test_truncated_capture_keeps_complete_records(tmp_path):
+    path = tmp_path / "race.cap"
+    writer = CaptureWriter(str(path))
+    for index, payload in enumerate(PAYLOADS):
+        writer.write(payload, index)
+    writer.close()
+    path.write_bytes(path.read_bytes()[:-3])
+    assert [payload for _, payload in read_capture(str(path))] == PAYLOADS[:2]
+
+
+def test_cut_off_gzip_capture_keeps_readable_records(tmp_path):
+    path = tmp_path / "race.cap.gz"
+    writer = CaptureWriter(str(path))
+    for index in range(200):
+        writer.write(f'{{"message_id": {index}}}', index)
+    writer.close()
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) // 2])
+    recovered = list(read_capture(str(path)))
+    assert len(recovered) < 200
+    assert [arrival_us for arrival_us, _ in recovered] == list(range(len(recovered)))
+
+
+def test_foreign_file_is_rejected(tmp_path):
+    path = tmp_path / "notes.cap.gz"
+    with gzip.open(path, "wb") as f:
+        f.write(b"not a capture")
+    with pytest.raises(ValueError):
+        list(read_capture(str(path)))
+
+
+def test_bridge_records_incoming_payloads(tmp_path):
+    path = str(tmp_path / "race.cap")
+    bridge = TelemetryBridgeWithDB(mock_mode=True, capture_path=path)
+    for payload in PAYLOADS[:2]:
+        bridge._on_esp32_message_received(SimpleNamespace(data=payload))
+    bridge.capture.close()
+    assert [payload for _, payload in read_capture(path)] == PAYLOADS[:2]
+    assert bridge.raw_ingest.take() == PAYLOADS[:2]
+
+
+def replay_bridge(payloads, speed):
+    bridge = TelemetryBridgeWithDB(replay=ReplaySource("test", payloads, speed))
+    bridge.running = True
+    return bridge
+
+
+def test_replay_feeds_payloads_in_order_and_stops():
+    payloads = [(index * 1_000, f'{{"message_id": {index}}}') for index in range(5)]
+    bridge = replay_bridge(payloads, None)
+    assert bridge.mock_mode
+    asyncio.run(bridge.replay_loop())
+    assert not bridge.running
+    assert bridge.raw_ingest.take() == [payload for _, payload in payloads]
+    assert bridge.stats["replay"]["payloads"] == 5
+    assert bridge.stats["replay"]["speed"] == "max"
+
+
+def test_replay_keeps_the_recorded_pace_scaled_by_speed():
+    payloads = [(0, "a"), (200_000, "b"), (400_000, "c")]
+    bridge = replay_bridge(payloads, 2.0)
+    asyncio.run(bridge.replay_loop())
+    assert bridge.raw_ingest.take() == ["a", "b", "c"]
+    assert bridge.stats["replay"]["elapsed_s"] == pytest.approx(0.2, abs=0.05)
+
+
+def test_parse_speed():
+    assert parse_speed("max") is None
+    assert parse_speed("4") == 4.0
+    for value in ("0", "-1", "fast"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_speed(value)
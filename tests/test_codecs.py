@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from maindata import (
+    COLUMNAR_SCHEMAS,
+    FRAME_FULL_MASK,
+    FRAME_MIN_VALID_TIMESTAMP_MS,
+    TELEMETRY_COLUMNS,
+    ZSTD_AVAILABLE,
+    decode_batch_records,
+    decode_columnar_frame,
+    decode_telemetry_frame,
+    encode_batch_record,
+    encode_columnar_frame,
+    encode_telemetry_frame,
+)
+
+NOW_US = 1_700_000_000_000_000
+
+
+def sample_columns(count=5):
+    rng = np.random.default_rng(3)
+    columns = {
+        name: rng.uniform(-100, 100, count).astype(dtype)
+        for name, dtype in TELEMETRY_COLUMNS
+    }
+    columns['timestamp_us'] = NOW_US + np.arange(count, dtype=np.int64) * 1000
+    columns['message_id'] = np.arange(1, count + 1, dtype=np.int64)
+    return columns
+
+
+def test_frame_round_trip():
+    columns = sample_columns()
+    decoded = decode_telemetry_frame(encode_telemetry_frame(columns), NOW_US)
+    assert decoded['timestamp_us'].tolist() == columns['timestamp_us'].tolist()
+    assert decoded['message_id'].tolist() == [1, 2, 3, 4, 5]
+    assert np.allclose(decoded['latitude'], columns['latitude'])
+    assert np.allclose(decoded['speed_ms'], columns['speed_ms'], rtol=1e-6)
+
+
+def test_frame_with_partial_mask_zero_fills():
+    columns = sample_columns(2)
+    decoded = decode_telemetry_frame(encode_telemetry_frame(columns, field_mask=0b1), NOW_US)
+    assert np.allclose(decoded['speed_ms'], columns['speed_ms'], rtol=1e-6)
+    assert decoded['voltage_v'].tolist() == [0.0, 0.0]
+
+
+def test_frame_with_unsynced_clock_uses_arrival_time():
+    columns = sample_columns(2)
+    columns['timestamp_us'][:] = (FRAME_MIN_VALID_TIMESTAMP_MS - 1) * 1000
+    decoded = decode_telemetry_frame(encode_telemetry_frame(columns), NOW_US)
+    assert decoded['timestamp_us'].tolist() == [NOW_US, NOW_US]
+
+
+@pytest.mark.parametrize("cut", [1, 5])
+def test_malformed_frame_is_rejected(cut):
+    frame = encode_telemetry_frame(sample_columns(2))
+    assert decode_telemetry_frame(frame[:-cut], NOW_US) is None
+    assert decode_telemetry_frame(b'XX' + frame[2:], NOW_US) is None
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib", "zstd"])
+def test_columnar_frame_round_trip(batch_factory, compression):
+    if compression == "zstd" and not ZSTD_AVAILABLE:
+        pytest.skip("zstandard not installed")
+    batch = batch_factory([7, 8, 9], uptimes=[1.5, 2.5, 3.5])
+    batch.data_source = "MOCK"
+    decoded = decode_columnar_frame(encode_columnar_frame(batch, compression))
+    assert decoded.session_id == batch.session_id
+    assert decoded.data_source == "MOCK"
+    for name, _ in COLUMNAR_SCHEMAS[max(COLUMNAR_SCHEMAS)]:
+        assert np.allclose(decoded.columns[name], batch.columns[name])
+
+
+def test_columnar_frame_with_bad_magic_is_rejected(batch_factory):
+    frame = encode_columnar_frame(batch_factory([1]))
+    assert decode_columnar_frame(b'XX' + frame[2:]) is None
+
+
+def test_batch_record_round_trip_and_corruption(batch_factory):
+    first = batch_factory([1, 2])
+    second = batch_factory([3])
+    data = encode_batch_record(first, 10) + encode_batch_record(second, 11)
+    batches, consumed = decode_batch_records(data)
+    assert consumed == len(data)
+    assert [batch.lsn for batch in batches] == [10, 11]
+    assert batches[1].columns['message_id'].tolist() == [3]
+
+    # A flipped byte in the second record stops decoding before it
+    corrupted = bytearray(data)
+    corrupted[-1] ^= 0xFF
+    batches, consumed = decode_batch_records(bytes(corrupted))
+    assert [batch.lsn for batch in batches] == [10]
+    assert consumed == len(encode_batch_record(first, 10))
+
+
+def test_full_mask_covers_every_frame_field():
+    columns = sample_columns(1)
+    decoded = decode_telemetry_frame(encode_telemetry_frame(columns, FRAME_FULL_MASK), NOW_US)
+    assert decoded['uptime_seconds'][0] == pytest.approx(columns['uptime_seconds'][0], rel=1e-6)
@@ -0,0 +1,124 @@
+import numpy as np
+
+from maindata import MESSAGE_ID_MODULUS, MessageIdDeduper
+
+
+def uptimes_for(ids, boot=0.0, interval=5.0):
+    return [boot + interval * message_id for message_id in ids]
+
+
+def test_first_batch_passes(batch_factory):
+    deduper = MessageIdDeduper(window=64)
+    ids = list(range(1, 11))
+    keep = deduper.filter(batch_factory(ids, uptimes_for(ids)))
+    assert keep.all()
+    assert deduper.duplicates == 0
+
+
+def test_redelivered_ids_are_dropped(batch_factory):
+    deduper = MessageIdDeduper(window=64)
+    ids = list(range(1, 11))
+    deduper.filter(batch_factory(ids, uptimes_for(ids)))
+
+    again = [4, 5, 11, 12]
+    keep = deduper.filter(batch_factory(again, uptimes_for(again)))
+    assert keep.tolist() == [False, False, True, True]
+    assert deduper.duplicates == 2
+    assert deduper.restarts == 0
+
+
+def test_repeats_within_a_batch_keep_first_arrival(batch_factory):
+    deduper = MessageIdDeduper(window=64)
+    ids = [1, 2, 2, 3, 1]
+    keep = deduper.filter(batch_factory(ids, uptimes_for(ids)))
+    assert keep.tolist() == [True, True, False, True, False]
+
+
+def test_reordered_ids_are_kept_once(batch_factory):
+    deduper = MessageIdDeduper(window=64)
+    deduper.filter(batch_factory([1, 2, 5, 6], uptimes_for([1, 2, 5, 6])))
+
+    late = [4, 3, 4]
+    keep = deduper.filter(batch_factory(late, uptimes_for(late)))
+    assert keep.tolist() == [True, True, False]
+    assert deduper.restarts == 0
+
+
+def test_ids_without_sender_value_always_pass(batch_factory):
+    deduper = MessageIdDeduper(window=64)
+    keep = deduper.filter(batch_factory([0, 0, 0]))
+    assert keep.all()
+
+
+def test_sender_restart_starts_new_epoch(batch_factory):
+    deduper = MessageIdDeduper(window=65536)
+    before = list(range(1, 2001))
+    deduper.filter(batch_factory(before, uptimes_for(before)))
+
+    # Transmitter reboots: counter restarts at 1, uptime restarts near zero
+    after = list(range(1, 1001))
+    keep = deduper.filter(batch_factory(after, uptimes_for(after, boot=1.3)))
+    assert keep.all()
+    assert deduper.restarts == 1
+
+    # Duplicates of the new epoch are still caught
+    keep = deduper.filter(batch_factory(after[-5:], uptimes_for(after[-5:], boot=1.3)))
+    assert not keep.any()
+
+
+def test_restart_inside_a_batch(batch_factory):
+    deduper = MessageIdDeduper(window=64)
+    deduper.filter(batch_factory([1, 2, 3], uptimes_for([1, 2, 3])))
+
+    ids = [4, 5, 1, 2, 2]
+    uptimes = uptimes_for([4, 5]) + uptimes_for([1, 2, 2], boot=0.7)
+    batch = batch_factory(ids, uptimes)
+    keep = deduper.filter(batch)
+    assert keep.tolist() == [True, True, True, True, False]
+    assert deduper.restarts == 1
+    # Samples from the reboot on carry the next epoch, for the storage key
+    assert batch.columns['boot_epoch'].tolist() == [0, 0, 1, 1, 1]
+
+    later = batch_factory([3], uptimes_for([3], boot=0.7))
+    deduper.filter(later)
+    assert later.columns['boot_epoch'].tolist() == [1]
+
+
+def test_id_behind_the_window_does_not_reset_it(batch_factory):
+    deduper = MessageIdDeduper(window=64)
+    ids = list(range(1000, 1050))
+    deduper.filter(batch_factory(ids, uptimes_for(ids)))
+
+    keep = deduper.filter(batch_factory([10], uptimes_for([10])))
+    assert keep.all()
+    assert deduper.restarts == 0
+
+    # Recent ids are still remembered afterwards
+    keep = deduper.filter(batch_factory([1040, 1049], uptimes_for([1040, 1049])))
+    assert not keep.any()
+
+
+def test_window_follows_counter_wraparound(batch_factory):
+    deduper = MessageIdDeduper(window=64)
+    ids = [MESSAGE_ID_MODULUS - 2, MESSAGE_ID_MODULUS - 1, 1, 2]
+    uptimes = [10.0, 15.0, 20.0, 25.0]
+    assert deduper.filter(batch_factory(ids, uptimes)).all()
+
+    keep = deduper.filter(batch_factory([MESSAGE_ID_MODULUS - 1, 3], [15.0, 30.0]))
+    assert keep.tolist() == [False, True]
+    assert deduper.restarts == 0
+
+
+def test_sessions_are_tracked_separately(batch_factory):
+    deduper = MessageIdDeduper(window=64)
+    deduper.filter(batch_factory([1, 2], uptimes_for([1, 2]), session_id="a"))
+    keep = deduper.filter(batch_factory([1, 2], uptimes_for([1, 2]), session_id="b"))
+    assert keep.all()
+
+
+def test_without_uptime_ids_alone_are_compared(batch_factory):
+    deduper = MessageIdDeduper(window=64)
+    deduper.filter(batch_factory([1, 2, 3]))
+    keep = deduper.filter(batch_factory([3, 4]))
+    assert keep.tolist() == [False, True]
+    assert np.count_nonzero(~keep) == 1
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from maindata import DERIVED_MIN_POWER_W, DerivedChannels
+
+
+def motion_batch(batch_factory, speeds, powers, accelerations=None, session_id="session-1"):
+    batch = batch_factory(range(1, len(speeds) + 1), session_id=session_id)
+    batch.columns['speed_ms'] = np.asarray(speeds, dtype=np.float64)
+    batch.columns['power_w'] = np.asarray(powers, dtype=np.float64)
+    if accelerations is not None:
+        batch.columns['total_acceleration'] = np.asarray(accelerations, dtype=np.float64)
+    return batch
+
+
+def test_roll_and_pitch_from_the_accelerometer(batch_factory):
+    batch = motion_batch(batch_factory, [0.0, 0.0], [0.0, 0.0])
+    batch.columns['accel_x'] = np.array([0.0, 9.81])
+    batch.columns['accel_y'] = np.array([9.81, 0.0])
+    batch.columns['accel_z'] = np.array([0.0, 0.0])
+    DerivedChannels().apply(batch)
+    assert batch.columns['roll_deg'] == pytest.approx([90.0, 0.0])
+    assert batch.columns['pitch_deg'] == pytest.approx([0.0, 90.0])
+
+
+def test_efficiency_is_zero_below_the_minimum_draw(batch_factory):
+    batch = motion_batch(batch_factory, [10.0, 10.0], [360.0, DERIVED_MIN_POWER_W / 2])
+    DerivedChannels().apply(batch)
+    # 36 km/h at 0.36 kW
+    assert batch.columns['efficiency_km_per_kwh'].tolist() == pytest.approx([100.0, 0.0])
+
+
+def test_smoothing_carries_across_batches_per_session(batch_factory):
+    derived = DerivedChannels(window=2)
+    first = motion_batch(batch_factory, [2.0, 4.0], [0.0, 0.0])
+    derived.apply(first)
+    assert first.columns['speed_smoothed_ms'].tolist() == [2.0, 3.0]
+
+    second = motion_batch(batch_factory, [8.0], [0.0])
+    derived.apply(second)
+    assert second.columns['speed_smoothed_ms'].tolist() == [6.0]
+
+    # Another session starts its own window
+    other = motion_batch(batch_factory, [8.0], [0.0], session_id="session-2")
+    derived.apply(other)
+    assert other.columns['speed_smoothed_ms'].tolist() == [8.0]
+
+
+def test_jerk_against_the_previous_sample(batch_factory):
+    derived = DerivedChannels()
+    batch = motion_batch(batch_factory, [0.0] * 3, [0.0] * 3, accelerations=[1.0, 2.0, 2.5])
+    derived.apply(batch)
+    # Samples are 1 ms apart; the first has no predecessor
+    assert batch.columns['jerk_ms3'].tolist() == pytest.approx([0.0, 1000.0, 500.0])
+
+    later = motion_batch(batch_factory, [0.0], [0.0], accelerations=[2.5])
+    later.columns['timestamp_us'] = batch.columns['timestamp_us'][-1:]
+    derived.apply(later)
+    assert later.columns['jerk_ms3'].tolist() == [0.0]  # time did not advance
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from maindata import (
+    BRIDGE_COLUMNS,
+    TELEMETRY_COLUMNS,
+    LoadGenerator,
+    normalize_raw_payloads,
+)
+
+NOW_US = 1_700_000_000_000_000
+
+
+def test_same_seed_yields_same_samples():
+    first = LoadGenerator(rate_hz=10.0, vehicles=3, seed=7)
+    second = LoadGenerator(rate_hz=10.0, vehicles=3, seed=7)
+    for _ in range(2):
+        a, b = first.generate(5, NOW_US), second.generate(5, NOW_US)
+        for name in a:
+            np.testing.assert_array_equal(a[name], b[name])
+    other = LoadGenerator(rate_hz=10.0, vehicles=3, seed=8).generate(5, NOW_US)
+    assert not np.array_equal(other['speed_ms'], first.generate(5, NOW_US)['speed_ms'])
+
+
+def test_columns_are_the_esp32_fields():
+    columns = LoadGenerator(vehicles=2).generate(4, NOW_US)
+    assert list(columns) == [name for name, _ in TELEMETRY_COLUMNS
+                             if name not in BRIDGE_COLUMNS]
+    assert {len(column) for column in columns.values()} == {8}
+    for name, dtype in TELEMETRY_COLUMNS:
+        if name in columns:
+            assert columns[name].dtype == np.dtype(dtype)
+
+
+def test_message_ids_interleave_vehicles_and_stay_unique():
+    generator = LoadGenerator(rate_hz=10.0, vehicles=3)
+    first = generator.generate(2, NOW_US)
+    second = generator.generate(2, NOW_US + 200_000)
+    assert first['message_id'].tolist() == [1, 2, 3, 4, 5, 6]
+    assert second['message_id'].tolist() == [7, 8, 9, 10, 11, 12]
+
+
+def test_state_carries_over_between_calls():
+    generator = LoadGenerator(rate_hz=10.0, vehicles=2, seed=3)
+    first = generator.generate(5, NOW_US)
+    second = generator.generate(5, NOW_US + 500_000)
+    for name in ('energy_j', 'distance_m', 'uptime_seconds'):
+        per_vehicle = np.concatenate([first[name], second[name]]).reshape(-1, 2)
+        assert (np.diff(per_vehicle, axis=0) > 0).all()
+    # The last tick of a call is stamped now, earlier ones one period apart
+    assert first['timestamp_us'].reshape(-1, 2)[:, 0].tolist() == [
+        NOW_US - step * 100_000 for step in range(4, -1, -1)
+    ]
+
+
+@pytest.mark.parametrize("payload_format, samples_per_frame, payload_count", [
+    ('frame', None, 2),
+    ('frame', 2, 6),
+    ('json', None, 12),
+])
+def test_payloads_decode_back_to_the_generated_samples(payload_format, samples_per_frame,
+                                                       payload_count):
+    generator = LoadGenerator(rate_hz=10.0, vehicles=2, seed=1,
+                              payload_format=payload_format,
+                              samples_per_frame=samples_per_frame)
+    columns = generator.generate(6, NOW_US)
+    payloads = generator.payloads(columns)
+    assert len(payloads) == payload_count
+
+    result = normalize_raw_payloads(payloads, NOW_US)
+    assert result['unparsed'] == 0
+    decoded = result['columns']
+    order = np.argsort(decoded['message_id'], kind='stable')
+    np.testing.assert_array_equal(decoded['message_id'][order], columns['message_id'])
+    # Frames carry millisecond timestamps and single-precision fields
+    np.testing.assert_array_equal(decoded['timestamp_us'][order] // 1000,
+                                  columns['timestamp_us'] // 1000)
+    for name in ('speed_ms', 'power_w', 'energy_j', 'latitude', 'accel_z'):
+        np.testing.assert_allclose(decoded[name][order], columns[name], rtol=1e-6)
@@ -0,0 +1,109 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+import maindata
+
+
+def reboot_batches(batch_factory):
+    """Ids 1-3, then the transmitter reboots and sends ids 1-2 again"""
+    return [batch_factory([1, 2, 3], [5.0, 10.0, 15.0]),
+            batch_factory([1, 2], [0.5, 5.5])]
+
+
+def make_sink(name, tmp_path):
+    if name == 'parquet':
+        pytest.importorskip("pyarrow")
+        return maindata.ParquetSink(str(tmp_path / "pq"), spill_dir=str(tmp_path / "spill"))
+    if name == 'duckdb':
+        pytest.importorskip("duckdb")
+        return maindata.DuckDBSink(str(tmp_path / "t.duckdb"), spill_dir=str(tmp_path / "spill"))
+    return maindata.SQLiteSink(str(tmp_path / "t.db"), spill_dir=str(tmp_path / "spill"))
+
+
+@pytest.mark.parametrize("name", sorted(maindata.LOCAL_SINKS))
+def test_samples_after_a_reboot_are_stored(name, tmp_path, batch_factory):
+    sink = make_sink(name, tmp_path)
+    deduper = maindata.MessageIdDeduper()
+    written = 0
+    for batch in reboot_batches(batch_factory):
+        written += sink.write(batch.select(deduper.filter(batch)))
+    assert written == 5
+
+    # A retry of the post-reboot batch is still recognized
+    retry = reboot_batches(batch_factory)[1]
+    retry.columns['boot_epoch'] = np.ones(len(retry), dtype=np.int64)
+    assert sink.write(retry) == 0
+    sink.close()
+
+
+def test_sqlite_table_keyed_without_boot_epoch_is_rekeyed(tmp_path, batch_factory):
+    path = str(tmp_path / "old.db")
+    old_columns = [(name, sql_type) for name, sql_type in maindata._db_column_types()
+                   if name != 'boot_epoch']
+    connection = sqlite3.connect(path)
+    connection.execute(
+        f"CREATE TABLE telemetry ({', '.join(f'{n} {t}' for n, t in old_columns)}, "
+        f"PRIMARY KEY (session_id, message_id))"
+    )
+    rows = []
+    for message_id in (1, 2):
+        row = dict.fromkeys((name for name, _ in old_columns), 0)
+        row.update(session_id="session-1", session_name="Test session", message_id=message_id)
+        rows.append(tuple(row.values()))
+    connection.executemany(
+        f"INSERT INTO telemetry VALUES ({', '.join('?' * len(old_columns))})", rows
+    )
+    connection.commit()
+    connection.close()
+
+    sink = maindata.SQLiteSink(path, spill_dir=str(tmp_path / "spill"))
+    last_rowid, records = sink.pending_sync(10)
+    assert last_rowid == 2
+    assert [(r['boot_epoch'], r['message_id']) for r in records] == [(0, 1), (0, 2)]
+
+    rebooted = batch_factory([1, 2])
+    rebooted.columns['boot_epoch'] = np.ones(2, dtype=np.int64)
+    assert sink.write(batch_factory([1, 2])) == 0
+    assert sink.write(rebooted) == 2
+    sink.close()
+
+
+def test_duckdb_table_keyed_without_boot_epoch_is_rekeyed(tmp_path, batch_factory):
+    duckdb = pytest.importorskip("duckdb")
+    path = str(tmp_path / "old.duckdb")
+    old_columns = [(name, sql_type) for name, sql_type in maindata._db_column_types()
+                   if name != 'boot_epoch']
+    connection = duckdb.connect(path)
+    connection.execute(
+        f"CREATE TABLE telemetry ({', '.join(f'{n} {t}' for n, t in old_columns)}, "
+        f"PRIMARY KEY (session_id, message_id))"
+    )
+    connection.execute("INSERT INTO telemetry (session_id, message_id) VALUES ('session-1', 1)")
+    connection.close()
+
+    sink = maindata.DuckDBSink(path, spill_dir=str(tmp_path / "spill"))
+    rebooted = batch_factory([1])
+    rebooted.columns['boot_epoch'] = np.ones(1, dtype=np.int64)
+    assert sink.write(batch_factory([1])) == 0
+    assert sink.write(rebooted) == 1
+    sink.close()
+
+
+def test_duckdb_stores_the_batch_columns(tmp_path, batch_factory):
+    pytest.importorskip("duckdb")
+    sink = maindata.DuckDBSink(str(tmp_path / "t.duckdb"), spill_dir=str(tmp_path / "spill"))
+    batch = batch_factory([1, 2])
+    batch.columns['speed_ms'] = np.array([3.5, 4.5])
+    batch.columns['altitude'] = np.array([100.0, 101.0])
+    assert sink.write(batch) == 2
+    assert sink.write(batch) == 0
+    rows = sink.connection.execute(
+        "SELECT session_id, timestamp, speed_ms, altitude_m, message_id "
+        "FROM telemetry ORDER BY message_id"
+    ).fetchall()
+    sink.close()
+    timestamps = maindata.epoch_us_to_iso(batch.columns['timestamp_us'])
+    assert rows == [("session-1", timestamps[0], 3.5, 100.0, 1),
+                    ("session-1", timestamps[1], 4.5, 101.0, 2)]
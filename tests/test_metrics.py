@@ -0,0 +1,84 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import maindata
+from maindata import LatencyHistogram, TelemetryBridgeWithDB
+
+
+def test_observe_many_matches_observe():
+    values = [0.0001, 0.001, 0.003, 0.2, 0.2, 100.0]
+    one_by_one, vectorized = LatencyHistogram(), LatencyHistogram()
+    for value in values:
+        one_by_one.observe(value)
+    vectorized.observe_many(np.asarray(values))
+    vectorized.observe_many(np.asarray([]))
+    assert one_by_one.counts.tolist() == vectorized.counts.tolist()
+    assert vectorized.count == 6
+    assert vectorized.sum == pytest.approx(sum(values))
+
+
+def test_quantile_is_the_bucket_upper_bound():
+    histogram = LatencyHistogram(buckets=(0.01, 0.1, 1.0))
+    assert histogram.quantile(0.5) == 0.0
+    histogram.observe_many(np.asarray([0.005] * 8 + [0.05, 5.0]))
+    assert histogram.quantile(0.5) == 0.01
+    assert histogram.quantile(0.9) == 0.1
+    assert histogram.quantile(1.0) == float('inf')
+
+
+def test_render_is_cumulative():
+    histogram = LatencyHistogram(buckets=(0.01, 0.1))
+    histogram.observe_many(np.asarray([0.005, 0.05, 0.5]))
+    assert histogram.render("lat", 'stage="db"') == [
+        'lat_bucket{stage="db",le="0.01"} 1',
+        'lat_bucket{stage="db",le="0.1"} 2',
+        'lat_bucket{stage="db",le="+Inf"} 3',
+        'lat_sum{stage="db"} 0.555',
+        'lat_count{stage="db"} 3',
+    ]
+
+
+def test_render_metrics_lists_each_metric_once():
+    bridge = TelemetryBridgeWithDB(mock_mode=True)
+    bridge.stats["messages_received"] = 42
+    text = bridge.render_metrics()
+    assert text.endswith("\n")
+    assert "telemetry_bridge_messages_received_total 42" in text.splitlines()
+    type_lines = [line for line in text.splitlines() if line.startswith("# TYPE")]
+    assert len(type_lines) == len(set(type_lines))
+    assert "# TYPE telemetry_bridge_stage_latency_seconds histogram" in type_lines
+    for line in text.splitlines():
+        if not line.startswith("#"):
+            float(line.rsplit(" ", 1)[1])
+
+
+def test_metrics_endpoint(monkeypatch):
+    monkeypatch.setattr(maindata, "METRICS_HOST", "127.0.0.1")
+    monkeypatch.setattr(maindata, "METRICS_PORT", 0)
+
+    async def get(port, path):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return response
+
+    async def scenario():
+        bridge = TelemetryBridgeWithDB(mock_mode=True)
+        await bridge.start_metrics_server()
+        port = bridge._metrics_server.sockets[0].getsockname()[1]
+        try:
+            return await get(port, "/metrics"), await get(port, "/other")
+        finally:
+            bridge._metrics_server.close()
+            await bridge._metrics_server.wait_closed()
+
+    metrics, missing = asyncio.run(scenario())
+    head, _, body = metrics.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200 OK")
+    assert f"Content-Length: {len(body)}".encode() in head
+    assert b"telemetry_bridge_errors_total 0" in body
+    assert missing.startswith(b"HTTP/1.1 404")
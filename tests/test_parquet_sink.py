@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+import maindata
+
+pyarrow = pytest.importorskip("pyarrow")
+import pyarrow.parquet  # noqa: E402
+
+
+def parquet_files(directory):
+    return sorted(
+        name for name in os.listdir(directory) if name.endswith('.parquet')
+    )
+
+
+def stored_ids(directory):
+    table = pyarrow.parquet.read_table(directory)
+    return sorted(table.column('message_id').to_pylist())
+
+
+def test_rewritten_batch_is_skipped(tmp_path, batch_factory):
+    sink = maindata.ParquetSink(str(tmp_path / "pq"), spill_dir=str(tmp_path / "spill"))
+    assert sink.write(batch_factory(range(1, 101))) == 100
+    assert sink.write(batch_factory(range(1, 101))) == 0
+    assert sink.write(batch_factory(range(95, 111))) == 10
+    sink.close()
+    assert stored_ids(str(tmp_path / "pq" / "session_id=session-1")) == list(range(1, 111))
+
+
+def test_ids_on_disk_are_skipped_after_restart(tmp_path, batch_factory):
+    directory = str(tmp_path / "pq")
+    sink = maindata.ParquetSink(directory, spill_dir=str(tmp_path / "spill"))
+    sink.write(batch_factory([1, 2, 3]))
+    sink.close()
+
+    reopened = maindata.ParquetSink(directory, spill_dir=str(tmp_path / "spill"))
+    assert reopened.write(batch_factory([2, 3, 4])) == 1
+    reopened.close()
+
+
+def test_parts_roll_into_one_file(tmp_path, batch_factory, monkeypatch):
+    monkeypatch.setattr(maindata, "PARQUET_ROLL_ROWS", 250)
+    sink = maindata.ParquetSink(str(tmp_path / "pq"), spill_dir=str(tmp_path / "spill"))
+    session_dir = str(tmp_path / "pq" / "session_id=session-1")
+    for start in range(1, 301, 100):
+        sink.write(batch_factory(range(start, start + 100)))
+
+    files = parquet_files(session_dir)
+    assert len(files) == 1 and files[0].startswith('data-')
+    assert stored_ids(session_dir) == list(range(1, 301))
+    sink.close()
+
+
+def test_close_compacts_remaining_parts(tmp_path, batch_factory):
+    sink = maindata.ParquetSink(str(tmp_path / "pq"), spill_dir=str(tmp_path / "spill"))
+    session_dir = str(tmp_path / "pq" / "session_id=session-1")
+    sink.write(batch_factory([1, 2]))
+    sink.write(batch_factory([3, 4]))
+    assert len(parquet_files(session_dir)) == 2
+    sink.close()
+    assert len(parquet_files(session_dir)) == 1
+    assert stored_ids(session_dir) == [1, 2, 3, 4]
+
+
+def test_parts_already_compacted_are_removed_on_load(tmp_path, batch_factory):
+    directory = str(tmp_path / "pq")
+    sink = maindata.ParquetSink(directory, spill_dir=str(tmp_path / "spill"))
+    session_dir = os.path.join(directory, "session_id=session-1")
+    sink.write(batch_factory([1, 2]))
+    sink.write(batch_factory([3, 4]))
+    parts = {name: open(os.path.join(session_dir, name), 'rb').read()
+             for name in parquet_files(session_dir)}
+    sink.close()
+
+    # Crash after the data file was written but before its parts were removed
+    for name, data in parts.items():
+        with open(os.path.join(session_dir, name), 'wb') as part_file:
+            part_file.write(data)
+
+    reopened = maindata.ParquetSink(directory, spill_dir=str(tmp_path / "spill"))
+    assert reopened.write(batch_factory([4, 5])) == 1
+    reopened.close()
+    assert stored_ids(session_dir) == [1, 2, 3, 4, 5]
+
+
+def test_least_recent_session_is_compacted_beyond_the_cap(tmp_path, batch_factory, monkeypatch):
+    monkeypatch.setattr(maindata, "PARQUET_MAX_OPEN_SESSIONS", 1)
+    directory = tmp_path / "pq"
+    sink = maindata.ParquetSink(str(directory), spill_dir=str(tmp_path / "spill"))
+    sink.write(batch_factory([1, 2]))
+    sink.write(batch_factory([3, 4]))
+    sink.write(batch_factory([1], session_id="session-2"))
+
+    first_dir = str(directory / "session_id=session-1")
+    files = parquet_files(first_dir)
+    assert len(files) == 1 and files[0].startswith('data-')
+    # Its ids are reloaded from disk when it comes back
+    assert sink.write(batch_factory([4, 5])) == 1
+    sink.close()
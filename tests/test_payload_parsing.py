@@ -0,0 +1,109 @@
+import json
+import random
+import struct
+
+import numpy as np
+import pytest
+
+from maindata import (
+    FRAME_MAGIC,
+    JSON_LEADING_BYTES,
+    LEGACY_BINARY_FORMAT,
+    LEGACY_BINARY_SIZE,
+    TELEMETRY_COLUMNS,
+    encode_telemetry_frame,
+    normalize_raw_payloads,
+    parse_raw_payload,
+    sniff_payload_format,
+)
+
+NOW_US = 1_700_000_000_000_000
+
+
+def legacy_payload(leading: bytes, message_id: int = 7) -> bytes:
+    """A valid legacy message whose speed float starts with the given bytes"""
+    speed_bytes = leading + bytes(4 - len(leading))
+    payload = speed_bytes + struct.pack(
+        "<fffffI", 48.5, 2.0, 52.1, 4.3, 120.0, message_id
+    )
+    assert len(payload) == LEGACY_BINARY_SIZE
+    return payload
+
+
+def frame_payload(count: int = 3) -> bytes:
+    columns = {name: np.zeros(count, dtype=dtype) for name, dtype in TELEMETRY_COLUMNS}
+    columns['timestamp_us'][:] = NOW_US + np.arange(count) * 1000
+    columns['message_id'][:] = np.arange(1, count + 1)
+    columns['speed_ms'][:] = 12.5
+    return encode_telemetry_frame(columns)
+
+
+@pytest.mark.parametrize(
+    "payload, expected",
+    [
+        (b'{"speed_ms": 1}', 'json'),
+        (' {"speed_ms": 1}', 'json'),
+        ({'speed_ms': 1}, 'dict'),
+        (b'', 'unknown'),
+        (struct.pack(LEGACY_BINARY_FORMAT, 1, 2, 3, 4, 5, 6, 7), 'legacy_binary'),
+    ],
+)
+def test_sniff_payload_format(payload, expected):
+    assert sniff_payload_format(payload, LEGACY_BINARY_SIZE) == expected
+
+
+def test_sniff_frame_magic():
+    assert sniff_payload_format(frame_payload(), LEGACY_BINARY_SIZE) == 'frame'
+
+
+def test_json_payload():
+    payload_format, data = parse_raw_payload(b'{"speed_ms": 3.5, "message_id": 2}', NOW_US)
+    assert payload_format == 'json'
+    assert data['speed_ms'] == 3.5
+
+
+def test_frame_payload_decodes_to_columns():
+    payload_format, data = parse_raw_payload(frame_payload(3), NOW_US)
+    assert payload_format == 'frame'
+    assert data['message_id'].tolist() == [1, 2, 3]
+    assert np.allclose(data['speed_ms'], 12.5)
+
+
+@pytest.mark.parametrize("leading", sorted({bytes([b]) for b in JSON_LEADING_BYTES}) + [FRAME_MAGIC])
+def test_legacy_payload_with_misleading_first_bytes(leading):
+    payload = legacy_payload(leading)
+    payload_format, data = parse_raw_payload(payload, NOW_US)
+    assert payload_format == 'legacy_binary'
+    assert data['message_id'] == 7
+    assert data['voltage_v'] == pytest.approx(48.5)
+
+
+def test_random_legacy_payloads_all_decode():
+    rng = random.Random(1)
+    payloads = [
+        struct.pack(
+            LEGACY_BINARY_FORMAT,
+            *(struct.unpack('<f', rng.randbytes(4))[0] for _ in range(6)),
+            message_id,
+        )
+        for message_id in range(1, 2001)
+    ]
+    result = normalize_raw_payloads(payloads, NOW_US)
+    assert result['unparsed'] == 0
+    assert result['columns']['message_id'].tolist() == list(range(1, 2001))
+
+
+def test_undecodable_payload_is_counted():
+    result = normalize_raw_payloads([b'\x00\x01garbage', b'{"speed_ms": 1}'], NOW_US)
+    assert result['unparsed'] == 1
+    assert len(result['columns']['message_id']) == 1
+
+
+def test_mixed_payloads_keep_arrival_order():
+    payloads = [
+        json.dumps({'message_id': 1}).encode(),
+        frame_payload(2),
+        legacy_payload(b'{', message_id=9),
+    ]
+    result = normalize_raw_payloads(payloads, NOW_US)
+    assert result['columns']['message_id'].tolist() == [1, 1, 2, 9]
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+
+from maindata import DB_MAX_INFLIGHT_BATCHES, StorageSink, TelemetryBridgeWithDB, TelemetryWAL
+
+
+class GatedSink(StorageSink):
+    """Writes of batches starting with a gated message id wait for their gate"""
+
+    name = "gated"
+
+    def __init__(self, spill_dir):
+        super().__init__(spill_dir)
+        self.gates = {}
+        self.completed = []
+
+    def write(self, batch):
+        first_id = int(batch.columns['message_id'][0])
+        gate = self.gates.get(first_id)
+        if gate is not None:
+            gate.wait(5.0)
+        self.completed.append(first_id)
+        return len(batch)
+
+
+def make_bridge(tmp_path):
+    bridge = TelemetryBridgeWithDB(mock_mode=True)
+    bridge.wal = TelemetryWAL(str(tmp_path / "wal"))
+    bridge.wal.open()
+    sink = GatedSink(str(tmp_path / "spill"))
+    bridge.sinks = [sink]
+    bridge.stats["sinks"] = {sink.name: {"rows_written": 0, "batches_written": 0,
+                                         "errors": 0, "batches_spilled": 0}}
+    return bridge, sink
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.005)
+
+
+def test_later_batch_is_written_while_earlier_one_is_in_flight(tmp_path, batch_factory):
+    bridge, sink = make_bridge(tmp_path)
+    gate = sink.gates[1] = threading.Event()
+
+    async def scenario():
+        lsns = []
+        for ids in ([1, 2], [3, 4]):
+            batch = batch_factory(ids)
+            batch.lsn = bridge.wal.append(batch)
+            lsns.append(batch.lsn)
+            await bridge._submit_batch_to_database(batch)
+        assert bridge.stats["db_flush"]["inflight_batches"] == 2
+
+        await wait_for(lambda: sink.completed == [3])
+        acknowledge = asyncio.ensure_future(bridge._acknowledge_next_batch())
+        await asyncio.sleep(0.05)
+        # The second batch is stored, but commits are acknowledged in order
+        assert not acknowledge.done()
+        assert bridge._wal_acknowledged_lsn < lsns[0]
+
+        gate.set()
+        await acknowledge
+        assert bridge._wal_acknowledged_lsn == lsns[0]
+        await bridge._acknowledge_next_batch()
+        assert bridge._wal_acknowledged_lsn == lsns[1]
+        bridge.wal.close()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        gate.set()
+    assert sink.completed == [3, 1]
+    assert bridge.stats["messages_stored_db"] == 4
+    assert bridge.stats["db_flush"]["inflight_batches"] == 0
+    assert TelemetryWAL(str(tmp_path / "wal")).open() == []
+
+
+def test_inflight_writes_are_bounded(tmp_path, batch_factory):
+    bridge, sink = make_bridge(tmp_path)
+    gates = [threading.Event() for _ in range(DB_MAX_INFLIGHT_BATCHES)]
+    for message_id, gate in enumerate(gates, 1):
+        sink.gates[message_id] = gate
+
+    async def scenario():
+        for message_id in range(1, DB_MAX_INFLIGHT_BATCHES + 1):
+            await bridge._submit_batch_to_database(batch_factory([message_id]))
+        extra = asyncio.ensure_future(
+            bridge._submit_batch_to_database(batch_factory([DB_MAX_INFLIGHT_BATCHES + 1]))
+        )
+        await asyncio.sleep(0.05)
+        assert not extra.done()
+        assert len(bridge._db_pending) == DB_MAX_INFLIGHT_BATCHES
+
+        gates[0].set()
+        await bridge._acknowledge_next_batch()
+        await asyncio.wait_for(extra, 1.0)
+        for gate in gates:
+            gate.set()
+        while bridge._db_pending:
+            await bridge._acknowledge_next_batch()
+        bridge.wal.close()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        for gate in gates:
+            gate.set()
+    assert sorted(sink.completed) == list(range(1, DB_MAX_INFLIGHT_BATCHES + 2))
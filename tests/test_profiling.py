@@ -0,0 +1,80 @@
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from maindata import AllocationTracker, SamplingProfiler, TelemetryBridgeWithDB
+
+
+def busy_worker(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampling_profiler_writes_collapsed_stacks(tmp_path):
+    profiler = SamplingProfiler(str(tmp_path), interval=0.001)
+    assert profiler.stop() is None
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_worker, args=(stop,), name="busy")
+    worker.start()
+    profiler.start()
+    assert profiler.active
+    time.sleep(0.1)
+    path = profiler.stop()
+    stop.set()
+    worker.join()
+
+    assert not profiler.active
+    assert profiler.sample_count > 0
+    assert os.path.dirname(path) == str(tmp_path)
+    lines = open(path, encoding='utf-8').read().splitlines()
+    busy_lines = [line for line in lines if line.startswith("busy;")]
+    assert busy_lines
+    stack, count = busy_lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert "busy_worker (test_profiling.py:" in stack
+    # Root first: the thread name, then the outermost frame
+    assert stack.split(";")[1].startswith("_bootstrap ")
+
+
+def test_allocation_tracker_reports_top_sites(tmp_path):
+    tracker = AllocationTracker(str(tmp_path), top=3, frames=5)
+    if tracker.active:
+        pytest.skip("tracemalloc already running")
+    assert tracker.stop() is None
+    tracker.start()
+    assert tracker.active
+    retained = [bytearray(100_000) for _ in range(10)]
+    path = tracker.stop()
+    assert not tracker.active
+    report = open(path, encoding='utf-8').read()
+    assert report.startswith("Traced memory:")
+    assert "#1: " in report
+    assert "#4: " not in report
+    assert "test_profiling.py" in report
+    assert len(retained) == 10
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="needs SIGUSR1/SIGUSR2")
+def test_signals_toggle_profiling_and_write_reports(tmp_path):
+    bridge = TelemetryBridgeWithDB(mock_mode=True)
+    bridge.profiler = SamplingProfiler(str(tmp_path), interval=0.001)
+    bridge.allocations = AllocationTracker(str(tmp_path))
+    if bridge.allocations.active:
+        pytest.skip("tracemalloc already running")
+
+    for signum, flag in ((signal.SIGUSR1, "sampling"),
+                         (signal.SIGUSR2, "tracing_allocations")):
+        bridge._profile_signal_handler(signum, None)
+        assert bridge.stats["profiling"][flag]
+        time.sleep(0.02)
+        bridge._profile_signal_handler(signum, None)
+        deadline = time.monotonic() + 5.0
+        while bridge.stats["profiling"][flag] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not bridge.stats["profiling"][flag]
+        assert os.path.dirname(bridge.stats["profiling"]["last_report"]) == str(tmp_path)
+
+    assert len(os.listdir(tmp_path)) == 2
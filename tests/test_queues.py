@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from maindata import BoundedStageQueue, ColumnarTelemetryBuffer
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        BoundedStageQueue("test", 10, "drop_newest")
+
+
+def test_drop_oldest_keeps_newest_entries():
+    queue = BoundedStageQueue("test", 3, "drop_oldest")
+    for item in range(5):
+        queue.put(item)
+    assert queue.take() == [2, 3, 4]
+    assert queue.stats["dropped"] == 2
+    assert queue.stats["high_water"] == 3
+
+
+def test_drop_oldest_counts_entry_sizes():
+    queue = BoundedStageQueue("test", 10, "drop_oldest")
+    queue.put("a", 6)
+    queue.put("b", 6)
+    assert queue.take() == ["b"]
+    assert queue.stats["dropped"] == 6
+
+
+def test_oversized_entry_still_gets_through():
+    queue = BoundedStageQueue("test", 10, "drop_oldest")
+    queue.put("huge", 50)
+    assert queue.take() == ["huge"]
+    assert queue.stats["dropped"] == 0
+
+
+def test_coalesce_latest_keeps_only_newest_on_overflow():
+    queue = BoundedStageQueue("test", 4, "coalesce_latest")
+    for item in range(4):
+        queue.put(item)
+    assert len(queue) == 4
+    queue.put(4)
+    assert queue.take() == [4]
+    assert queue.stats["coalesced"] == 4
+
+
+def test_block_waits_for_space():
+    async def scenario():
+        queue = BoundedStageQueue("test", 2, "block")
+        queue.put("a")
+        queue.put("b")
+        assert not await queue.wait_for_space(timeout=0.01)
+
+        async def consume():
+            await asyncio.sleep(0.01)
+            return queue.get_nowait()
+
+        consumer = asyncio.ensure_future(consume())
+        assert await queue.wait_for_space(timeout=1.0)
+        assert await consumer == "a"
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert queue.stats["dropped"] == 0
+    assert queue.stats["blocked_seconds"] > 0
+
+
+def test_block_allows_one_overshooting_entry():
+    queue = BoundedStageQueue("test", 10, "block")
+    queue.put("a", 8)
+    queue.put("b", 8)  # producer waited for space, then overshoots
+    assert queue.take() == ["a", "b"]
+    assert queue.stats["dropped"] == 0
+
+
+def test_get_waits_for_an_entry():
+    async def scenario():
+        queue = BoundedStageQueue("test", 2, "drop_oldest")
+        asyncio.get_running_loop().call_later(0.01, queue.put, "late")
+        return await asyncio.wait_for(queue.get(), 1.0)
+
+    assert asyncio.run(scenario()) == "late"
+
+
+def test_db_buffer_overwrites_oldest(batch_factory):
+    buffer = ColumnarTelemetryBuffer(4, "session-1", "Test session")
+    buffer.extend(batch_factory([1, 2, 3]))
+    buffer.extend(batch_factory([4, 5, 6]))
+    batch = buffer.swap()
+    assert batch.columns['message_id'].tolist() == [3, 4, 5, 6]
+    assert buffer.overwritten == 2
+    assert buffer.high_water == 4
+    assert buffer.swap() is None
+
+
+def test_db_buffer_keeps_newest_of_oversized_batch(batch_factory):
+    buffer = ColumnarTelemetryBuffer(3, "session-1", "Test session")
+    buffer.extend(batch_factory([1, 2, 3, 4, 5]))
+    assert buffer.swap().columns['message_id'].tolist() == [3, 4, 5]
+    assert buffer.overwritten == 2
+
+
+def test_db_buffer_rejects_coalesce_policy():
+    with pytest.raises(ValueError):
+        ColumnarTelemetryBuffer(3, "session-1", "Test session", policy="coalesce_latest")
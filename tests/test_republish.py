@@ -0,0 +1,27 @@
+import asyncio
+import time
+
+from maindata import TelemetryBridgeWithDB
+
+
+class RecordingChannel:
+    def __init__(self):
+        self.messages = []
+
+    async def publish(self, messages):
+        self.messages.extend(messages)
+
+
+def test_shutdown_publishes_queued_samples(batch_factory):
+    async def scenario():
+        bridge = TelemetryBridgeWithDB(mock_mode=True)
+        bridge.dashboard_channel = RecordingChannel()
+        bridge.dashboard_wire_format = "json"
+        for ids in ([1, 2, 3], [4, 5]):
+            bridge.message_queue.put((time.perf_counter(), batch_factory(ids)), len(ids))
+        await bridge._drain_republish_queue()
+        return bridge
+
+    bridge = asyncio.run(scenario())
+    assert bridge.stats["messages_republished"] == 5
+    assert len(bridge.message_queue) == 0
@@ -0,0 +1,144 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import maindata
+from maindata import (
+    StorageSink,
+    SupabaseSink,
+    TelemetryBridgeWithDB,
+    TelemetryRollups,
+    merge_rollup_rows,
+)
+
+SECOND_US = 1_000_000
+
+
+def speed_batch(batch_factory, seconds, speeds, session_id="session-1"):
+    """Samples at the given offsets (seconds) with the given speeds"""
+    batch = batch_factory(range(1, len(seconds) + 1), session_id=session_id)
+    batch.columns['timestamp_us'] = (1_700_000_000 * SECOND_US
+                                     + np.asarray(seconds) * SECOND_US).astype(np.int64)
+    batch.columns['speed_ms'] = np.asarray(speeds, dtype=np.float64)
+    return batch
+
+
+def test_bucket_statistics(batch_factory):
+    rollups = TelemetryRollups(resolutions=(10,))
+    rollups.add(speed_batch(batch_factory, [0.0, 1.0, 2.0], [4.0, 2.0, 6.0]))
+    rollups.add(speed_batch(batch_factory, [3.0], [8.0]))
+    (row,) = rollups.collect()
+    assert row['sample_count'] == 4
+    assert (row['speed_ms_min'], row['speed_ms_max']) == (2.0, 8.0)
+    assert row['speed_ms_mean'] == 5.0
+    assert row['speed_ms_last'] == 8.0
+    # Unchanged buckets are not emitted again
+    assert rollups.collect() == []
+
+
+def test_late_samples_for_a_closed_bucket_are_kept_for_merging(batch_factory):
+    rollups = TelemetryRollups(resolutions=(1,))
+    rollups.add(speed_batch(batch_factory, [0.0, 0.5], [1.0, 3.0]))
+    rollups.add(speed_batch(batch_factory, [maindata.ROLLUP_GRACE_SECONDS + 2], [5.0]))
+    rollups.collect()
+    assert len(rollups) == 1  # the first bucket is closed
+
+    rollups.add(speed_batch(batch_factory, [0.7], [9.0]))
+    assert rollups.collect() == []
+    (partial,) = rollups.collect_partial()
+    assert partial['sample_count'] == 1 and partial['speed_ms_max'] == 9.0
+    assert rollups.collect_partial() == []
+
+
+def test_merged_rows_cover_both_sides():
+    stored = {'sample_count': 3, 'speed_ms_min': 1.0, 'speed_ms_max': 4.0,
+              'speed_ms_mean': 2.0, 'speed_ms_last': 4.0}
+    added = {'sample_count': 1, 'speed_ms_min': 6.0, 'speed_ms_max': 6.0,
+             'speed_ms_mean': 6.0, 'speed_ms_last': None}
+    merged = merge_rollup_rows(stored, added)
+    assert merged == {'sample_count': 4, 'speed_ms_min': 1.0, 'speed_ms_max': 6.0,
+                      'speed_ms_mean': 3.0, 'speed_ms_last': 4.0}
+
+
+class RollupTable:
+    def __init__(self, stored):
+        self.stored = stored
+        self.upserted = []
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def gte(self, column, value):
+        return self
+
+    def lte(self, column, value):
+        return self
+
+    def upsert(self, rows, **kwargs):
+        self.upserted.extend(rows)
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=self.upserted or self.stored)
+
+
+def test_supabase_merges_rows_into_the_stored_bucket(tmp_path):
+    stored = {'session_id': 's', 'resolution_s': 1, 'bucket_start': '2023-11-14T22:13:20+00:00',
+              'sample_count': 2, 'speed_ms_max': 5.0}
+    table = RollupTable([stored])
+    sink = SupabaseSink(SimpleNamespace(table=lambda name: table), spill_dir=str(tmp_path))
+    row = {'session_id': 's', 'resolution_s': 1, 'bucket_start': '2023-11-14T22:13:20.000000Z',
+           'sample_count': 1, 'speed_ms_max': 7.0}
+    sink.write_rollups([row], merge=True)
+    assert table.upserted == [dict(row, sample_count=3, speed_ms_max=7.0)]
+
+
+class SummarySink(StorageSink):
+    name = "supabase"
+    supports_summaries = True
+
+    def __init__(self, spill_dir):
+        super().__init__(spill_dir)
+        self.stored = set()
+        self.rollup_writes = []
+
+    def write(self, batch):
+        keys = set(batch.columns['message_id'].tolist())
+        new = keys - self.stored
+        self.stored |= keys
+        return len(new)
+
+    def write_rollups(self, rows, merge=False):
+        self.rollup_writes.append((merge, rows))
+        return len(rows)
+
+
+def test_batches_replayed_from_the_wal_are_merged_into_rollups(tmp_path, batch_factory):
+    async def scenario():
+        bridge = TelemetryBridgeWithDB(mock_mode=True)
+        sink = SummarySink(str(tmp_path / "spill"))
+        sink.stored = {1, 2}  # written before the crash, never acknowledged
+        bridge.sinks = [sink]
+        bridge.stats["sinks"] = {sink.name: {"rows_written": 0, "batches_written": 0}}
+
+        recovered = [speed_batch(batch_factory, [0.0, 0.1], [1.0, 2.0], session_id="earlier"),
+                     speed_batch(batch_factory, [0.2, 0.3, 0.4], [3.0, 4.0, 5.0],
+                                 session_id="earlier")]
+        recovered[1].columns['message_id'] = np.array([3, 4, 5])
+        await bridge.replay_wal_backlog(recovered)
+        while bridge._db_pending:
+            await bridge._acknowledge_next_batch()
+        await bridge.write_rollups()
+        return sink.rollup_writes
+
+    writes = asyncio.run(scenario())
+    # Only the batch the sink had not stored yet, as rows merged into the stored buckets
+    assert [merge for merge, _ in writes] == [True]
+    rows = writes[0][1]
+    assert {row['resolution_s'] for row in rows} == set(maindata.ROLLUP_RESOLUTIONS)
+    assert all(row['sample_count'] == 3 for row in rows)
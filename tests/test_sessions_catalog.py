@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from maindata import SessionCatalog, StorageSink, TelemetryBridgeWithDB
+
+
+def drive_batch(batch_factory, speeds, energies, session_id="session-1"):
+    batch = batch_factory(range(1, len(speeds) + 1), session_id=session_id)
+    batch.columns['speed_ms'] = np.asarray(speeds, dtype=np.float64)
+    batch.columns['energy_j'] = np.asarray(energies, dtype=np.float64)
+    return batch
+
+
+def test_catalog_rows_summarize_stored_batches(batch_factory):
+    catalog = SessionCatalog()
+    first = drive_batch(batch_factory, [2.0, 4.0], [10.0, 20.0])
+    second = drive_batch(batch_factory, [6.0], [30.0])
+    second.columns['timestamp_us'] += 5_000_000
+    catalog.add(first, 2)
+    catalog.add(second, 0)  # already stored: counted in the KPIs, not the rows
+
+    (row,) = catalog.collect()
+    assert row['session_id'] == "session-1"
+    assert row['record_count'] == 2
+    assert row['avg_speed_ms'] == 4.0 and row['max_speed_ms'] == 6.0
+    assert row['energy_j'] == 30.0  # cumulative counter: its largest value
+    assert row['start_time'] < row['end_time']
+    assert catalog.collect() == []
+
+    catalog.mark_dirty(["session-1"])
+    assert [row['session_id'] for row in catalog.collect()] == ["session-1"]
+
+
+class CountingSink(StorageSink):
+    name = "supabase"
+
+    def write(self, batch):
+        return len(batch)
+
+
+def test_only_this_runs_session_is_cataloged(tmp_path, batch_factory):
+    bridge = TelemetryBridgeWithDB(mock_mode=True)
+    sink = CountingSink(str(tmp_path))
+    bridge.sinks = [sink]
+    bridge.stats["sinks"] = {sink.name: {"rows_written": 0, "batches_written": 0}}
+
+    bridge._record_db_write(sink, batch_factory([1, 2], session_id=bridge.session_id), 2)
+    # A batch replayed from an earlier run would overwrite its complete row
+    bridge._record_db_write(sink, batch_factory([1], session_id="earlier"), 1)
+    assert [row['session_id'] for row in bridge.session_catalog.collect()] == [bridge.session_id]
+
+
+class PagedTable:
+    def __init__(self, rows, requests):
+        self.rows = rows
+        self.requests = requests
+        self.start = self.end = None
+
+    def select(self, columns):
+        return self
+
+    def order(self, column, desc=False):
+        return self
+
+    def range(self, start, end):
+        self.start, self.end = start, end
+        return self
+
+    def execute(self):
+        self.requests.append((self.start, self.end))
+        return SimpleNamespace(data=self.rows[self.start:self.end + 1])
+
+
+def test_dashboard_pages_through_the_catalog_and_adds_uncataloged_sessions(monkeypatch):
+    pytest.importorskip("streamlit")
+    pytest.importorskip("matplotlib")
+    import dashboard_080
+
+    monkeypatch.setattr(dashboard_080, "SUPABASE_MAX_ROWS_PER_REQUEST", 2)
+    catalog_rows = [
+        {"session_id": f"s{i}", "session_name": f"Run {i}", "record_count": 10,
+         "start_time": f"2026-01-0{i}T10:00:00Z", "end_time": f"2026-01-0{i}T11:00:00Z"}
+        for i in range(1, 4)
+    ]
+    telemetry_rows = [
+        {"session_id": "s1", "session_name": "Run 1", "timestamp": "2026-01-01T10:00:00Z"},
+        {"session_id": "old", "session_name": "Before the catalog",
+         "timestamp": "2025-12-01T10:00:00Z"},
+    ]
+    requests = {"sessions": [], "telemetry": []}
+    tables = {"sessions": catalog_rows, "telemetry": telemetry_rows}
+
+    manager = dashboard_080.EnhancedTelemetryManager()
+    manager.supabase_client = SimpleNamespace(
+        table=lambda name: PagedTable(tables[name], requests[name])
+    )
+    sessions = manager.get_historical_sessions()
+
+    assert [s["session_id"] for s in sessions] == ["s3", "s2", "s1", "old"]
+    # Three catalog rows over pages of two
+    assert requests["sessions"] == [(0, 1), (2, 3)]
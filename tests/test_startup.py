@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+import maindata
+from maindata import (
+    FanoutChannel,
+    InProcessTransport,
+    TelemetryBridgeWithDB,
+    TransportChannel,
+)
+
+STEP_SECONDS = 0.1
+
+
+class UnreachableTransport(InProcessTransport):
+    name = "unreachable"
+
+    async def connect(self):
+        raise ConnectionError("no route to host")
+
+
+def slow_step(result=True):
+    async def connect():
+        await asyncio.sleep(STEP_SECONDS)
+        return result
+    return connect
+
+
+@pytest.fixture
+def bridge():
+    bridge = TelemetryBridgeWithDB(mock_mode=True)
+    bridge.running = True
+    return bridge
+
+
+def test_connections_are_made_concurrently(bridge):
+    bridge.connect_sinks = slow_step()
+    bridge.connect_esp32_subscriber = slow_step()
+    bridge.connect_dashboard_publisher = slow_step()
+
+    asyncio.run(bridge.connect_all())
+    timings = bridge.stats["startup_timings"]
+    assert bridge.running
+    assert bridge._sinks_ready.is_set()
+    assert bridge._dashboard_ready.is_set()
+    assert {"storage", "esp32", "dashboard"} <= set(timings)
+    assert timings["total"] < 2 * STEP_SECONDS
+
+
+def test_failed_step_stops_the_bridge_and_keeps_its_stage_waiting(bridge):
+    bridge.connect_sinks = slow_step()
+    bridge.connect_esp32_subscriber = slow_step()
+    bridge.connect_dashboard_publisher = slow_step(False)
+
+    asyncio.run(bridge.connect_all())
+    assert not bridge.running
+    assert bridge._sinks_ready.is_set()
+    assert not bridge._dashboard_ready.is_set()
+
+
+def test_stage_waiting_for_a_connection_gives_up_on_shutdown(bridge):
+    async def scenario():
+        waiter = asyncio.ensure_future(bridge._wait_until_ready(bridge._dashboard_ready))
+        await asyncio.sleep(0.01)
+        bridge.running = False
+        return await asyncio.wait_for(waiter, 2.0)
+
+    assert asyncio.run(scenario()) is False
+
+
+def test_unreachable_secondary_output_is_left_out(monkeypatch):
+    monkeypatch.setitem(maindata.TRANSPORTS, "unreachable", UnreachableTransport)
+    bridge = TelemetryBridgeWithDB(mock_mode=True, tiers={},
+                                   output_transports=["inprocess", "unreachable"])
+    assert asyncio.run(bridge.connect_dashboard_publisher())
+    assert [transport.name for transport in bridge.transports] == ["inprocess"]
+    assert isinstance(bridge.dashboard_channel, TransportChannel)
+
+
+def test_unreachable_primary_output_fails(monkeypatch):
+    monkeypatch.setitem(maindata.TRANSPORTS, "unreachable", UnreachableTransport)
+    bridge = TelemetryBridgeWithDB(mock_mode=True,
+                                   output_transports=["unreachable", "inprocess"])
+    assert not asyncio.run(bridge.connect_dashboard_publisher())
+    assert "no route to host" in bridge.stats["last_error"]
+
+
+def test_secondary_outputs_get_a_fanout_channel():
+    bridge = TelemetryBridgeWithDB(mock_mode=True, tiers={"dash-1hz": 1.0},
+                                   output_transports=["inprocess", "inprocess"])
+    assert asyncio.run(bridge.connect_dashboard_publisher())
+    assert isinstance(bridge.dashboard_channel, FanoutChannel)
+    assert isinstance(bridge.tier_channels["dash-1hz"], FanoutChannel)
+    assert "inprocess:dash-1hz" in bridge.stats["queues"]
@@ -0,0 +1,142 @@
+from types import SimpleNamespace
+
+import pytest
+
+from maindata import (
+    DB_LEGACY_CONFLICT_COLUMNS,
+    DERIVED_COLUMNS,
+    MessageIdDeduper,
+    PG_NO_CONFLICT_CONSTRAINT,
+    SupabaseSink,
+)
+
+
+class FakeAPIError(Exception):
+    def __init__(self, code):
+        super().__init__(f"{{'code': '{code}'}}")
+        self.code = code
+
+
+class FakeTable:
+    def __init__(self, client):
+        self.client = client
+        self.rows = None
+
+    def upsert(self, rows, **kwargs):
+        self.client.calls.append('upsert')
+        self.client.conflict_keys.append(kwargs.get('on_conflict'))
+        self.rows = rows
+        return self
+
+    def insert(self, rows):
+        self.client.calls.append('insert')
+        self.rows = rows
+        return self
+
+    def execute(self):
+        if self.client.calls[-1] == 'upsert' and self.client.upsert_error:
+            if self.client.conflict_keys[-1] not in self.client.constraints:
+                raise FakeAPIError(self.client.upsert_error)
+        if self.client.without_boot_epoch and any('boot_epoch' in row for row in self.rows):
+            raise FakeAPIError(
+                "PGRST204 Could not find the 'boot_epoch' column of 'telemetry' in the schema cache"
+            )
+        if self.client.without_derived and any('roll_deg' in row for row in self.rows):
+            raise FakeAPIError(
+                "PGRST204 Could not find the 'roll_deg' column of 'telemetry' in the schema cache"
+            )
+        self.client.stored.extend(self.rows)
+        return SimpleNamespace(data=self.rows)
+
+
+class FakeClient:
+    def __init__(self, upsert_error=None, without_derived=False,
+                 without_boot_epoch=False, constraints=()):
+        self.upsert_error = upsert_error
+        self.without_derived = without_derived
+        self.without_boot_epoch = without_boot_epoch
+        # Conflict keys that have a constraint when upsert_error is set
+        self.constraints = constraints
+        self.calls = []
+        self.conflict_keys = []
+        self.stored = []
+
+    def table(self, name):
+        return FakeTable(self)
+
+
+def test_upserts_when_constraint_exists(tmp_path, batch_factory):
+    client = FakeClient()
+    sink = SupabaseSink(client, spill_dir=str(tmp_path))
+    assert sink.write(batch_factory([1, 2, 3])) == 3
+    assert client.calls == ['upsert']
+
+
+def test_falls_back_to_insert_without_constraint(tmp_path, batch_factory):
+    client = FakeClient(upsert_error=PG_NO_CONFLICT_CONSTRAINT)
+    sink = SupabaseSink(client, spill_dir=str(tmp_path))
+    assert sink.write(batch_factory([1, 2])) == 2
+    assert sink.write(batch_factory([3])) == 1
+    # The epoch key, then the pre-epoch key, then plain inserts
+    assert client.calls == ['upsert', 'upsert', 'insert', 'insert']
+    assert not sink.upsert_supported
+
+
+def test_table_keyed_before_boot_epoch_uses_the_old_key(tmp_path, batch_factory):
+    client = FakeClient(upsert_error=PG_NO_CONFLICT_CONSTRAINT,
+                        constraints=(DB_LEGACY_CONFLICT_COLUMNS,))
+    sink = SupabaseSink(client, spill_dir=str(tmp_path))
+    assert sink.write(batch_factory([1, 2])) == 2
+    assert sink.write(batch_factory([3])) == 1
+    assert client.calls == ['upsert', 'upsert', 'upsert']
+    assert client.conflict_keys[1:] == [DB_LEGACY_CONFLICT_COLUMNS] * 2
+    assert sink.upsert_supported
+
+
+def test_leaves_out_boot_epoch_the_table_lacks(tmp_path, batch_factory):
+    client = FakeClient(without_boot_epoch=True, without_derived=True)
+    sink = SupabaseSink(client, spill_dir=str(tmp_path))
+    assert sink.write(batch_factory([1, 2])) == 2
+    assert sink.write(batch_factory([3])) == 1
+    assert len(client.stored) == 3
+    assert not any('boot_epoch' in row for row in client.stored)
+    assert client.conflict_keys[-1] == DB_LEGACY_CONFLICT_COLUMNS
+
+
+def test_reboot_samples_are_upserted_under_their_own_epoch(tmp_path, batch_factory):
+    client = FakeClient()
+    sink = SupabaseSink(client, spill_dir=str(tmp_path))
+    deduper = MessageIdDeduper()
+    for batch in (batch_factory([1, 2, 3], [5.0, 10.0, 15.0]),
+                  batch_factory([1, 2], [0.5, 5.5])):
+        sink.write(batch.select(deduper.filter(batch)))
+    keys = [(row['boot_epoch'], row['message_id']) for row in client.stored]
+    assert keys == [(0, 1), (0, 2), (0, 3), (1, 1), (1, 2)]
+    assert client.conflict_keys == ['session_id,boot_epoch,message_id'] * 2
+
+
+def test_other_errors_propagate_for_retry(tmp_path, batch_factory):
+    sink = SupabaseSink(FakeClient(upsert_error="08006"), spill_dir=str(tmp_path))
+    with pytest.raises(FakeAPIError):
+        sink.write(batch_factory([1]))
+    assert sink.upsert_supported
+
+
+def test_leaves_out_derived_columns_the_table_lacks(tmp_path, batch_factory):
+    client = FakeClient(without_derived=True)
+    sink = SupabaseSink(client, spill_dir=str(tmp_path))
+    assert sink.write(batch_factory([1, 2])) == 2
+    assert sink.write(batch_factory([3])) == 1
+    assert len(client.stored) == 3
+    assert not any(name in row for row in client.stored for name in DERIVED_COLUMNS)
+    assert 'speed_ms' in client.stored[0]
+    # The first write retried without the columns; later ones skip them up front
+    assert client.calls == ['upsert', 'upsert', 'upsert']
+
+
+def test_rollups_leave_out_derived_columns_the_table_lacks(tmp_path):
+    client = FakeClient(without_derived=True)
+    sink = SupabaseSink(client, spill_dir=str(tmp_path))
+    row = {'session_id': 's', 'speed_ms_min': 1.0, 'roll_deg_min': 2.0, 'roll_deg': 0.0}
+    assert sink.write_rollups([row]) == 1
+    assert client.stored == [{'session_id': 's', 'speed_ms_min': 1.0}]
@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+
+import numpy as np
+import pytest
+
+from maindata import (
+    ROLLUP_FIELDS,
+    CoalescedTier,
+    TelemetryBridgeWithDB,
+    parse_tier,
+    summarize_batch,
+)
+
+
+class RecordingChannel:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, messages):
+        self.published.append(messages)
+
+
+def speed_batch(batch_factory, message_ids, speeds, session_id="session-1"):
+    batch = batch_factory(message_ids, session_id=session_id)
+    batch.columns['speed_ms'] = np.asarray(speeds, dtype=np.float64)
+    return batch
+
+
+def test_summarize_batch_ignores_nan(batch_factory):
+    batch = speed_batch(batch_factory, [1, 2, 3], [2.0, np.nan, 5.0])
+    minimum, maximum, total = summarize_batch(batch, ('speed_ms', 'power_w'))
+    assert minimum.tolist() == [2.0, 0.0]
+    assert maximum.tolist() == [5.0, 0.0]
+    assert np.isnan(total[0])
+
+
+def test_tier_coalesces_batches_per_session(batch_factory):
+    tier = CoalescedTier("dash-1hz", 1.0)
+    for batch in (speed_batch(batch_factory, [1, 2], [4.0, 8.0]),
+                  speed_batch(batch_factory, [3], [6.0]),
+                  speed_batch(batch_factory, [1], [1.0], session_id="session-2")):
+        tier.add(batch, summarize_batch(batch))
+
+    messages = tier.collect()
+    assert [message['name'] for message in messages] == ['telemetry_coalesced'] * 2
+    first = messages[0]['data']
+    assert first['session_id'] == "session-1"
+    assert first['message_id'] == 3
+    assert first['speed_ms'] == 6.0
+    assert first['interval_s'] == 1.0
+    assert first['sample_count'] == 3
+    assert first['min']['speed_ms'] == 4.0
+    assert first['max']['speed_ms'] == 8.0
+    assert first['mean']['speed_ms'] == pytest.approx(6.0)
+    assert set(first['mean']) == set(ROLLUP_FIELDS)
+    assert messages[1]['data']['sample_count'] == 1
+    assert tier.collect() == []
+
+
+def test_tier_reports_all_nan_fields_as_none(batch_factory):
+    tier = CoalescedTier("dash-1hz", 1.0, fields=('speed_ms',))
+    batch = speed_batch(batch_factory, [1, 2], [np.nan, np.nan])
+    tier.add(batch, summarize_batch(batch, tier.fields))
+    data = tier.collect()[0]['data']
+    assert data['min'] == {'speed_ms': None}
+    assert data['mean'] == {'speed_ms': None}
+
+
+def test_bridge_publishes_tiers_with_stats(batch_factory):
+    bridge = TelemetryBridgeWithDB(mock_mode=True, tiers={"dash-2hz": 0.5})
+    channel = RecordingChannel()
+    bridge.tier_channels["dash-2hz"] = channel
+    tier = bridge.tiers[0]
+    batch = speed_batch(batch_factory, [1, 2, 3], [1.0, 2.0, 3.0])
+    tier.add(batch, summarize_batch(batch))
+
+    asyncio.run(bridge._publish_tier(tier))
+    asyncio.run(bridge._publish_tier(tier))
+    assert len(channel.published) == 1
+    stats = bridge.stats["tiers"]["dash-2hz"]
+    assert stats["messages_published"] == 1
+    assert stats["samples"] == 3
+    assert stats["publish_calls"] == 1
+
+
+def test_parse_tier():
+    assert parse_tier("telemetry-dashboard-channel-2hz:0.5") == (
+        "telemetry-dashboard-channel-2hz", 0.5)
+    for value in ("no-interval", "dash:0", "dash:fast", ":1"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_tier(value)
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import socket
+
+import pytest
+
+from maindata import (
+    TRANSPORTS,
+    UDP_ENVELOPE,
+    UDP_MAGIC,
+    UDP_MAX_DATAGRAM,
+    FanoutChannel,
+    InProcessTransport,
+    UDPMulticastTransport,
+    make_transport,
+)
+
+
+class RecordingChannel:
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.published = []
+
+    async def publish(self, messages):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        self.published.append(messages)
+
+
+def free_udp_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(('', 0))
+        return sock.getsockname()[1]
+
+
+def test_make_transport_builds_local_transports():
+    assert isinstance(make_transport('inprocess', None, "Test"), InProcessTransport)
+    assert isinstance(make_transport('udp', None, "Test"), UDPMulticastTransport)
+    assert set(TRANSPORTS) == {'ably', 'mqtt', 'udp', 'inprocess'}
+
+
+def test_inprocess_delivers_messages_as_they_are():
+    async def scenario():
+        sender, receiver = InProcessTransport(), InProcessTransport()
+        await sender.connect()
+        await receiver.connect()
+        received = []
+        await receiver.channel("test-inprocess").subscribe(received.append)
+        payload = {"message_id": 1, "speed_ms": 4.2}
+        await sender.channel("test-inprocess").publish([
+            {'name': 'telemetry', 'data': payload},
+            {'name': 'telemetry', 'data': "raw"},
+        ])
+        await sender.channel("test-other").publish([{'name': 'telemetry', 'data': {}}])
+        await receiver.close()
+        await sender.channel("test-inprocess").publish([{'name': 'telemetry', 'data': {}}])
+        return received, payload
+
+    received, payload = asyncio.run(scenario())
+    assert [message.name for message in received] == ['telemetry', 'telemetry']
+    assert received[0].data is payload
+    assert received[1].data == "raw"
+
+
+def test_udp_dispatch_routes_by_channel_and_ignores_foreign_datagrams():
+    transport = UDPMulticastTransport()
+    received = []
+    transport._callbacks["dash"] = [received.append]
+    channel, name = b"dash", b"telemetry"
+    header = UDP_ENVELOPE.pack(UDP_MAGIC, len(channel), len(name))
+    transport.dispatch(header + channel + name + b'{"message_id": 7}')
+    transport.dispatch(UDP_ENVELOPE.pack(UDP_MAGIC, 5, len(name)) + b"other" + name + b"{}")
+    transport.dispatch(b"\x00" * UDP_ENVELOPE.size + b"junk")
+    transport.dispatch(b"x")
+    assert len(received) == 1
+    assert received[0].name == "telemetry"
+    assert json.loads(received[0].data) == {"message_id": 7}
+
+
+def test_udp_rejects_messages_larger_than_a_datagram():
+    async def scenario():
+        transport = UDPMulticastTransport(port=free_udp_port())
+        await transport.connect()
+        try:
+            transport.publish("dash", [{'name': 'telemetry', 'data': b"x" * UDP_MAX_DATAGRAM}])
+        finally:
+            await transport.close()
+
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
+
+
+def test_udp_multicast_round_trip():
+    async def scenario():
+        port = free_udp_port()
+        sender = UDPMulticastTransport(port=port)
+        receiver = UDPMulticastTransport(port=port)
+        await sender.connect()
+        received = []
+        arrived = asyncio.Event()
+
+        def on_message(message):
+            received.append(message)
+            arrived.set()
+
+        try:
+            await receiver.subscribe("dash", on_message)
+        except OSError as e:
+            await sender.close()
+            pytest.skip(f"multicast unavailable: {e}")
+        try:
+            for _ in range(5):
+                await sender.channel("dash").publish([{'name': 'telemetry', 'data': {"message_id": 3}}])
+                try:
+                    await asyncio.wait_for(arrived.wait(), 0.2)
+                    break
+                except asyncio.TimeoutError:
+                    continue
+        finally:
+            await sender.close()
+            await receiver.close()
+        return received
+
+    received = asyncio.run(scenario())
+    if not received:
+        pytest.skip("multicast loopback did not deliver")
+    assert received[0].name == "telemetry"
+    assert json.loads(received[0].data) == {"message_id": 3}
+
+
+def test_fanout_does_not_wait_for_slow_secondary():
+    async def scenario():
+        primary, slow = RecordingChannel(), RecordingChannel(delay=0.05)
+        fanout = FanoutChannel(primary, [("output:slow", slow)])
+        for index in range(3):
+            await fanout.publish([{'name': 'telemetry', 'data': index}])
+        published_before_drain = len(slow.published)
+        await asyncio.sleep(0.3)
+        await fanout.close()
+        return primary, slow, published_before_drain
+
+    primary, slow, published_before_drain = asyncio.run(scenario())
+    assert [messages[0]['data'] for messages in primary.published] == [0, 1, 2]
+    assert published_before_drain == 0
+    assert [messages[0]['data'] for messages in slow.published] == [0, 1, 2]
+
+
+def test_fanout_reports_secondary_errors_and_keeps_draining():
+    async def scenario():
+        errors = []
+        failing = RecordingChannel(error=ConnectionError("offline"))
+        healthy = RecordingChannel()
+        fanout = FanoutChannel(RecordingChannel(), [("output:cloud", failing),
+                                                    ("output:lan", healthy)],
+                               on_error=lambda name, error: errors.append((name, error)))
+        await fanout.publish([{'name': 'telemetry', 'data': 1}])
+        await fanout.publish([{'name': 'telemetry', 'data': 2}])
+        await asyncio.sleep(0.05)
+        await fanout.close()
+        return errors, healthy, fanout
+
+    errors, healthy, fanout = asyncio.run(scenario())
+    assert [name for name, _ in errors] == ["output:cloud", "output:cloud"]
+    assert len(healthy.published) == 2
+    assert [queue.name for queue in fanout.queues] == ["output:cloud", "output:lan"]
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import zlib
+
+import numpy as np
+
+import maindata
+from maindata import BatchSpillStore, StorageSink, TelemetryBridgeWithDB, TelemetryWAL
+
+
+def wal_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.log'))
+
+
+def test_recovers_unconfirmed_batches(tmp_path, batch_factory):
+    wal = TelemetryWAL(str(tmp_path))
+    assert wal.open() == []
+    lsns = [wal.append(batch_factory([i, i + 1])) for i in (1, 3, 5)]
+    wal.close()
+
+    reopened = TelemetryWAL(str(tmp_path))
+    recovered = reopened.open()
+    assert [batch.lsn for batch in recovered] == lsns
+    assert recovered[1].columns['message_id'].tolist() == [3, 4]
+    # New appends continue after the recovered sequence numbers
+    assert reopened.append(batch_factory([7])) == lsns[-1] + 1
+    reopened.close()
+
+
+def test_boot_epoch_is_logged_and_older_records_replay_as_epoch_zero(batch_factory):
+    batch = batch_factory([1, 2])
+    batch.columns['boot_epoch'] = np.array([0, 1], dtype=np.int64)
+    record = maindata.encode_batch_record(batch, lsn=1)
+    decoded, _ = maindata.decode_batch_records(record)
+    assert decoded[0].columns['boot_epoch'].tolist() == [0, 1]
+
+    # An ETW2 record (written before boot_epoch) replays with epoch zero
+    payload = record[maindata.BATCH_RECORD_HEADER.size:-2 * 8]
+    header = maindata.BATCH_RECORD_HEADER.pack(b'ETW2', zlib.crc32(payload), len(payload), 1, 2)
+    decoded, consumed = maindata.decode_batch_records(header + payload)
+    assert consumed == len(header + payload)
+    assert decoded[0].columns['message_id'].tolist() == [1, 2]
+    assert decoded[0].columns['boot_epoch'].tolist() == [0, 0]
+
+
+def test_commit_deletes_confirmed_segments(tmp_path, batch_factory):
+    wal = TelemetryWAL(str(tmp_path), segment_bytes=1)  # one batch per segment
+    wal.open()
+    lsns = [wal.append(batch_factory([i])) for i in range(1, 5)]
+    wal.commit(lsns[1])
+    wal.close()
+
+    recovered = TelemetryWAL(str(tmp_path)).open()
+    assert [batch.lsn for batch in recovered] == lsns[2:]
+
+
+def test_truncated_tail_is_ignored(tmp_path, batch_factory):
+    wal = TelemetryWAL(str(tmp_path))
+    wal.open()
+    wal.append(batch_factory([1, 2]))
+    wal.append(batch_factory([3, 4]))
+    wal.close()
+
+    path = os.path.join(str(tmp_path), wal_files(str(tmp_path))[0])
+    with open(path, 'r+b') as segment_file:
+        segment_file.truncate(os.path.getsize(path) - 5)
+
+    recovered = TelemetryWAL(str(tmp_path)).open()
+    assert [batch.columns['message_id'].tolist() for batch in recovered] == [[1, 2]]
+
+
+class DownSink(StorageSink):
+    name = "supabase"
+
+    def write(self, batch):
+        raise RuntimeError("database down")
+
+
+class FlakySpillStore(BatchSpillStore):
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.broken = True
+
+    def write(self, batch):
+        if self.broken:
+            raise OSError("disk full")
+        return super().write(batch)
+
+
+def test_wal_truncation_resumes_once_unspilled_batch_is_spilled(tmp_path, batch_factory, monkeypatch):
+    monkeypatch.setattr(maindata, "DB_SPILL_RETRY_INTERVAL", 0.0)
+
+    async def scenario():
+        bridge = TelemetryBridgeWithDB(mock_mode=True)
+        bridge.wal = TelemetryWAL(str(tmp_path / "wal"), segment_bytes=1)
+        bridge.wal.open()
+        sink = DownSink(str(tmp_path / "spill"))
+        sink.spill_store = FlakySpillStore(str(tmp_path / "spill"))
+        sink.available = False
+        bridge.sinks = [sink]
+        bridge.stats["sinks"] = {sink.name: {"batches_spilled": 0}}
+
+        async def submit(ids):
+            batch = batch_factory(ids)
+            batch.lsn = bridge.wal.append(batch)
+            await bridge._submit_batch_to_database(batch)
+            await bridge._acknowledge_next_batch()
+            return batch.lsn
+
+        first = await submit([1, 2])
+        assert bridge.stats["db_retry"]["unspilled_batches"] == 1
+
+        # The disk recovers: later batches spill, the held one is retried
+        sink.spill_store.broken = False
+        await submit([3])
+        last = await submit([4])
+        assert bridge.stats["db_retry"]["unspilled_batches"] == 0
+        assert len(sink.spill_store.pending()) == 3
+        bridge.wal.close()
+        return first, last
+
+    asyncio.run(scenario())
+    assert TelemetryWAL(str(tmp_path / "wal")).open() == []
+
+
+def test_wal_kept_while_batch_cannot_be_spilled(tmp_path, batch_factory, monkeypatch):
+    monkeypatch.setattr(maindata, "DB_SPILL_RETRY_INTERVAL", 0.0)
+
+    async def scenario():
+        bridge = TelemetryBridgeWithDB(mock_mode=True)
+        bridge.wal = TelemetryWAL(str(tmp_path / "wal"), segment_bytes=1)
+        bridge.wal.open()
+        sink = DownSink(str(tmp_path / "spill"))
+        sink.spill_store = FlakySpillStore(str(tmp_path / "spill"))
+        sink.available = False
+        bridge.sinks = [sink]
+        bridge.stats["sinks"] = {sink.name: {"batches_spilled": 0}}
+
+        for ids in ([1], [2], [3]):
+            batch = batch_factory(ids)
+            batch.lsn = bridge.wal.append(batch)
+            await bridge._submit_batch_to_database(batch)
+            await bridge._acknowledge_next_batch()
+        bridge.wal.close()
+
+    asyncio.run(scenario())
+    recovered = TelemetryWAL(str(tmp_path / "wal")).open()
+    assert np.concatenate([b.columns['message_id'] for b in recovered]).tolist() == [1, 2, 3]
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from maindata import (
+    TelemetryBridgeWithDB,
+    normalize_in_worker,
+    pack_payloads_to_shared_memory,
+    read_columns_from_shared_memory,
+)
+
+NOW_US = 1_700_000_000_000_000
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def json_payloads(ids):
+    return [json.dumps({'speed_ms': float(i), 'message_id': i, 'uptime_seconds': i * 0.1})
+            for i in ids]
+
+
+def test_worker_round_trip_through_shared_memory():
+    block, offsets, kinds = pack_payloads_to_shared_memory(
+        json_payloads([1, 2]) + [{'speed_ms': 3.0, 'message_id': 3}, b'']
+    )
+    try:
+        result = normalize_in_worker(block.name, offsets, kinds, NOW_US)
+    finally:
+        block.close()
+        block.unlink()
+    columns = read_columns_from_shared_memory(result['block'], result['count'])
+    assert columns['message_id'].tolist() == [1, 2, 3]
+    assert columns['speed_ms'].tolist() == [1.0, 2.0, 3.0]
+    assert result['unparsed'] == 1
+
+
+def test_worker_pool_leaves_no_shared_memory_warnings():
+    script = textwrap.dedent(f"""
+        import json, multiprocessing, sys
+        from concurrent.futures import ProcessPoolExecutor
+        sys.path.insert(0, {ROOT!r})
+        import maindata
+
+        if __name__ == "__main__":
+            pool = ProcessPoolExecutor(2, mp_context=multiprocessing.get_context("spawn"))
+            payloads = [json.dumps({{"message_id": i}}) for i in range(1, 50)]
+            for _ in range(4):
+                block, offsets, kinds = maindata.pack_payloads_to_shared_memory(payloads)
+                result = pool.submit(maindata.normalize_in_worker, block.name,
+                                     offsets, kinds, 0).result()
+                maindata.read_columns_from_shared_memory(result["block"], result["count"])
+                block.close()
+                block.unlink()
+            pool.shutdown()
+    """)
+    completed = subprocess.run([sys.executable, "-c", script], capture_output=True,
+                               text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+    assert "leaked" not in completed.stderr
+    assert "No such file" not in completed.stderr
+
+
+class BrokenPool(Executor):
+    """Executor whose worker died: submissions fail like ProcessPoolExecutor's"""
+
+    def __init__(self, raise_on_submit=False):
+        self.raise_on_submit = raise_on_submit
+        self.shut_down = False
+
+    def submit(self, fn, *args, **kwargs):
+        if self.raise_on_submit:
+            raise BrokenProcessPool("A child process terminated abruptly")
+        future = Future()
+        future.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.mark.parametrize("raise_on_submit", [False, True])
+def test_chunks_of_a_broken_pool_are_normalized_in_loop(raise_on_submit):
+    async def scenario():
+        bridge = TelemetryBridgeWithDB(mock_mode=True, workers=2)
+        pool = BrokenPool(raise_on_submit)
+        bridge._worker_pool = pool
+        bridge._workers_ready = True
+        for payload in json_payloads(range(1, 11)):
+            bridge.raw_ingest.put(payload)
+        bridge._dispatch_raw_ingest()
+        while bridge._worker_pending:
+            await bridge._accept_next_worker_result()
+        return bridge, pool
+
+    bridge, pool = asyncio.run(scenario())
+    assert bridge.stats["messages_received"] == 10
+    assert bridge.db_buffer.swap().columns['message_id'].tolist() == list(range(1, 11))
+    assert pool.shut_down and bridge._worker_pool is None
+    assert not bridge._workers_ready  # in-loop until the pool is rebuilt
+    assert bridge.stats["workers"]["pool_failures"] == 1
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="kills a worker process with SIGKILL")
+def test_pool_is_rebuilt_after_a_worker_dies():
+    async def scenario():
+        bridge = TelemetryBridgeWithDB(mock_mode=True, workers=1)
+        bridge.running = True
+        results = asyncio.ensure_future(bridge.worker_results_loop())
+        while not bridge._workers_ready:
+            await asyncio.sleep(0.05)
+        pool = bridge._worker_pool
+        for pid in list(pool._processes):
+            os.kill(pid, signal.SIGKILL)
+
+        for payload in json_payloads(range(1, 6)):
+            bridge.raw_ingest.put(payload)
+        bridge._dispatch_raw_ingest()
+        while bridge._worker_pool is pool or not bridge._workers_ready:
+            await asyncio.sleep(0.05)
+        bridge.running = False
+        await results
+        bridge._worker_pool.shutdown()
+        return bridge
+
+    bridge = asyncio.run(asyncio.wait_for(scenario(), timeout=60))
+    assert bridge.stats["messages_received"] == 5
+    assert bridge.stats["workers"]["pool_failures"] == 1